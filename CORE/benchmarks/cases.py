@@ -0,0 +1,271 @@
+"""
+Набор бенчмарков: пазлы CORE.pazzles_lib, операции Signal, шаг и форма целиком, оценщики,
+построение ParametrisedDataset, чтение LUDB. Все на синтетических данных из CORE.benchmarks.synthetic.
+
+Каждый бенчмарк - BenchmarkCase: подготовка (setup) не замеряется и возвращает функцию без аргументов,
+время которой и измеряется. Если подготовка невозможна (например, не установлен torch), бенчмарк
+пропускается с причиной.
+"""
+import importlib
+import json
+import os
+import tempfile
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Any, Callable, Iterator, List, Tuple
+
+import numpy as np
+
+from CORE import Signal
+from CORE.benchmarks.synthetic import (SyntheticExemplarsDataset, SyntheticFormBuilder, synthetic_ecg,
+                                       synthetic_parametrised_dataset)
+from CORE.datasets_wrappers.form_associated.parametrised_dataset import ParametrisedDataset
+from CORE.datasets_wrappers.ludb import LUDB, convert_ludb_json
+from CORE.db_dataclasses.base_class import CLASS_TYPES
+from CORE.enums import LEADS_NAMES
+from CORE.run import Exemplar
+from CORE.run.eval import positive_only
+from CORE.run.r_form import RForm
+from CORE.run.run_pazzle.classes_registry import classes_registry
+
+BEAM_SIZES = [1, 5, 20]
+SIGNAL_LENGTHS_T = [10.0, 60.0]
+LUDB_PATIENTS = 20  # пациентов в синтетическом LUDB (у каждого 12 отведений по 10 с)
+
+# Оценщики с контрастной выборкой: (модуль, класс); модули импортируются только при подготовке бенчмарка,
+# т.к. часть из них требует необязательных зависимостей
+CONTRAST_EVALUATORS = [
+    ('CORE.run.eval.with_contrast.KNN_adaptive_k', 'KNNBinaryEvaluator'),
+    ('CORE.run.eval.with_contrast.RBF_SVM', 'RBFSVMEvaluator'),
+    ('CORE.run.eval.with_contrast.gradient_boosting', 'GradientBoostingEvaluator'),
+    ('CORE.run.eval.with_contrast.neural_network_simple', 'PyTorchMLPEvaluator'),
+]
+
+
+@dataclass
+class BenchmarkCase:
+    name: str  # "группа/имя", по нему фильтруются и сравниваются результаты
+    setup: Callable[[], Callable[[], Any]]
+
+
+class BenchmarkData:
+    """ Общие для бенчмарков синтетические данные; каждое поле строится при первом обращении """
+
+    @cached_property
+    def builder(self) -> SyntheticFormBuilder:
+        return SyntheticFormBuilder()
+
+    @cached_property
+    def form(self):
+        return self.builder.pqr_form()
+
+    @cached_property
+    def record(self):
+        """ 10-секундный сигнал и пики его комплексов """
+        return synthetic_ecg(seed=1)
+
+    @cached_property
+    def positive_dataset(self) -> ParametrisedDataset:
+        return synthetic_parametrised_dataset(self.form)
+
+    @cached_property
+    def contrast_dataset(self) -> ParametrisedDataset:
+        return synthetic_parametrised_dataset(self.form, shift_t=0.03)
+
+    @cached_property
+    def candidates(self) -> List[Exemplar]:
+        """ Параметризованные экземпляры со слегка смещенными точками - то, что оценщики видят при распознавании """
+        raw = SyntheticExemplarsDataset(n_signals=12, shift_t=0.008, seed=300)
+        ParametrisedDataset(raw_exemplars=raw, form=self.form)  # дописывает параметры в экземпляры raw
+        return list(raw.exemplars.values())
+
+    @cached_property
+    def ludb_paths(self) -> Tuple[str, str]:
+        """ Синтетический JSON LUDB (мкВ) и построенное из него бинарное хранилище во временной папке """
+        self._ludb_dir = tempfile.TemporaryDirectory()  # удаляется вместе с BenchmarkData
+        json_path = os.path.join(self._ludb_dir.name, 'ecg_data_200.json')
+        store_path = os.path.join(self._ludb_dir.name, 'ludb_store')
+        data = {}
+        for seed in range(LUDB_PATIENTS):
+            signal_mkv = np.round(synthetic_ecg(seed=seed)[0].signal_mv * 1000).astype(int).tolist()
+            data[str(seed)] = {'Leads': {lead: {'Signal': signal_mkv} for lead in vars(LEADS_NAMES).values()}}
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        convert_ludb_json(json_path, store_path)
+        return json_path, store_path
+
+
+def _signal_cases(data: BenchmarkData) -> Iterator[BenchmarkCase]:
+    def construct():
+        signal_mv = np.asarray(data.record[0].signal_mv)
+        return lambda: Signal(signal_mv=signal_mv, frequency=500)
+
+    def time_axis():
+        signal_mv = np.asarray(data.record[0].signal_mv)
+        return lambda: Signal(signal_mv=signal_mv, frequency=500).time
+
+    def fragment():
+        signal = data.record[0]
+        return lambda: signal.get_fragment(2.0, 2.5)
+
+    def window_indices():
+        signal = data.record[0]
+        return lambda: signal.get_window_indices(2.0, 2.5)
+
+    def patched():
+        signal = data.record[0]
+        window = np.zeros(250)
+        return lambda: signal.patched(1000, window)
+
+    def cropped():
+        signal = data.record[0]
+        return lambda: signal.get_cropped_with_padding(2.0, 2.5, 20)
+
+    def amplitude():
+        signal = data.record[0]
+        return lambda: signal.get_amplplitude_in_moment(2.345)
+
+    for name, setup in [('construct', construct), ('time', time_axis), ('get_fragment', fragment),
+                        ('get_window_indices', window_indices), ('patched', patched),
+                        ('get_cropped_with_padding', cropped), ('get_amplitude_in_moment', amplitude)]:
+        yield BenchmarkCase(f'signal/{name}', setup)
+
+
+def _pazzle_case(data: BenchmarkData, class_name: str, class_type: str) -> Callable[[], Callable[[], Any]]:
+    """ Запуск пазла с аргументами конструктора по умолчанию в окне вокруг одного комплекса """
+
+    def setup():
+        signal, beats = data.record
+        base_class = data.builder.classes[class_name]
+        pazzle = classes_registry[class_name]()
+        left_t, right_t = beats[3] - 0.1, beats[3] + 0.35
+
+        points = {point.name: beats[3] + 0.05 * i for i, point in enumerate(base_class.input_points)}
+        params = {param.name: True if param.data_type == 'bool' else 1.0 for param in base_class.input_params}
+        if points:
+            pazzle.register_points(**points)
+        if params or class_type in (CLASS_TYPES.PC.value, CLASS_TYPES.HC.value):
+            pazzle.register_input_parameters(**params)
+
+        if class_type == CLASS_TYPES.HC.value:
+            return pazzle.run
+        if class_type == CLASS_TYPES.PC.value:
+            return lambda: pazzle.run(signal)
+        return lambda: pazzle.run(signal, left_t=left_t, right_t=right_t)
+
+    return setup
+
+
+def _pazzle_cases(data: BenchmarkData) -> Iterator[BenchmarkCase]:
+    for class_name, base_class in sorted(data.builder.classes.items()):
+        yield BenchmarkCase(f'pazzles/{base_class.type}/{class_name}', _pazzle_case(data, class_name, base_class.type))
+
+
+def _engine_cases(data: BenchmarkData) -> Iterator[BenchmarkCase]:
+    def rstep_run(step_num: int):
+        def setup():
+            signal, beats = data.record
+            rform = RForm(data.form, evaluator=positive_only.SumDistsEval(data.positive_dataset))
+            rform.rsteps[0].set_step_as_first(beats[3] + 0.01)
+            parent = Exemplar(signal=signal)
+            for rstep in rform.rsteps[:step_num]:
+                parent = rstep.run(parent)[1][0]
+            rstep = rform.rsteps[step_num]
+            return lambda: rstep.run(parent)
+
+        return setup
+
+    def rform_run(beam: int, seconds: float):
+        def setup():
+            signal, beats = synthetic_ecg(seed=1, seconds=seconds)
+            rform = RForm(data.form, evaluator=positive_only.KDE_Eval(data.positive_dataset), max_pool_size=beam)
+            seminal_point = beats[len(beats) // 2] + 0.01
+            return lambda: rform.run(signal, seminal_point)
+
+        return setup
+
+    def rform_run_many():
+        signal, beats = data.record
+        rform = RForm(data.form, evaluator=positive_only.KDE_Eval(data.positive_dataset))
+        seminal_points = [beat + 0.01 for beat in beats]
+        return lambda: rform.run_many(signal, seminal_points)
+
+    for step_num in range(len(data.form.steps)):
+        yield BenchmarkCase(f'engine/RStep.run/step{step_num}', rstep_run(step_num))
+    for beam in BEAM_SIZES:
+        for seconds in SIGNAL_LENGTHS_T:
+            yield BenchmarkCase(f'engine/RForm.run/beam{beam}_{int(seconds)}s', rform_run(beam, seconds))
+    yield BenchmarkCase('engine/RForm.run_many/10s', rform_run_many)
+
+
+def _evaluator_cases(data: BenchmarkData) -> Iterator[BenchmarkCase]:
+    def make_positive(name: str) -> Callable[[], Any]:
+        evaluator_class = getattr(positive_only, name)
+        return lambda: evaluator_class(data.positive_dataset)
+
+    def make_contrast(module_name: str, class_name: str) -> Callable[[], Any]:
+        def make():
+            evaluator_class = getattr(importlib.import_module(module_name), class_name)
+            return evaluator_class(data.positive_dataset, data.contrast_dataset)
+
+        return make
+
+    def fit(make: Callable[[], Any]):
+        def setup():
+            make()  # импорт и прогрев вне замера
+            return make
+
+        return setup
+
+    def evaluate(make: Callable[[], Any]):
+        def setup():
+            evaluator = make()
+            candidates = data.candidates
+            return lambda: evaluator.eval_exemplars(candidates)
+
+        return setup
+
+    makers = [(name, make_positive(name)) for name in sorted(positive_only.__all__)]
+    makers += [(class_name, make_contrast(module_name, class_name)) for module_name, class_name in CONTRAST_EVALUATORS]
+    for name, make in makers:
+        yield BenchmarkCase(f'evaluators/{name}/fit', fit(make))
+        yield BenchmarkCase(f'evaluators/{name}/eval_exemplars', evaluate(make))
+
+
+def _dataset_cases(data: BenchmarkData) -> Iterator[BenchmarkCase]:
+    def parametrised_dataset():
+        form = data.form
+        raw = SyntheticExemplarsDataset()  # сигналы строятся вне замера
+        # параметризация дописывает параметры в экземпляры, поэтому каждый раз - свежая копия разметки
+        return lambda: ParametrisedDataset(raw_exemplars=raw.unparametrised_copy(), form=form)
+
+    yield BenchmarkCase('datasets/ParametrisedDataset', parametrised_dataset)
+
+    def ludb_json_load():
+        json_path, _ = data.ludb_paths
+
+        def load():
+            with open(json_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return load
+
+    def ludb_open():
+        json_path, store_path = data.ludb_paths
+        return lambda: LUDB(json_path=json_path, store_path=store_path)
+
+    def ludb_get_1d_signal():
+        json_path, store_path = data.ludb_paths
+        ludb = LUDB(json_path=json_path, store_path=store_path)
+        return lambda: ludb.get_1d_signal('3', LEADS_NAMES.ii)
+
+    # json_load - то, с чего раньше начиналось создание LUDB, для сравнения с open
+    yield BenchmarkCase('datasets/LUDB/json_load', ludb_json_load)
+    yield BenchmarkCase('datasets/LUDB/open', ludb_open)
+    yield BenchmarkCase('datasets/LUDB/get_1d_signal', ludb_get_1d_signal)
+
+
+def collect_cases(data: BenchmarkData) -> List[BenchmarkCase]:
+    cases: List[BenchmarkCase] = []
+    for group in (_signal_cases, _pazzle_cases, _engine_cases, _evaluator_cases, _dataset_cases):
+        cases.extend(group(data))
+    return cases
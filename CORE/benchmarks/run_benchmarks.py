@@ -0,0 +1,166 @@
+"""
+Запуск бенчмарков (см. CORE.benchmarks.cases) с сохранением результатов в json и сравнением двух прогонов.
+
+Примеры:
+    python -m CORE.benchmarks.run_benchmarks --output bench_new.json
+    python -m CORE.benchmarks.run_benchmarks --filter engine/ --compare bench_old.json --output bench_new.json
+    python -m CORE.benchmarks.run_benchmarks --compare bench_old.json --against bench_new.json
+
+Время одного вызова - медиана по repeat повторам, в каждом из которых функция вызывается number раз
+(number подбирается так, чтобы повтор длился не меньше min_time секунд). Регрессией считается
+рост медианы больше чем в threshold раз.
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import warnings
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from CORE.benchmarks.cases import BenchmarkCase, BenchmarkData, collect_cases
+
+DEFAULT_THRESHOLD = 1.25
+
+
+def measure(func: Callable[[], Any], min_time: float = 0.05, repeat: int = 5) -> Dict[str, float]:
+    """
+    Замеряет время одного вызова func.
+
+    :param min_time: минимальная длительность одного повтора, с
+    :param repeat: число повторов
+    :return: медиана, минимум и среднее времени вызова (с), number и repeat
+    """
+    func()  # прогрев: ленивые кэши, импорты
+
+    # подбираем number: удваиваем, пока повтор не станет дольше min_time
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 1 << 20:
+            break
+        number *= 2
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - start) / number)
+
+    return {'median_s': statistics.median(timings), 'min_s': min(timings), 'mean_s': statistics.fmean(timings),
+            'number': number, 'repeat': repeat}
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(cases: Sequence[BenchmarkCase], name_filter: Optional[str] = None, min_time: float = 0.05,
+                   repeat: int = 5, verbose: bool = False) -> Dict[str, Any]:
+    """
+    Запускает бенчмарки, имя которых содержит name_filter.
+
+    :return: словарь для json: meta, results (имя -> замер), skipped (имя -> причина)
+    """
+    results: Dict[str, Dict[str, float]] = {}
+    skipped: Dict[str, str] = {}
+    for case in cases:
+        if name_filter and name_filter not in case.name:
+            continue
+        with warnings.catch_warnings():
+            # предупреждения sklearn/scipy на вырожденных синтетических параметрах - шум для замеров
+            warnings.simplefilter('ignore')
+            try:
+                func = case.setup()
+                results[case.name] = measure(func, min_time=min_time, repeat=repeat)
+            except Exception as e:
+                skipped[case.name] = f"{type(e).__name__}: {e}"
+        if verbose:
+            line = (f"{results[case.name]['median_s'] * 1e3:12.4f} ms" if case.name in results
+                    else f"{'пропущен':>15}")
+            print(f"{line}  {case.name}", flush=True)
+
+    meta = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': sys.version.split()[0],
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'min_time': min_time,
+        'repeat': repeat,
+    }
+    return {'meta': meta, 'results': results, 'skipped': skipped}
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any],
+            threshold: float = DEFAULT_THRESHOLD) -> List[Tuple[str, float, float, float, bool]]:
+    """
+    Сравнивает общие бенчмарки двух прогонов по медиане.
+
+    :return: список (имя, старое время, новое время, новое / старое, регрессия ли это)
+    """
+    rows = []
+    for name in sorted(set(old['results']) & set(new['results'])):
+        old_time, new_time = old['results'][name]['median_s'], new['results'][name]['median_s']
+        ratio = new_time / old_time if old_time > 0 else float('inf')
+        rows.append((name, old_time, new_time, ratio, ratio > threshold))
+    return rows
+
+
+def print_comparison(rows: List[Tuple[str, float, float, float, bool]]) -> None:
+    print(f"{'было, ms':>12} {'стало, ms':>12} {'x':>7}  бенчмарк")
+    for name, old_time, new_time, ratio, regression in rows:
+        mark = '  <-- регрессия' if regression else ''
+        print(f"{old_time * 1e3:12.4f} {new_time * 1e3:12.4f} {ratio:7.2f}  {name}{mark}")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарки движка распознавания и библиотеки пазлов")
+    parser.add_argument('--output', help="json-файл для результатов прогона")
+    parser.add_argument('--filter', help="запускать только бенчмарки, в имени которых есть эта подстрока")
+    parser.add_argument('--min-time', type=float, default=0.05, help="минимальная длительность повтора, с")
+    parser.add_argument('--repeat', type=int, default=5, help="число повторов")
+    parser.add_argument('--compare', help="json прошлого прогона для сравнения")
+    parser.add_argument('--against', help="сравнить --compare с этим json, ничего не запуская")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="во сколько раз должна вырасти медиана, чтобы считать это регрессией")
+    args = parser.parse_args(argv)
+
+    if args.against:
+        with open(args.against, encoding='utf-8') as f:
+            new = json.load(f)
+    else:
+        new = run_benchmarks(collect_cases(BenchmarkData()), name_filter=args.filter, min_time=args.min_time,
+                             repeat=args.repeat, verbose=True)
+        for name, reason in new['skipped'].items():
+            print(f"пропущен {name}: {reason}")
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(new, f, ensure_ascii=False, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            old = json.load(f)
+        rows = compare(old, new, threshold=args.threshold)
+        print_comparison(rows)
+        regressions = [row for row in rows if row[-1]]
+        if regressions:
+            print(f"Регрессий: {len(regressions)} (порог x{args.threshold})")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
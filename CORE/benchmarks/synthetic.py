@@ -0,0 +1,166 @@
+"""
+Детерминированные синтетические данные для бенчмарков: ЭКГ-подобные сигналы, форма P-Q-R
+на пазлах из CORE.pazzles_lib и размеченные экземпляры этой формы.
+Ни база данных, ни LUDB не нужны.
+"""
+import itertools
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from CORE import Signal
+from CORE.datasets_wrappers.form_associated.parametrised_dataset import ParametrisedDataset
+from CORE.db_dataclasses import (BaseClass, BasePazzle, Form, ObjectArgumentValue, ObjectInputParamValue,
+                                 ObjectInputPointValue, ObjectOutputParamValue, Parameter, Point, Step, Track)
+from CORE.pazzles_lib.floders_parser import FoldersParser
+from CORE.run import Exemplar
+
+FREQUENCY = 500
+BEAT_PERIOD_T = 0.75  # среднее расстояние между комплексами, с
+
+
+def synthetic_ecg(seed: int, seconds: float = 10.0, frequency: int = FREQUENCY) -> Tuple[Signal, List[float]]:
+    """
+    ЭКГ-подобный сигнал: узкий пик (R), впадина за ним и пологая волна (T) каждые ~0.75 с плюс шум.
+
+    :return: сигнал и координаты пиков комплексов (с)
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * frequency)) / frequency
+    signal_mv = 0.02 * rng.standard_normal(len(t))
+    beats = []
+    beat = 0.4 + rng.uniform(0, 0.2)
+    while beat < seconds - 0.6:
+        amplitude = 1.0 + 0.2 * rng.standard_normal()
+        signal_mv += amplitude * np.exp(-((t - beat) / 0.012) ** 2)
+        signal_mv -= 0.3 * amplitude * np.exp(-((t - beat - 0.05) / 0.015) ** 2)
+        signal_mv += 0.25 * np.exp(-((t - beat - 0.3) / 0.05) ** 2)
+        beats.append(float(beat))
+        beat += BEAT_PERIOD_T + rng.uniform(-0.05, 0.05)
+    return Signal(signal_mv=signal_mv, frequency=frequency), beats
+
+
+class SyntheticFormBuilder:
+    """
+    Собирает формы из классов пазлов CORE.pazzles_lib (описания классов берутся разбором исходников,
+    как при заполнении базы), раздавая id объектам так же, как их раздала бы база.
+    """
+
+    def __init__(self):
+        self._ids = itertools.count(1)
+        pc_list, hc_list, ps_list, sm_list = FoldersParser().parse_all_folders()
+        self.classes: Dict[str, BaseClass] = {}
+        for base_class in pc_list + hc_list + ps_list + sm_list:
+            base_class.id = next(self._ids)
+            for items in (base_class.constructor_arguments, base_class.input_points,
+                          base_class.input_params, base_class.output_params):
+                for item in items:
+                    item.id = next(self._ids)
+            self.classes[base_class.name] = base_class
+
+    def next_id(self) -> int:
+        return next(self._ids)
+
+    def pazzle(self, class_name: str, args: Optional[Dict] = None, points: Optional[Dict[str, Point]] = None,
+               inputs: Optional[Dict[str, Parameter]] = None, outputs: Optional[Dict[str, Parameter]] = None) -> BasePazzle:
+        """
+        Пазл класса class_name. Аргументы конструктора, не указанные в args, берутся по умолчанию;
+        points, inputs, outputs - соответствие имен аргументов класса точкам и параметрам формы.
+        """
+        base_class = self.classes[class_name]
+        args, points, inputs, outputs = args or {}, points or {}, inputs or {}, outputs or {}
+        pazzle = BasePazzle(id=self.next_id(), class_ref=base_class)
+        for argument in base_class.constructor_arguments:
+            value = args.get(argument.name, argument.default_value)
+            pazzle.argument_values.append(ObjectArgumentValue(argument_id=argument.id, argument_value=str(value)))
+        for point in base_class.input_points:
+            pazzle.input_point_values.append(ObjectInputPointValue(input_point_id=point.id,
+                                                                   point_id=points[point.name].id))
+        for param in base_class.input_params:
+            pazzle.input_param_values.append(ObjectInputParamValue(input_param_id=param.id,
+                                                                   parameter_id=inputs[param.name].id))
+        for param in base_class.output_params:
+            pazzle.output_param_values.append(ObjectOutputParamValue(output_param_id=param.id,
+                                                                     parameter_id=outputs[param.name].id))
+        return pazzle
+
+    def track(self, sms: List[BasePazzle], pss: List[BasePazzle]) -> Track:
+        return Track(id=self.next_id(), SMs=sms, PSs=pss)
+
+    def pqr_form(self) -> Form:
+        """
+        Форма из трех точек: P - пик комплекса, Q - впадина после него, R - вершина пологой волны.
+        В ней есть все виды пазлов (SM, PS, PC, HC), по нескольку треков на шаг.
+        """
+        p, q, r = Point(id=101, name='P'), Point(id=102, name='Q'), Point(id=103, name='R')
+        params = {name: Parameter(id=200 + i, name=name)
+                  for i, name in enumerate(['ampP', 'ampQ', 'distPQ', 'diff', 'ampR', 'distQR'])}
+        pcs = [
+            self.pazzle('AmplitudeInPoint', points={'my_point': p}, outputs={'amplitude_mV': params['ampP']}),
+            self.pazzle('AmplitudeInPoint', points={'my_point': q}, outputs={'amplitude_mV': params['ampQ']}),
+            self.pazzle('DistanceBtw2Points', points={'point_left': p, 'point_right': q},
+                        outputs={'distance_in_seconds': params['distPQ']}),
+            self.pazzle('Minus', inputs={'num1': params['ampQ'], 'num2': params['ampP']},
+                        outputs={'num2-num1': params['diff']}),
+            self.pazzle('AmplitudeInPoint', points={'my_point': r}, outputs={'amplitude_mV': params['ampR']}),
+            self.pazzle('DistanceBtw2Points', points={'point_left': q, 'point_right': r},
+                        outputs={'distance_in_seconds': params['distQR']}),
+        ]
+        hcs = [
+            self.pazzle('LessThanThreshold', args={'threshold': 0.14}, inputs={'param_to_eval': params['distPQ']}),
+            self.pazzle('HigherThanThreshold', args={'threshold': 5}, inputs={'param_to_eval': params['diff']}),
+        ]
+        steps = [
+            Step(num_in_form=0, target_point=p, left_padding_t=0.1, right_padding_t=0.1, tracks=[
+                self.track([self.pazzle('GaussianSmooth', args={'sigma': 2.0, 'kernel_size_t': 0.03})],
+                           [self.pazzle('GlobalMaxSelector')]),
+                self.track([], [self.pazzle('LocalMaxsSelector')]),
+                self.track([], [self.pazzle('TopBestInterpolationPoints', args={'N': 3})])]),
+            Step(num_in_form=1, target_point=q, left_point=p, right_padding_t=0.12, tracks=[
+                self.track([self.pazzle('FrequencyFilter', args={'cutoff_freq': 40.0, 'filter_type': 'lowpass'})],
+                           [self.pazzle('LocalMinsSelector')]),
+                self.track([], [self.pazzle('GlobalMinSelector')])]),
+            Step(num_in_form=2, target_point=r, left_point=q, right_padding_t=0.35, tracks=[
+                self.track([self.pazzle('GaussianSmooth', args={'sigma': 3.0, 'kernel_size_t': 0.05})],
+                           [self.pazzle('LocalMaxsSelector')]),
+                self.track([], [self.pazzle('TopBestInterpolationPoints', args={'N': 2})])]),
+        ]
+        return Form(id=1, name='synthetic_PQR', points=[p, q, r], parameters=list(params.values()),
+                    steps=steps, HC_PC_objects=pcs + hcs)
+
+
+class SyntheticExemplarsDataset:
+    """
+    Замена ExemplarsDataset для ParametrisedDataset: размеченные экземпляры формы P-Q-R
+    на синтетических сигналах. При shift_t != 0 точки смещены от истинных - контрастная выборка.
+    """
+
+    def __init__(self, n_signals: int = 12, beats_per_signal: int = 3, shift_t: float = 0.0, seed: int = 100):
+        self.form_dataset_name = 'synthetic'
+        self.exemplars: Dict[str, Exemplar] = {}
+        for i in range(n_signals):
+            signal, beats = synthetic_ecg(seed + i)
+            for k, beat in enumerate(beats[1:1 + beats_per_signal]):
+                exemplar = Exemplar(signal)
+                exemplar.add_point('P', round(beat + shift_t, 3), None)
+                exemplar.add_point('Q', round(beat + 0.05 + shift_t, 3), None)
+                exemplar.add_point('R', round(beat + 0.3 - shift_t, 3), None)
+                exemplar.id = f'{i}_{k}'
+                self.exemplars[exemplar.id] = exemplar
+
+    def unparametrised_copy(self) -> 'SyntheticExemplarsDataset':
+        """ Копия с теми же сигналами и точками, но без параметров (параметризацию можно повторить) """
+        copy = SyntheticExemplarsDataset.__new__(SyntheticExemplarsDataset)
+        copy.form_dataset_name = self.form_dataset_name
+        copy.exemplars = {}
+        for exemplar_id, exemplar in self.exemplars.items():
+            new_exemplar = Exemplar(exemplar.signal)
+            for point_name in ('P', 'Q', 'R'):
+                new_exemplar.add_point(point_name, exemplar.get_point_coord(point_name), None)
+            new_exemplar.id = exemplar_id
+            copy.exemplars[exemplar_id] = new_exemplar
+        return copy
+
+
+def synthetic_parametrised_dataset(form: Form, shift_t: float = 0.0, n_signals: int = 12) -> ParametrisedDataset:
+    return ParametrisedDataset(raw_exemplars=SyntheticExemplarsDataset(n_signals=n_signals, shift_t=shift_t), form=form)
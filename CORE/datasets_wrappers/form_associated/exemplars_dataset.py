@@ -1,11 +1,15 @@
 import copy
+import hashlib
 import json
 import os
+from collections import OrderedDict
 from typing import List, Optional, Dict
 
+from CORE import Signal
 from CORE.datasets_wrappers.form_associated.raw_entry import RawEntry
 from CORE.datasets_wrappers.third_party_dataset import ThirdPartyDataset
 from CORE.datasets_wrappers.ludb import LUDB
+from CORE.exeptions import CoreError
 from CORE.logger import get_logger
 from CORE.paths import EXEMPLARS_DATASETS_PATH
 from CORE.run import Exemplar
@@ -13,6 +17,68 @@ from CORE.run import Exemplar
 logger = get_logger(__name__)
 
 
+class SignalsCache:
+    """
+    LRU-кэш сигналов внешнего датасета, общий для всех экземпляров датасета экземпляров формы.
+    Ключ - (patient_id, lead_name). Размер ограничен max_size сигналами, при переполнении
+    вытесняются давно не использованные, поэтому память не растет с размером датасета.
+    """
+
+    def __init__(self, outer_dataset: ThirdPartyDataset, max_size: int = 32):
+        """
+        :param outer_dataset: внешний датасет, из которого загружаются сигналы
+        :param max_size: максимальное число хранимых сигналов
+        """
+        if max_size < 1:
+            raise ValueError("Размер кэша сигналов должен быть положительным")
+        self.outer_dataset = outer_dataset
+        self.max_size = max_size
+        self._signals: OrderedDict = OrderedDict()  # (patient_id, lead_name) -> Signal
+
+    def get(self, patient_id: str, lead_name: str) -> Signal:
+        """
+        :raises CoreError: если во внешнем датасете нет такого сигнала
+        """
+        key = (patient_id, lead_name)
+        signal = self._signals.get(key)
+        if signal is not None:
+            self._signals.move_to_end(key)
+            return signal
+
+        signal = self.outer_dataset.get_1d_signal(patient_id=patient_id, lead_name=lead_name)
+        if signal is None:
+            raise CoreError(f"Сигнал не найден: patient={patient_id}, lead={lead_name}")
+        self._signals[key] = signal
+        while len(self._signals) > self.max_size:
+            self._signals.popitem(last=False)
+        return signal
+
+    def clear(self) -> None:
+        self._signals.clear()
+
+    def __len__(self) -> int:
+        return len(self._signals)
+
+    def __getstate__(self):
+        """ Загруженные сигналы в копию при сериализации не попадают - их можно загрузить заново """
+        state = self.__dict__.copy()
+        state['_signals'] = OrderedDict()
+        return state
+
+
+class SignalRef:
+    """ Функция загрузки сигнала экземпляра датасета (см. Exemplar.with_signal_loader): ключ записи и общий кэш """
+    __slots__ = ('cache', 'patient_id', 'lead_name')
+
+    def __init__(self, cache: SignalsCache, patient_id: str, lead_name: str):
+        self.cache = cache
+        self.patient_id = patient_id
+        self.lead_name = lead_name
+
+    def __call__(self) -> Signal:
+        return self.cache.get(self.patient_id, self.lead_name)
+
+
 class ExemplarsDataset:
     """
     Класс, который на основе датасета с сырой разметкой точек генерирует
@@ -20,32 +86,36 @@ class ExemplarsDataset:
     Ключ словаря совпадает с ключом записей в датасете сырых записей.
     Если предоставлен объект формы, то экземпляры содержат не только точки,
     но и параметры, и сведения о проваленных условиях формы
+
+    Сигналы экземпляров при загрузке не читаются: экземпляр держит ссылку на запись внешнего датасета
+    (SignalRef), а сигнал загружается при обращении к нему и хранится в ограниченном кэше signals_cache.
     """
 
-    def __init__(self, form_dataset_name: str, outer_dataset: ThirdPartyDataset):
+    def __init__(self, form_dataset_name: str, outer_dataset: ThirdPartyDataset, signals_cache_size: int = 32):
+        """
+        :param form_dataset_name: имя json-файла датасета в EXEMPLARS_DATASETS_PATH
+        :param outer_dataset: внешний датасет, на сигналах которого производилась наша разметка экземпляров формы
+        :param signals_cache_size: сколько последних использованных сигналов держать в памяти
+        """
         self.form_dataset_name = form_dataset_name
         self.outer_dataset = outer_dataset  # Внешний датасет, на сигналах которого производилась наша разметка экземпляров формы
+        self.signals_cache = SignalsCache(outer_dataset, max_size=signals_cache_size)
         self.point_names: List[str] = []  # Имена точек формы
         self.exemplars: Dict[str, Exemplar] = {}  # Размеченные нами вручную экземпляры
+        self.content_digest: Optional[str] = None  # хэш json-файла, из которого загружены экземпляры
 
         full_path = os.path.join(EXEMPLARS_DATASETS_PATH, form_dataset_name)
         logger.info(f"Загрузка датасета из: {full_path}")
         self._load_data(full_path)
 
-    def _entry_to_exemplar(self, entry: RawEntry) -> Optional[Exemplar]:
-        """Преобразование RawEntry в Exemplar"""
-        # Получаем сигнал
-        signal = self.outer_dataset.get_1d_signal(
-            patient_id=entry.patient_id,
-            lead_name=entry.lead_name
-        )
-
-        if signal is None:
+    def _entry_to_exemplar(self, entry: RawEntry, patients_ids: set) -> Optional[Exemplar]:
+        """Преобразование RawEntry в Exemplar (сигнал загрузится при первом обращении)"""
+        if entry.patient_id not in patients_ids:
             logger.warning(f"Сигнал не найден: patient={entry.patient_id}, lead={entry.lead_name}")
             return None
 
         # Создаем Exemplar и добавляем точки
-        exemplar = Exemplar(signal)
+        exemplar = Exemplar.with_signal_loader(SignalRef(self.signals_cache, entry.patient_id, entry.lead_name))
         for point_name, point_coord in entry.points.items():
             exemplar.add_point(point_name=point_name, point_coord_t=point_coord, track_id=None)
 
@@ -55,8 +125,10 @@ class ExemplarsDataset:
     def _load_data(self, filepath: str):
         """Загрузка данных из JSON файла"""
         try:
-            with open(filepath, 'r', encoding='utf-8') as file:
-                data = json.load(file)
+            with open(filepath, 'rb') as file:
+                content = file.read()
+            self.content_digest = hashlib.sha256(content).hexdigest()
+            data = json.loads(content)
 
             # Получаем метаинформацию
             self.point_names = data.get('meta', {}).get('points', [])
@@ -68,12 +140,13 @@ class ExemplarsDataset:
                 logger.warning(f"Датасет {filepath} не содержит записей")
                 return
 
+            patients_ids = set(self.outer_dataset.get_patients_ids())
             for entry_id, entry_data in data_dict.items():
                 # Создаем RawEntry из словаря
                 entry = RawEntry.from_dict(entry_id, entry_data)
 
                 # Преобразуем в Exemplar
-                exemplar = self._entry_to_exemplar(entry)
+                exemplar = self._entry_to_exemplar(entry, patients_ids)
 
                 if exemplar:
                     self.exemplars[entry_id] = exemplar
@@ -90,6 +163,16 @@ class ExemplarsDataset:
             logger.error(f"Ошибка загрузки {filepath}: {e}")
             raise
 
+    def get_fingerprint(self) -> Optional[str]:
+        """
+        Отпечаток датасета: хэш загруженного json-файла и отпечаток внешнего датасета с сигналами.
+        None - если внешний датасет отпечатка не дает (см. ThirdPartyDataset.get_fingerprint)
+        """
+        outer_fingerprint = self.outer_dataset.get_fingerprint()
+        if outer_fingerprint is None or self.content_digest is None:
+            return None
+        return f"{self.content_digest}:{outer_fingerprint}"
+
     def get_exemplar_by_id(self, id: str) -> Optional[Exemplar]:
         """Получение записи по ID"""
         return self.exemplars.get(id)
@@ -107,15 +190,16 @@ class ExemplarsDataset:
         return id in self.exemplars
 
     def __deepcopy__(self, memo):
-        """Кастомное глубокое копирование, исключающее копирование outer_dataset"""
+        """Кастомное глубокое копирование, исключающее копирование outer_dataset и сигналов
+        (экземпляры копии загружают сигналы через тот же кэш signals_cache)"""
         # Создаем новый экземпляр без вызова __init__
         new_instance = self.__class__.__new__(self.__class__)
         memo[id(self)] = new_instance
 
         # Копируем все атрибуты, кроме outer_dataset
         for key, value in self.__dict__.items():
-            if key == 'outer_dataset':
-                # Для outer_dataset сохраняем ссылку, а не копию
+            if key in ('outer_dataset', 'signals_cache'):
+                # Для outer_dataset и кэша сигналов сохраняем ссылку, а не копию
                 setattr(new_instance, key, value)
             else:
                 # Для остальных атрибутов делаем глубокое копирование
@@ -151,4 +235,4 @@ if __name__ == "__main__":
         first_exemplar = dataset.get_exemplar_by_id(first_id)
         print(f"\nПервая запись {first_id}:")
         print(f"  Сигнал: {len(first_exemplar.signal.signal_mv)} точек")
-        print(f"  Точки: {list(first_exemplar._points.keys())}")
+        print(f"  Точки: {list(first_exemplar.get_points())}")
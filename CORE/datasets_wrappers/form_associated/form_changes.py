@@ -0,0 +1,73 @@
+"""
+Какие PC и HC формы нужно перезапустить после ее правки, чтобы из таблиц ParametrisedDataset
+прежней версии формы получить таблицы новой (см. ParametrisedDataset.update_frames).
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set
+
+from CORE.datasets_wrappers.form_associated.parametrised_cache import form_description
+from CORE.db_dataclasses import BasePazzle, Form
+from CORE.run.schema import Schema
+
+
+@dataclass
+class FormChanges:
+    """ Пазлы, перезапускаемые поверх таблиц прежней версии формы """
+    pcs: List[BasePazzle] = field(default_factory=list)  # в порядке запуска по схеме
+    hcs: List[BasePazzle] = field(default_factory=list)  # в порядке формы
+    stale_params: Set[str] = field(default_factory=set)  # параметры, прежние значения которых не годятся
+
+
+def find_form_changes(old_description: Dict[str, Any], form: Form, schema: Schema) -> Optional[FormChanges]:
+    """
+    Сравнивает по id пазлов описание прежней версии формы (см. form_description) с нынешней формой.
+
+    Устаревают параметры, которые возвращали удаленные или измененные PC и возвращают измененные и новые.
+    Перезапускаются измененные и новые PC и все PC, которым на вход идут устаревшие параметры
+    (их выходы тоже устаревают - и так по цепочке, в порядке запуска PC по схеме);
+    из HC - измененные, новые и проверяющие устаревшие параметры.
+
+    :param old_description: описание версии формы, для которой посчитаны прежние таблицы
+    :param form: нынешняя форма
+    :param schema: скомпилированная схема нынешней формы (задает порядок запуска PC)
+    :raises ValueError, KeyError: если пазл нынешней формы не разбирается
+    :return: None, если по частям пересчитать нельзя: другие версия кэша или порядок шагов, пазлы без id
+    """
+    new_description = form_description(form)
+    if old_description.get('version') != new_description['version'] or \
+            old_description.get('steps') != new_description['steps']:
+        return None
+
+    old_pazzles = _pazzles_by_id(old_description)
+    new_pazzles = _pazzles_by_id(new_description)
+    if old_pazzles is None or new_pazzles is None:
+        return None
+
+    changed_ids = {pazzle_id for pazzle_id, pazzle in new_pazzles.items() if old_pazzles.get(pazzle_id) != pazzle}
+    changes = FormChanges()
+    for pazzle_id in changed_ids | (old_pazzles.keys() - new_pazzles.keys()):
+        for pazzle in (old_pazzles.get(pazzle_id), new_pazzles.get(pazzle_id)):
+            if pazzle is not None:
+                changes.stale_params.update(pazzle['output_params'].values())
+
+    for step_num in range(len(form.steps)):
+        for pc in schema.get_PCs_by_step_num(step_num):
+            pc_description = new_pazzles[pc.id]
+            used_params = set(pc_description['input_params'].values()) | set(pc_description['output_params'].values())
+            if pc.id in changed_ids or used_params & changes.stale_params:
+                changes.pcs.append(pc)
+                changes.stale_params.update(pc_description['output_params'].values())
+
+    for hc in form.HC_PC_objects:
+        if hc.is_HC() and (hc.id in changed_ids or
+                           set(new_pazzles[hc.id]['input_params'].values()) & changes.stale_params):
+            changes.hcs.append(hc)
+    return changes
+
+
+def _pazzles_by_id(description: Dict[str, Any]) -> Optional[Dict[Any, Dict[str, Any]]]:
+    """ Описания пазлов по id или None, если у пазлов нет id или они повторяются """
+    pazzles = {pazzle['id']: pazzle for pazzle in description['pazzles']}
+    if None in pazzles or len(pazzles) != len(description['pazzles']):
+        return None
+    return pazzles
@@ -0,0 +1,188 @@
+"""
+Дисковый кэш таблиц ParametrisedDataset (параметры, отсутствующие значения параметров и нарушенные HC).
+
+Таблицы хранятся в Parquet под ключом из двух отпечатков:
+- формы: параметры, порядок шагов и все PC/HC - класс, значения аргументов конструктора,
+  привязка к точкам и параметрам формы (по именам) и хэш исходников класса пазла;
+- датасета экземпляров: хэш json-файла разметки и отпечаток внешнего датасета с сигналами.
+Если любой из них изменился, ключ другой и таблицы считаются заново.
+
+Для каждой формы на каждом датасете кэш помнит последнюю посчитанную версию формы вместе с ее описанием:
+после правки формы от нее пересчитываются только затронутые столбцы (см. ParametrisedDataset.update_frames).
+"""
+import functools
+import hashlib
+import inspect
+import json
+import os
+from typing import Any, Dict, Optional, Tuple
+
+import pandas as pd
+
+from CORE.db_dataclasses import BasePazzle, Form
+from CORE.logger import get_logger
+from CORE.run.run_pazzle import PazzleParser
+from CORE.utils import replace_file
+
+logger = get_logger(__name__)
+
+# Увеличивать при изменениях параметризации (Parametriser, R_PC, R_HC), меняющих содержимое таблиц
+CACHE_FORMAT_VERSION = 2
+
+PARAMETERS_SUFFIX = '_parameters.parquet'
+VIOLATIONS_SUFFIX = '_violations.parquet'
+ABSENT_SUFFIX = '_absent.parquet'
+LATEST_SUFFIX = '_latest.json'
+
+
+def form_description(form: Form) -> Dict[str, Any]:
+    """
+    Описание всего, от чего зависят таблицы параметров и нарушений HC формы (сериализуется в json).
+    Пазлы описываются в порядке HC_PC_objects: id, класс, аргументы, привязки, хэш исходников.
+
+    :raises ValueError, KeyError: если пазл формы не разбирается (нет класса, аргумента, точки или параметра)
+    """
+    return {
+        'version': CACHE_FORMAT_VERSION,
+        'parameters': [param.name for param in form.parameters],
+        'steps': [step.target_point.name if step.target_point is not None else None for step in form.steps],
+        'pazzles': [_pazzle_description(pazzle, form) for pazzle in form.HC_PC_objects],
+    }
+
+
+def form_fingerprint(form: Form) -> str:
+    """ Отпечаток описания формы (см. form_description) """
+    return _digest(form_description(form))
+
+
+def _pazzle_description(pazzle: BasePazzle, form: Form) -> Dict[str, Any]:
+    parser = PazzleParser(pazzle, form_points=form.points, form_params=form.parameters)
+    return {
+        'id': pazzle.id,
+        'class': pazzle.class_ref.name,
+        'type': pazzle.class_ref.type,
+        'arguments': pazzle.get_args_names_to_vals(),
+        'points': parser.map_point_names(),
+        'input_params': parser.map_input_params_names(),
+        'output_params': parser.map_output_params_names(),
+        'code': _class_code_digest(parser.get_cls()),
+    }
+
+
+def _class_code_digest(cls: type) -> str:
+    """ Хэш исходников класса пазла и его предков из CORE (правка кода пазла меняет отпечаток формы) """
+    files = sorted({inspect.getsourcefile(klass) for klass in cls.__mro__ if klass.__module__.startswith('CORE.')})
+    return _digest([_file_digest(path) for path in files])
+
+
+@functools.lru_cache(maxsize=None)
+def _file_digest(path: str) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _digest(description: Any) -> str:
+    return hashlib.sha256(json.dumps(description, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def _dataset_fingerprint(raw_exemplars: Any) -> Optional[str]:
+    get_fingerprint = getattr(raw_exemplars, 'get_fingerprint', None)
+    return get_fingerprint() if get_fingerprint is not None else None
+
+
+class FramesCache:
+    """ Место в папке кэша для таблиц одной версии формы на одном датасете """
+
+    def __init__(self, cache_dir: str, key: str, lineage: str, description: Dict[str, Any]):
+        """
+        :param cache_dir: папка кэша
+        :param key: ключ таблиц этой версии формы на этом датасете
+        :param lineage: ключ всех версий формы (по ее id) на этом датасете - под ним помнится последняя версия
+        :param description: описание этой версии формы (см. form_description)
+        """
+        self.cache_dir = cache_dir
+        self.key = key
+        self.lineage = lineage
+        self.description = description
+
+    @classmethod
+    def for_dataset(cls, cache_dir: str, raw_exemplars: Any, form: Form) -> Optional['FramesCache']:
+        """
+        Кэш таблиц формы form на датасете raw_exemplars.
+        None - кэшировать нельзя: датасет не дает отпечатка (например, синтетический, без файла)
+        или пазлы формы не разбираются (тогда ошибку покажет сама параметризация).
+        """
+        dataset_fingerprint = _dataset_fingerprint(raw_exemplars)
+        if dataset_fingerprint is None:
+            return None
+        try:
+            description = form_description(form)
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Не удалось вычислить отпечаток формы {form.id}, таблицы не кэшируются: {e}")
+            return None
+        return cls(cache_dir, key=_digest([_digest(description), dataset_fingerprint]),
+                   lineage=_digest(['lineage', form.id, dataset_fingerprint]), description=description)
+
+    def load(self) -> Optional[Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]]:
+        """
+        Таблицы параметров, нарушений HC и отсутствующих значений из кэша
+        или None, если их там нет (или они не читаются)
+        """
+        return self._load_frames(self.key)
+
+    def load_previous(self) -> Optional[Tuple[Dict[str, Any], pd.DataFrame, pd.DataFrame, pd.DataFrame]]:
+        """ Описание и таблицы последней посчитанной на этом датасете версии формы или None, если их нет """
+        latest_path = os.path.join(self.cache_dir, self.lineage + LATEST_SUFFIX)
+        if not os.path.exists(latest_path):
+            return None
+        try:
+            with open(latest_path, 'r', encoding='utf-8') as f:
+                latest = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Не удалось прочитать последнюю версию формы из кэша: {e}")
+            return None
+        frames = self._load_frames(latest['key'])
+        if frames is None:
+            return None
+        return (latest['form'],) + frames
+
+    def _load_frames(self, key: str) -> Optional[Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]]:
+        paths = [os.path.join(self.cache_dir, key + suffix)
+                 for suffix in (PARAMETERS_SUFFIX, VIOLATIONS_SUFFIX, ABSENT_SUFFIX)]
+        if not all(os.path.exists(path) for path in paths):
+            return None
+        try:
+            parameters_frame, violations_frame, absent_frame = (pd.read_parquet(path) for path in paths)
+            return parameters_frame, violations_frame, absent_frame
+        except Exception as e:
+            logger.warning(f"Не удалось прочитать кэш таблиц {key}, они будут посчитаны заново: {e}")
+            return None
+
+    def save(self, parameters_frame: pd.DataFrame, violations_frame: pd.DataFrame,
+             absent_frame: pd.DataFrame) -> None:
+        """
+        Сохраняет таблицы в кэш и запоминает эту версию формы как последнюю.
+        Каждый файл подменяется целиком, таблица параметров пишется последней:
+        таблицы читаются, только когда есть все три.
+        Ошибка записи (нет движка Parquet, нет места и т.п.) не прерывает работу - таблицы просто не кэшируются.
+        """
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            replace_file(os.path.join(self.cache_dir, self.key + VIOLATIONS_SUFFIX),
+                         lambda f: violations_frame.to_parquet(f, index=False))
+            replace_file(os.path.join(self.cache_dir, self.key + ABSENT_SUFFIX),
+                         lambda f: absent_frame.to_parquet(f, index=False))
+            replace_file(os.path.join(self.cache_dir, self.key + PARAMETERS_SUFFIX),
+                         lambda f: parameters_frame.to_parquet(f, index=False))
+        except Exception as e:
+            logger.warning(f"Не удалось сохранить таблицы в кэш {self.cache_dir}: {e}")
+            return
+        self.set_latest()
+
+    def set_latest(self) -> None:
+        """ Запоминает эту версию формы как последнюю на датасете: от нее пересчитывается следующая правка """
+        latest = json.dumps({'key': self.key, 'form': self.description}, ensure_ascii=False).encode('utf-8')
+        try:
+            replace_file(os.path.join(self.cache_dir, self.lineage + LATEST_SUFFIX), lambda f: f.write(latest))
+        except OSError as e:
+            logger.warning(f"Не удалось запомнить последнюю версию формы в кэше {self.cache_dir}: {e}")
@@ -1,11 +1,87 @@
-from typing import List, Any
+import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import List, Any, Optional, Dict, Tuple
 
+import numpy as np
 import pandas as pd
 
 from CORE.datasets_wrappers.form_associated.exemplars_dataset import ExemplarsDataset
+from CORE.datasets_wrappers.form_associated.form_changes import find_form_changes
+from CORE.datasets_wrappers.form_associated.parametrised_cache import FramesCache
 from CORE.datasets_wrappers.form_associated.parametriser import Parametriser
 from CORE.db_dataclasses import Form
-from CORE.exeptions import CoreError
+from CORE.exeptions import CoreError, PazzleOutOfSignal, RunPazzleError
+from CORE.logger import get_logger
+from CORE.run import Exemplar
+from CORE.run.r_hc import R_HC
+from CORE.run.r_pc import R_PC
+
+logger = get_logger(__name__)
+
+# На сколько частей на процесс делить экземпляры при параллельной параметризации (выравнивает загрузку процессов)
+CHUNKS_PER_WORKER = 4
+
+
+@dataclass
+class FramesBlock:
+    """
+    Таблицы для подряд идущих экземпляров по столбцам: так их дешево передать из процесса пула
+    и собрать в DataFrame один раз (см. ParametrisedDataset.fill_frames)
+    """
+    ids: List[str]
+    params: Dict[str, np.ndarray]  # имя параметра -> значения: float64 (NaN - нет значения или измерен NaN) или object
+    absent: Dict[str, np.ndarray]  # имя параметра -> bool, True - значения у экземпляра нет (None)
+    violations: np.ndarray  # bool, строка - экземпляр, столбец - HC формы (в порядке ParametrisedDataset.hc_ids)
+
+
+def parametrise_block(parametriser: Parametriser, exemplars: List[Tuple[str, Exemplar]],
+                      hc_ids: List[str]) -> FramesBlock:
+    """
+    Параметризует экземпляры и проверяет на них жесткие условия формы параметризатора.
+
+    :param exemplars: пары (id экземпляра, экземпляр); в экземпляры дописываются параметры
+    :param hc_ids: id HC формы строками, в порядке столбцов матрицы нарушений
+    :raises RunPazzleError, PazzleOutOfSignal
+    """
+    form = parametriser.form
+    rows = []
+    violations = np.zeros((len(exemplars), len(hc_ids)), dtype=bool)
+    for row, (_, exemplar) in enumerate(exemplars):
+        parametriser.parametrise_from_form(exemplar, form)
+        parametriser.check_HCs_from_form(exemplar, form)
+        rows.append(exemplar.get_parameters())
+        failed_ids = {str(hc_id) for hc_id in exemplar.failed_HCs_ids}
+        violations[row] = [hc_id in failed_ids for hc_id in hc_ids]
+
+    names = dict.fromkeys(name for values in rows for name in values)
+    params = {name: _to_column([values.get(name) for values in rows]) for name in names}
+    absent = {name: np.array([values.get(name) is None for values in rows], dtype=bool) for name in names}
+    return FramesBlock(ids=[exemplar_id for exemplar_id, _ in exemplars], params=params, absent=absent,
+                       violations=violations)
+
+
+def _to_column(values: List[Any]) -> np.ndarray:
+    """ Значения параметра: float64, если все они - числа с плавающей точкой, иначе object """
+    if all(value is None or isinstance(value, float) for value in values):
+        return np.array([math.nan if value is None else value for value in values], dtype=np.float64)
+    return np.array(values, dtype=object)
+
+
+# --- Процесс пула параллельной параметризации: свой параметризатор на каждый процесс ---
+
+_worker_parametriser: Optional[Parametriser] = None
+
+
+def _init_worker(form: Form) -> None:
+    """ Инициализатор процесса пула: форма компилируется один раз на процесс """
+    global _worker_parametriser
+    _worker_parametriser = Parametriser(form)
+
+
+def _parametrise_chunk(exemplars: List[Tuple[str, Exemplar]], hc_ids: List[str]) -> FramesBlock:
+    return parametrise_block(_worker_parametriser, exemplars, hc_ids)
 
 
 class ParametrisedDataset:
@@ -20,7 +96,18 @@ class ParametrisedDataset:
     # Префикс для колонок с жесткими условиями
     HC_PREFIX = 'HC_'
 
-    def __init__(self, raw_exemplars: ExemplarsDataset, form: Form):
+    def __init__(self, raw_exemplars: ExemplarsDataset, form: Form, cache_dir: Optional[str] = None,
+                 workers: int = 1):
+        """
+        :param raw_exemplars: размеченные экземпляры формы; при параметризации в них дописываются параметры
+        :param form: форма, параметры и HC которой считаются
+        :param cache_dir: папка дискового кэша таблиц (см. parametrised_cache), None - не кэшировать.
+                          Таблицы из кэша берутся без параметризации, и экземпляры raw_exemplars тогда не меняются;
+                          если в кэше есть таблицы прежней версии формы, пересчитываются только затронутые
+                          правкой столбцы (см. update_frames, экземпляры тоже не меняются),
+                          а если это не удалось - все таблицы целиком
+        :param workers: число процессов для параметризации всех экземпляров (см. fill_frames)
+        """
         # Имена столбцов для обеих таблиц берем из спецификации формы
         self.param_names = [param.name for param in form.parameters]
         assert len(self.param_names) > 0, f"Форма {form.id} не содержит параметров"
@@ -33,43 +120,158 @@ class ParametrisedDataset:
         self.parameters_frame.attrs[
             'raw_name'] = raw_exemplars.form_dataset_name if raw_exemplars.form_dataset_name is not None else "unknown"
 
+        # Таблица отсутствующих значений параметров (те же столбцы): True - значения нет (None).
+        # В таблице параметров такие значения - NaN, как и измеренные NaN, а пересчету таблиц их надо различать
+        self.absent_frame = pd.DataFrame(columns=params_names)
+
         # Таблица id-ов нарушенных жестких условий для каждого экземпляра
         violations_columns = [self.ID_COLUMN] + self.hc_ids
         self.violations_frame = pd.DataFrame(columns=violations_columns)
 
-        # Заполняем обе таблицы
-        self.fill_frames(raw_exemplars, form)
+        # Заполняем обе таблицы: из кэша, если там есть посчитанные для этих формы и датасета,
+        # иначе пересчетом таблиц прежней версии формы или параметризацией всех экземпляров
+        cache = FramesCache.for_dataset(cache_dir, raw_exemplars, form) if cache_dir is not None else None
+        cached_frames = cache.load() if cache is not None else None
+        if cached_frames is not None:
+            self.parameters_frame, self.violations_frame, self.absent_frame = cached_frames
+            cache.set_latest()
+            return
+
+        previous = cache.load_previous() if cache is not None else None
+        updated = False
+        if previous is not None:
+            try:
+                updated = self.update_frames(raw_exemplars, form, *previous)
+            except (RunPazzleError, PazzleOutOfSignal) as e:
+                logger.warning(f"Не удалось пересчитать таблицы формы {form.id} по частям, "
+                               f"они будут посчитаны заново: {e}")
+        if not updated:
+            self.fill_frames(raw_exemplars, form, workers=workers)
+        if cache is not None and not self.parameters_frame.empty:
+            cache.save(self.parameters_frame, self.violations_frame, self.absent_frame)
+
+    def fill_frames(self, raw_exemplars: ExemplarsDataset, form: Form, workers: int = 1) -> None:
+        """
+        Параметризует все экземпляры и проверяет на них HC. Таблицы собираются один раз из блоков по столбцам.
 
-    def fill_frames(self, raw_exemplars: ExemplarsDataset, form: Form) -> None:
+        :param workers: число процессов. При workers > 1 экземпляры делятся на подряд идущие части
+                        и параметризуются в пуле процессов (форма компилируется один раз на процесс),
+                        а экземпляры raw_exemplars не меняются - параметры получают их копии в процессах.
+                        Запуск процессов занимает около секунды, так что пул окупается на тысячах экземпляров
+        :raises RunPazzleError, PazzleOutOfSignal
+        """
+        exemplars = list(raw_exemplars.exemplars.items())
+        hc_ids = [hc_id[len(self.HC_PREFIX):] for hc_id in self.hc_ids]
+        # схема компилируется и здесь: ее ошибки видны сразу, а не как сбой процесса пула
         exemplar_parametriser = Parametriser(form)
 
-        # Собираем данные для обоих фреймов
-        parameters_data = []
-        violations_data = []
-
-        for exemplar_id, exemplar in raw_exemplars.exemplars.items():
-            # Параметризуем экземпляр
-            exemplar_parametriser.parametrise_from_form(exemplar, form)
-            exemplar_parametriser.check_HCs_from_form(exemplar, form)
-
-            # Строка для таблицы параметров
-            param_row = {self.ID_COLUMN: exemplar_id}
-            param_row.update(exemplar._parameters)
-            parameters_data.append(param_row)
-
-            # Строка для таблицы нарушений
-            viol_row = {self.ID_COLUMN: exemplar_id}
-            for hc_id in self.hc_ids:
-                # Убираем префикс для поиска в exemplar.failed_HCs_ids
-                original_hc_id = hc_id.replace(self.HC_PREFIX, '')
-                viol_row[hc_id] = original_hc_id in [str(id) for id in exemplar.failed_HCs_ids]
-            violations_data.append(viol_row)
-
-        # Создаем фреймы из собранных данных
-        if parameters_data:
-            self.parameters_frame = pd.DataFrame(parameters_data)
-        if violations_data:
-            self.violations_frame = pd.DataFrame(violations_data)
+        if workers <= 1 or len(exemplars) < 2:
+            blocks = [parametrise_block(exemplar_parametriser, exemplars, hc_ids)]
+        else:
+            chunk_size = math.ceil(len(exemplars) / (workers * CHUNKS_PER_WORKER))
+            chunks = [exemplars[start:start + chunk_size] for start in range(0, len(exemplars), chunk_size)]
+            # spawn: fork процесса с потоками (BLAS, sklearn) может зависнуть
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                     initializer=_init_worker, initargs=(form,)) as executor:
+                blocks = list(executor.map(_parametrise_chunk, chunks, [hc_ids] * len(chunks)))
+
+        self._set_frames(blocks)
+
+    def _set_frames(self, blocks: List[FramesBlock]) -> None:
+        """ Собирает обе таблицы из блоков (в порядке блоков); без экземпляров таблицы остаются пустыми """
+        ids = [exemplar_id for block in blocks for exemplar_id in block.ids]
+        if not ids:
+            return
+
+        params_columns: Dict[str, Any] = {self.ID_COLUMN: ids}
+        absent_columns: Dict[str, Any] = {self.ID_COLUMN: ids}
+        for name in dict.fromkeys(name for block in blocks for name in block.params):
+            parts = [block.params.get(name, np.full(len(block.ids), math.nan)) for block in blocks]
+            if all(part.dtype == np.float64 for part in parts):
+                params_columns[name] = np.concatenate(parts)
+            else:
+                params_columns[name] = np.concatenate(parts).tolist()  # тип столбца выведет pandas
+            absent_columns[name] = np.concatenate([block.absent.get(name, np.ones(len(block.ids), dtype=bool))
+                                                   for block in blocks])
+        self.parameters_frame = pd.DataFrame(params_columns)
+        self.absent_frame = pd.DataFrame(absent_columns)
+
+        violations = np.vstack([block.violations for block in blocks])
+        violations_columns: Dict[str, Any] = {self.ID_COLUMN: ids}
+        for column, hc_id in enumerate(self.hc_ids):
+            violations_columns[hc_id] = violations[:, column]
+        self.violations_frame = pd.DataFrame(violations_columns)
+
+    def update_frames(self, raw_exemplars: ExemplarsDataset, form: Form, old_description: Dict[str, Any],
+                      old_parameters_frame: pd.DataFrame, old_violations_frame: pd.DataFrame,
+                      old_absent_frame: pd.DataFrame) -> bool:
+        """
+        Получает таблицы формы из таблиц ее прежней версии на тех же экземплярах: перезапускает только
+        PC и HC, затронутые правкой (см. find_form_changes), остальные столбцы берет из прежних таблиц.
+        Пазлы запускаются на потомках экземпляров raw_exemplars (с прежними значениями незатронутых параметров),
+        сами экземпляры не меняются - после ошибки их можно параметризовать целиком.
+
+        :param old_description: описание прежней версии формы (см. parametrised_cache.form_description)
+        :param old_parameters_frame: таблица параметров прежней версии формы
+        :param old_violations_frame: таблица нарушений HC прежней версии формы
+        :param old_absent_frame: таблица отсутствующих значений параметров прежней версии формы
+        :raises RunPazzleError, PazzleOutOfSignal
+        :return: False, если по частям пересчитать нельзя (тогда таблицы не меняются, нужен fill_frames)
+        """
+        exemplar_parametriser = Parametriser(form)
+        changes = find_form_changes(old_description, form, exemplar_parametriser.schema)
+        exemplar_ids = list(raw_exemplars.exemplars.keys())
+        if changes is None or any(frame[self.ID_COLUMN].tolist() != exemplar_ids
+                                  for frame in (old_parameters_frame, old_violations_frame, old_absent_frame)):
+            return False
+        logger.info(f"Пересчет таблиц формы {form.id} после правки: {len(changes.pcs)} PC, {len(changes.hcs)} HC")
+
+        kept_params = {name: old_parameters_frame[name].tolist() for name in old_parameters_frame.columns
+                       if name != self.ID_COLUMN and name not in changes.stale_params}
+        kept_absent = {name: old_absent_frame[name].tolist() for name in kept_params}
+        r_pcs = [R_PC(pc, form_points=form.points, form_params=form.parameters) for pc in changes.pcs]
+        r_hcs = [R_HC(hc, form_params=form.parameters) for hc in changes.hcs]
+        measured: Dict[str, List[Any]] = {name: [] for name in changes.stale_params}
+        measured_absent: Dict[str, List[bool]] = {name: [] for name in changes.stale_params}
+        checked: Dict[str, List[bool]] = {f"{self.HC_PREFIX}{hc.id}": [] for hc in changes.hcs}
+
+        for row, raw_exemplar in enumerate(raw_exemplars.exemplars.values()):
+            exemplar = raw_exemplar.make_child()
+            for name, values in kept_params.items():
+                # Отсутствующее значение не дописывается: PC, которому оно нужно, упадет, как при полном расчете
+                if not kept_absent[name][row]:
+                    exemplar.add_parameter(name, values[row])
+            exemplar_parametriser.parametrise(exemplar, r_pcs)
+            exemplar_parametriser.fit_conditions(exemplar, r_hcs)
+
+            for name, values in measured.items():
+                value = exemplar.get_parameter_value(name)
+                values.append(value)
+                measured_absent[name].append(value is None)
+            failed_ids = {str(hc_id) for hc_id in exemplar.failed_HCs_ids}
+            for hc in changes.hcs:
+                checked[f"{self.HC_PREFIX}{hc.id}"].append(str(hc.id) in failed_ids)
+
+        # Столбцы параметров - в порядке запуска PC, как при параметризации всех экземпляров
+        params_columns = {self.ID_COLUMN: old_parameters_frame[self.ID_COLUMN]}
+        absent_columns = {self.ID_COLUMN: old_absent_frame[self.ID_COLUMN]}
+        for name in exemplar_parametriser.schema.get_params_by_step_num(len(form.steps) - 1):
+            if name in params_columns:
+                continue
+            if name in kept_params:
+                params_columns[name] = old_parameters_frame[name]
+                absent_columns[name] = old_absent_frame[name]
+            elif name in measured:
+                params_columns[name] = _to_column(measured[name])
+                absent_columns[name] = np.array(measured_absent[name], dtype=bool)
+        self.parameters_frame = pd.DataFrame(params_columns)
+        self.absent_frame = pd.DataFrame(absent_columns)
+
+        violations_columns = {self.ID_COLUMN: old_violations_frame[self.ID_COLUMN]}
+        for hc_id in self.hc_ids:
+            violations_columns[hc_id] = checked[hc_id] if hc_id in checked else old_violations_frame[hc_id]
+        self.violations_frame = pd.DataFrame(violations_columns)
+        return True
 
     def get_merged_frame(self) -> pd.DataFrame:
         """
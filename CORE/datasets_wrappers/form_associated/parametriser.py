@@ -1,9 +1,10 @@
-from typing import List, Optional
+from typing import List, Optional, Dict
 
 from CORE.db_dataclasses import Form
 from CORE.exeptions import SchemaError
 from CORE.logger import get_logger
 from CORE.run import Exemplar
+from CORE.run.profiling import CONDITIONS, PARAMETRISE, RunObserver
 from CORE.run.r_hc import R_HC
 from CORE.run.r_pc import R_PC
 from CORE.run.schema import Schema
@@ -35,15 +36,28 @@ class Parametriser:
             self.schema = schema
             self.form = schema.form
 
+        # R_PC/R_HC создаются один раз и переиспользуются для всех экземпляров (см. R_PC.compile)
+        self._r_pcs_by_step: Dict[int, List[R_PC]] = {}
+        self._r_hcs: Optional[List[R_HC]] = None
+
+        # наблюдатель запусков (см. CORE.run.profiling), None - не наблюдать
+        self.observer: Optional[RunObserver] = None
+
     def _create_r_pcs_for_step(self, step_num: int) -> List[R_PC]:
-        """Создает R_PC объекты для указанного шага по схеме"""
-        base_pazzles = self.schema.get_PCs_by_step_num(step_num)
-        return [R_PC(base_pazzle=pc, form_points=self.form.points, form_params=self.form.parameters) for pc in
-                base_pazzles]
+        """Создает (при первом обращении) R_PC объекты для указанного шага по схеме"""
+        if step_num not in self._r_pcs_by_step:
+            base_pazzles = self.schema.get_PCs_by_step_num(step_num)
+            self._r_pcs_by_step[step_num] = [
+                R_PC(base_pazzle=pc, form_points=self.form.points, form_params=self.form.parameters)
+                for pc in base_pazzles]
+        return self._r_pcs_by_step[step_num]
 
     def _create_r_hcs(self) -> List[R_HC]:
-        """Создает R_HC объекты из HC_PC_objects формы"""
-        return [R_HC(pazzle, form_params=self.form.parameters) for pazzle in self.form.HC_PC_objects if pazzle.is_HC()]
+        """Создает (при первом обращении) R_HC объекты из HC_PC_objects формы"""
+        if self._r_hcs is None:
+            self._r_hcs = [R_HC(pazzle, form_params=self.form.parameters) for pazzle in self.form.HC_PC_objects
+                           if pazzle.is_HC()]
+        return self._r_hcs
 
     def _apply_r_pcs(self, exemplar: Exemplar, r_pcs: List[R_PC]) -> None:
         """Применяет список R_PC к экземпляру"""
@@ -85,7 +99,10 @@ class Parametriser:
         :param r_pcs: список готовых объектов R_PC
         :raises PazzleOutOfSignal, RunPazzleError
         """
-        self._apply_r_pcs(exemplar, r_pcs)
+        if self.observer is not None:
+            self.observer.observe(PARAMETRISE, self.form.id, self.form.name, self._apply_r_pcs, exemplar, r_pcs)
+        else:
+            self._apply_r_pcs(exemplar, r_pcs)
 
     def check_HCs_from_form(self, exemplar: Exemplar, form: Form) -> bool:
         """
@@ -106,4 +123,6 @@ class Parametriser:
         :raises RunPazzleError
         :return: True если все условия выполнены
         """
+        if self.observer is not None:
+            return self.observer.observe(CONDITIONS, self.form.id, self.form.name, self._apply_r_hcs, exemplar, r_hcs)
         return self._apply_r_hcs(exemplar, r_hcs)
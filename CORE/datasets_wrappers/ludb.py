@@ -1,36 +1,118 @@
+import hashlib
 import json
 import os
-from typing import Optional, List
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
 
 from CORE.datasets_wrappers.third_party_dataset import ThirdPartyDataset
 from CORE.enums import LEADS_NAMES
-from CORE.paths import LUDB_JSON_PATH
+from CORE.logger import get_logger
+from CORE.paths import LUDB_JSON_PATH, LUDB_STORE_PATH
 from CORE.signal_1d import Signal
+from CORE.utils import replace_file
+
+logger = get_logger(__name__)
+
+# Файлы бинарного хранилища LUDB (см. convert_ludb_json)
+SIGNALS_FILE = 'signals.npy'
+INDEX_FILE = 'index.json'
+
+
+def convert_ludb_json(json_path: str = LUDB_JSON_PATH, store_path: str = LUDB_STORE_PATH) -> None:
+    """
+    Однократно переводит JSON LUDB в бинарное хранилище в папке store_path:
+    signals.npy - все отведения всех пациентов подряд одним массивом float64 в милливольтах,
+    index.json - пациент -> отведение -> [начало, длина] в этом массиве (порядок пациентов как в JSON).
+    Файлы пишутся через временные и подменяются целиком, так что недописанное хранилище не прочитается.
+
+    Raises:
+        FileNotFoundError: Если файл json_path не найден.
+        json.JSONDecodeError: Если файл содержит некорректный JSON.
+    """
+    if not os.path.exists(json_path):
+        raise FileNotFoundError(f"Файл LUDB не найден: {json_path}")
+
+    try:
+        with open(json_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except json.JSONDecodeError as e:
+        raise json.JSONDecodeError(
+            f"Ошибка парсинга JSON в файле {json_path}: {e}", e.doc, e.pos
+        ) from e
+
+    index: Dict[str, Dict[str, Tuple[int, int]]] = {}
+    blocks = []
+    offset = 0
+    for patient_id, patient in data.items():
+        index[patient_id] = {}
+        for lead_name, lead in patient['Leads'].items():
+            # Исходные данные в мкВ, храним сразу в мВ - ровно те же числа, что и деление каждого отсчета на 1000
+            block = np.asarray(lead['Signal'], dtype=np.float64) / 1000
+            index[patient_id][lead_name] = (offset, len(block))
+            blocks.append(block)
+            offset += len(block)
+    signals = np.concatenate(blocks) if blocks else np.zeros(0)
+
+    os.makedirs(store_path, exist_ok=True)
+    replace_file(os.path.join(store_path, SIGNALS_FILE), lambda f: np.save(f, signals))
+    # индекс пишется последним: по нему проверяется, что хранилище готово (см. is_store_fresh)
+    replace_file(os.path.join(store_path, INDEX_FILE),
+                 lambda f: f.write(json.dumps(index, ensure_ascii=False).encode('utf-8')))
+    logger.info(f"LUDB переведен в бинарное хранилище {store_path}: {len(index)} пациентов, {offset} отсчетов")
+
+
+def is_store_fresh(json_path: str = LUDB_JSON_PATH, store_path: str = LUDB_STORE_PATH) -> bool:
+    """ Есть ли готовое хранилище, не старее JSON (если JSON нет - достаточно хранилища) """
+    index_path = os.path.join(store_path, INDEX_FILE)
+    if not os.path.exists(index_path) or not os.path.exists(os.path.join(store_path, SIGNALS_FILE)):
+        return False
+    return not os.path.exists(json_path) or os.path.getmtime(json_path) <= os.path.getmtime(index_path)
 
 
 class LUDB(ThirdPartyDataset):
-    def __init__(self):
+    def __init__(self, json_path: str = LUDB_JSON_PATH, store_path: str = LUDB_STORE_PATH):
         """
             Обертка для работы с датасетом LUDB.
-            Загружает данные из JSON-файла и предоставляет методы для доступа к ним.
+            Сигналы читаются из бинарного хранилища (см. convert_ludb_json), отображенного в память:
+            в память процесса попадают только те отведения, которые запрашиваются.
+            Если хранилища нет или JSON новее его, оно один раз строится из JSON.
 
-            Attributes:
-                _data (dict): Загруженные данные датасета
+            Args:
+                json_path: исходный JSON LUDB (ecg_data_200.json)
+                store_path: папка бинарного хранилища
 
             Raises:
-                FileNotFoundError: Если файл LUDB_JSON_PATH не найден.
+                FileNotFoundError: Если нет ни хранилища, ни файла json_path.
                 json.JSONDecodeError: Если файл содержит некорректный JSON.
             """
-        if not os.path.exists(LUDB_JSON_PATH):
-            raise FileNotFoundError(f"Файл LUDB не найден: {LUDB_JSON_PATH}")
+        self.json_path = json_path
+        self.store_path = store_path
+        if not is_store_fresh(json_path, store_path):
+            logger.info(f"Бинарное хранилище LUDB не найдено или устарело, строим из {json_path}")
+            convert_ludb_json(json_path, store_path)
+        self._open_store()
 
-        try:
-            with open(LUDB_JSON_PATH, 'r', encoding='utf-8') as f:
-                self._data = json.load(f)
-        except json.JSONDecodeError as e:
-            raise json.JSONDecodeError(
-                f"Ошибка парсинга JSON в файле {LUDB_JSON_PATH}: {e}", e.doc, e.pos
-            ) from e
+    def _open_store(self) -> None:
+        with open(os.path.join(self.store_path, INDEX_FILE), 'rb') as f:
+            index_bytes = f.read()
+        self._index: Dict[str, Dict[str, List[int]]] = json.loads(index_bytes)
+        signals_path = os.path.join(self.store_path, SIGNALS_FILE)
+        self._signals: np.ndarray = np.load(signals_path, mmap_mode='r')
+        # хранилище пересобирается только целиком (см. convert_ludb_json), поэтому индекса
+        # и размера с временем изменения файла сигналов достаточно, чтобы заметить пересборку
+        signals_stat = os.stat(signals_path)
+        self._fingerprint = hashlib.sha256(
+            index_bytes + f"{signals_stat.st_size}:{signals_stat.st_mtime_ns}".encode()).hexdigest()
+
+    def __getstate__(self):
+        """ В другой процесс передаются только пути: хранилище там отображается в память заново, а не копируется """
+        return {'json_path': self.json_path, 'store_path': self.store_path}
+
+    def __setstate__(self, state):
+        self.json_path = state['json_path']
+        self.store_path = state['store_path']
+        self._open_store()
 
     def get_1d_signal(self, patient_id:str, lead_name:LEADS_NAMES)->Optional[Signal]:
         """
@@ -45,16 +127,20 @@ class LUDB(ThirdPartyDataset):
                     если сигнал не найден
 
                 Note:
-                    Исходные данные в LUDB представлены в мквольтах, поэтому при создании Signal
-                    выполняется преобразование в милливольты
+                    Исходные данные в LUDB представлены в мквольтах, в хранилище они уже переведены
+                    в милливольты, поэтому сигнал - срез отображенного в память массива, без копирования
         """
-        signal_mkV= self._data[patient_id]['Leads'][lead_name]['Signal']
-        signal_mV = [s / 1000 for s in signal_mkV]
-        signal = Signal(signal_mv=signal_mV)
-        return signal
+        location = self._index.get(patient_id, {}).get(lead_name)
+        if location is None:
+            return None
+        start, length = location
+        return Signal(signal_mv=self._signals[start:start + length])
 
     def get_patients_ids(self)->List[str]:
-        return list(self._data.keys()) if self._data else []
+        return list(self._index.keys())
+
+    def get_fingerprint(self) -> Optional[str]:
+        return self._fingerprint
 
 if __name__ == "__main__":
     ludb = LUDB()
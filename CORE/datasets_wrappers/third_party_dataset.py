@@ -32,3 +32,12 @@ class ThirdPartyDataset(ABC):
         Returns: Спискок id пациентов
         """
         pass
+
+    def get_fingerprint(self) -> Optional[str]:
+        """
+        Отпечаток содержимого датасета: меняется, если могли измениться сигналы.
+        По нему узнается, что посчитанное на сигналах датасета можно не пересчитывать
+        (см. ExemplarsDataset.get_fingerprint).
+        Returns: строка-отпечаток или None, если датасет не умеет его давать (тогда ничего не кэшируется)
+        """
+        return None
@@ -68,6 +68,11 @@ class RunPazzleError(CoreError):
         self.error = error
         # Убрали автоматическое логирование
 
+    def __reduce__(self):
+        """ Чтобы исключение из процесса пула (см. ParametrisedDataset) восстанавливалось со всеми полями """
+        return self.__class__, (self.code, str(self), self.pazzle_id, self.absent_points, self.absent_params,
+                                self.class_name, self.error)
+
     @classmethod
     def selected_point_out_of_interval(cls, left_t: float, right_t: float,
                                        point: float, class_name: str, pazzle_id: int) -> 'RunPazzleError':
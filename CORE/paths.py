@@ -15,6 +15,11 @@ EXEMPLARS_DATASETS_PATH = os.path.join(BASE_DIR, "data", "forms_datasets")
 
 # Внешние датасеты
 LUDB_JSON_PATH = os.path.join(BASE_DIR, "data", "ecg_data_200.json")
+# Бинарное хранилище сигналов LUDB, строится из LUDB_JSON_PATH (см. datasets_wrappers.ludb)
+LUDB_STORE_PATH = os.path.join(BASE_DIR, "data", "ludb_store")
+
+# Кэш таблиц параметров и нарушений HC, посчитанных ParametrisedDataset (см. parametrised_cache)
+PARAMETRISED_CACHE_PATH = os.path.join(BASE_DIR, "data", "parametrised_cache")
 
 
 def create_directories():
@@ -8,18 +8,11 @@ class GlobalMaxSelector(PSBase):
     """ Глобальный максимум на интервале"""
 
     def run(self, signal: Signal, left_t: Optional[float] = None, right_t: Optional[float] = None) -> List[float]:
-        # Обработка пустых left_t и right_t
-        if left_t is None:
-            left_t = signal.time[0]
-        if right_t is None:
-            right_t = signal.time[-1]
-        interval = signal.get_fragment(left_t, right_t)
-
-        # Находим индексы точек глобального максимума
-        ts_indices = [t for t, x in enumerate(interval.signal_mv) if x == max(interval.signal_mv)]
-
-        # По индексам восстанавливаем точки во времени
-        ts_of_maxs = [interval.time[t] for t in ts_indices]
+        interval = self.get_interval(signal, left_t, right_t)
+
+        # Все отсчеты, равные глобальному максимуму, за один проход по интервалу
+        values = interval.signal_mv
+        ts_of_maxs = interval.time[values == values.max()].tolist()
 
         return ts_of_maxs
 
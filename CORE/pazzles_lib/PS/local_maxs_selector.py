@@ -1,6 +1,5 @@
 from typing import Optional, List
 
-import numpy as np
 from scipy.signal import find_peaks
 
 from CORE.pazzles_lib.ps_base import PSBase
@@ -11,15 +10,10 @@ class LocalMaxsSelector(PSBase):
     """Все локальные максимумы на интервале"""
 
     def run(self, signal: Signal, left_t: Optional[float] = None, right_t: Optional[float] = None) -> List[float]:
-        # Обработка пустых left_t и right_t
-        if left_t is None:
-            left_t = signal.time[0]
-        if right_t is None:
-            right_t = signal.time[-1]
-        interval = signal.get_fragment(left_t, right_t)
-
-        inds_of_maxs = find_peaks(np.array(interval.signal_mv), threshold=1e-4)[0]
-        ts_of_maxs = [interval.time[x] for x in inds_of_maxs]
+        interval = self.get_interval(signal, left_t, right_t)
+
+        inds_of_maxs = find_peaks(interval.signal_mv, threshold=1e-4)[0]
+        ts_of_maxs = interval.time[inds_of_maxs].tolist()
         return ts_of_maxs
 
 
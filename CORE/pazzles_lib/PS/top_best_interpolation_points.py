@@ -16,38 +16,65 @@ class TopBestInterpolationPoints(PSBase):
         self.N = N
 
     def run(self, signal: Signal, left_t: Optional[float] = None, right_t: Optional[float] = None) -> List[float]:
-        # Обработка пустых left_t и right_t
-        if left_t is None:
-            left_t = signal.time[0]
-        if right_t is None:
-            right_t = signal.time[-1]
-        interval = signal.get_fragment(left_t, right_t)
-
-        # Переводим временные отрезки и импульсы в точки в двумерном пространстве
-        points = [(x, y) for x, y in list(zip(interval.time, interval.signal_mv))]
-
-        # Метод линейной интерполяции
-        def interpolate(x, a, b):
-            x1, y1 = a
-            x2, y2 = b
-            return y1 + (y2 - y1) * (x - x1) / (x2 - x1)
-
-        # Вычисляем среднеквадратичную ошибку в каждой точке
-        mses = []
-        for i in range(len(interval.time)):
-            sum_error = 0.0
-            for (x, y) in points[1:i]:
-                y_interp = interpolate(x, points[1], points[i])
-                sum_error += (y - y_interp) ** 2
-            for (x, y) in points[i + 1:len(interval.time)]:
-                y_interp = interpolate(x, points[i], points[len(interval.time) - 1])
-                sum_error += (y - y_interp) ** 2
-            mses.append(np.mean(sum_error))
+        interval = self.get_interval(signal, left_t, right_t)
+
+        # Суммарная квадратичная ошибка интерполяции для каждой точки-кандидата
+        errors = self._interpolation_errors(interval.time, interval.signal_mv)
 
         # Выбираем N лучших кандидатов
-        ts_indices = np.argsort(mses)[:self.N]
-        ts_of_best = [interval.time[t] for t in ts_indices]
-        return ts_of_best
+        best = self._top_n_indices(errors, self.N)
+        return interval.time[best].tolist()
+
+    @staticmethod
+    def _interpolation_errors(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """
+        Для каждого i считает суммарную квадратичную ошибку двух линейных интерполяций:
+        прямой через точки 1 и i по точкам 1..i-1 и прямой через точки i и n-1 по точкам i+1..n-1.
+
+        Ошибка прямой с наклоном s через опорную точку (x0, y0) по набору точек раскладывается как
+        sum(dy^2) - 2*s*sum(dx*dy) + s^2*sum(dx^2), где dx = x - x0, dy = y - y0. Опорные точки у
+        первого отрезка (точка 1) и у второго (точка n-1) общие для всех i, поэтому суммы
+        для всех i берутся из префиксных (суффиксных) сумм за O(n).
+        """
+        n = len(x)
+        errors = np.zeros(n)
+
+        # Отрезок 1: i = 2..n-1, точки 1..i-1, опорная точка 1
+        if n > 2:
+            dx = x[1:] - x[1]
+            dy = y[1:] - y[1]
+            sxx = np.cumsum(dx * dx)[:n - 2]
+            sxy = np.cumsum(dx * dy)[:n - 2]
+            syy = np.cumsum(dy * dy)[:n - 2]
+            slope = dy[1:] / dx[1:]
+            errors[2:] += syy - 2 * slope * sxy + slope * slope * sxx
+
+        # Отрезок 2: i = 0..n-2, точки i+1..n-1, опорная точка n-1
+        if n > 1:
+            dx = x - x[-1]
+            dy = y - y[-1]
+            sxx = np.cumsum((dx * dx)[::-1])[::-1][1:]
+            sxy = np.cumsum((dx * dy)[::-1])[::-1][1:]
+            syy = np.cumsum((dy * dy)[::-1])[::-1][1:]
+            slope = dy[:-1] / dx[:-1]
+            errors[:-1] += syy - 2 * slope * sxy + slope * slope * sxx
+
+        # Сумма квадратов не бывает отрицательной, минус может дать только погрешность округления
+        return np.maximum(errors, 0.0)
+
+    @staticmethod
+    def _top_n_indices(errors: np.ndarray, n_best: int) -> np.ndarray:
+        """ Индексы n_best наименьших ошибок по возрастанию ошибки (при равенстве - по индексу) """
+        if n_best <= 0:
+            return np.empty(0, dtype=int)
+        if n_best < len(errors):
+            # Граница отбора через argpartition, все равные ей значения тоже берем в кандидаты
+            threshold = errors[np.argpartition(errors, n_best - 1)[n_best - 1]]
+            candidates = np.flatnonzero(errors <= threshold)
+        else:
+            candidates = np.arange(len(errors))
+        order = np.lexsort((candidates, errors[candidates]))
+        return candidates[order[:n_best]]
 
 
 # Пример использования
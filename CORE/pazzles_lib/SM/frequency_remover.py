@@ -1,4 +1,3 @@
-from copy import deepcopy
 from typing import Optional
 
 import numpy as np
@@ -42,8 +41,7 @@ class FrequencyFilter(SMBase):
         :param right_t: Правая граница в секундах (если None - до конца)
         :return: Отфильтрованный сигнал
         """
-        res_signal = deepcopy(signal)
-        sampling_rate = res_signal.frequency
+        sampling_rate = signal.frequency
 
         # Проверка частоты среза
         nyquist_freq = sampling_rate / 2
@@ -51,26 +49,14 @@ class FrequencyFilter(SMBase):
             raise ValueError(
                 f"Частота среза ({self.cutoff_freq} Гц) должна быть меньше частоты Найквиста ({nyquist_freq} Гц)")
 
-        # Определяем границы обрабатываемого участка
-        if left_t is not None:
-            left_idx = int(left_t * sampling_rate)
-        else:
-            left_idx = 0
-
-        if right_t is not None:
-            right_idx = int(right_t * sampling_rate)
-        else:
-            right_idx = len(res_signal.signal_mv)
-
-        # Проверяем границы
-        left_idx = max(0, left_idx)
-        right_idx = min(len(res_signal.signal_mv), right_idx)
+        # Определяем границы обрабатываемого участка (с учетом границ сигнала)
+        left_idx, right_idx = signal.get_window_indices(left_t, right_t)
 
         if left_idx >= right_idx:
-            return res_signal
+            return signal
 
         # Выделяем часть сигнала для обработки
-        signal_part = np.array(res_signal.signal_mv[left_idx:right_idx])
+        signal_part = signal.signal_mv[left_idx:right_idx]
 
         # Вычисляем ДПФ
         signal_fft = rfft(signal_part)
@@ -115,10 +101,8 @@ class FrequencyFilter(SMBase):
         # Обратное преобразование Фурье
         filtered_signal_part = irfft(filtered_fft, n=len(signal_part))
 
-        # Обновляем только указанную часть сигнала
-        res_signal.signal_mv[left_idx:right_idx] = filtered_signal_part.tolist()
-
-        return res_signal
+        # Новый сигнал отличается от исходного только указанной частью
+        return signal.patched(left_idx, filtered_signal_part)
 
 
 # Пример использования
@@ -1,4 +1,3 @@
-from copy import deepcopy
 from typing import Optional
 
 import numpy as np
@@ -20,33 +19,20 @@ class GaussianSmooth(SMBase):
         self.kernel_size_int = kernel_size_t
 
     def run(self, signal: Signal, left_t:Optional[float]=None, right_t:Optional[float]=None) -> Signal:
-        res_signal = deepcopy(signal)
-        sampling_rate = res_signal.frequency
+        sampling_rate = signal.frequency
 
-        # Переводим секунды в отсчеты
-        if left_t is not None:
-            left_idx = int(left_t * sampling_rate)
-        else:
-            left_idx = 0
-
-        if right_t is not None:
-            right_idx = int(right_t * sampling_rate)
-        else:
-            right_idx = len(res_signal.signal_mv)
-
-        # Проверяем границы
-        left_idx = max(0, left_idx)
-        right_idx = min(len(res_signal.signal_mv), right_idx)
+        # Переводим секунды в отсчеты (с учетом границ сигнала)
+        left_idx, right_idx = signal.get_window_indices(left_t, right_t)
 
         if left_idx >= right_idx:
-            return res_signal
+            return signal
 
         # Создаем гауссово ядро
         kernel_size_samples = int(self.kernel_size_int * sampling_rate)
 
         # Корректируем размер ядра при необходимости
         if kernel_size_samples >= (right_idx - left_idx) or kernel_size_samples < 1:
-            return res_signal
+            return signal
 
         # Гарантируем нечетность ядра
         if kernel_size_samples % 2 == 0:
@@ -60,20 +46,21 @@ class GaussianSmooth(SMBase):
         kernel = kernel / np.sum(kernel)  # нормализуем
 
         # Выделяем часть сигнала для сглаживания
-        signal_to_smooth = res_signal.signal_mv[left_idx:right_idx]
+        signal_mv = signal.signal_mv
+        signal_to_smooth = signal_mv[left_idx:right_idx]
 
         # Добавляем границы для минимизации краевых эффектов
         pad_width = kernel_size_samples // 2
 
         # Если слева от участка есть данные, используем их для padding
         if left_idx > 0:
-            left_pad = res_signal.signal_mv[max(0, left_idx - pad_width):left_idx]
+            left_pad = signal_mv[max(0, left_idx - pad_width):left_idx]
         else:
             left_pad = signal_to_smooth[:pad_width][::-1]  # зеркальное отражение
 
         # Если справа от участка есть данные, используем их для padding
-        if right_idx < len(res_signal.signal_mv):
-            right_pad = res_signal.signal_mv[right_idx:min(len(res_signal.signal_mv), right_idx + pad_width)]
+        if right_idx < len(signal_mv):
+            right_pad = signal_mv[right_idx:min(len(signal_mv), right_idx + pad_width)]
         else:
             right_pad = signal_to_smooth[-pad_width:][::-1]  # зеркальное отражение
 
@@ -86,10 +73,8 @@ class GaussianSmooth(SMBase):
         # Извлекаем центральную часть (без padding)
         smoothed_part = smoothed_padded[len(left_pad):len(left_pad) + len(signal_to_smooth)]
 
-        # Обновляем только указанную часть сигнала
-        res_signal.signal_mv[left_idx:right_idx] = smoothed_part.tolist()
-
-        return res_signal
+        # Новый сигнал отличается от исходного только указанной частью
+        return signal.patched(left_idx, smoothed_part)
 
 
 # Пример использования
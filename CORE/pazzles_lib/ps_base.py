@@ -18,3 +18,17 @@ class PSBase(ABC):
         :return: список координат точек, выбранных в качестве ключевых алгоритмом этого пазла
         """
         pass
+
+    @staticmethod
+    def get_interval(signal: Signal, left_t: Optional[float] = None, right_t: Optional[float] = None) -> Signal:
+        """
+        Фрагмент сигнала на интервале поиска [left_t, right_t] (пустая граница - край сигнала).
+        Фрагмент - представление исходного сигнала без копирования отсчетов.
+
+        :raises ValueError: если интервал не пересекается с сигналом
+        """
+        if left_t is None:
+            left_t = signal.time[0]
+        if right_t is None:
+            right_t = signal.time[-1]
+        return signal.get_fragment(left_t, right_t)
@@ -15,7 +15,9 @@ class SMBase(ABC):
          необходимость изменить весь сигнал.
          В данном интервале будут искать особые точки PS-пазлы этого трека.
 
-         Изменять нужно deepcopy исходного сигнала. Исходный сигнал не менять.
+         Исходный сигнал доступен только на чтение (его массивы защищены от записи) и копировать его не нужно.
+         Результат - новый сигнал: обычно это signal.patched(left_idx, новые_значения_в_окне), который
+         разделяет с исходным временную ось. Если алгоритму нечего менять, можно вернуть сам входной сигнал.
 
 
         :raise PazzleOutOfSignal, если логика пазла потребовала обращения за пределы предоставленного сигнала
@@ -1,3 +1,3 @@
-from CORE.run.exemplar import Exemplar
+from CORE.run.exemplar import Exemplar, ExemplarLayout
 
-__all__ = ['Exemplar']
+__all__ = ['Exemplar', 'ExemplarLayout']
@@ -0,0 +1,233 @@
+"""
+Пакетное (без GUI) распознавание формы на всех записях датасета экземпляров.
+
+Записи раздаются пулу процессов: каждый процесс один раз собирает свою RForm (компиляция пазлов,
+подготовка оценщика) и дальше только запускает ее на сигналах. Результаты пишутся в файл
+JSON Lines (одна строка на запись) по мере готовности, в порядке завершения.
+
+Пример:
+    python -m CORE.run.batch --form-id 1 --dataset qrs.json --workers 8 --output qrs_results.jsonl
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from copy import deepcopy
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Type
+
+import numpy as np
+
+from CORE import Signal
+from CORE.datasets_wrappers.form_associated.exemplars_dataset import ExemplarsDataset
+from CORE.datasets_wrappers.form_associated.parametrised_dataset import ParametrisedDataset
+from CORE.db_dataclasses import Form
+from CORE.logger import get_logger, setup_logging
+from CORE.paths import DB_PATH, PARAMETRISED_CACHE_PATH
+from CORE.run import Exemplar
+from CORE.run.eval import positive_only
+from CORE.run.eval.base_eval import BaseEvaluator
+from CORE.run.exemplars_pool import ExemplarsPool
+from CORE.run.r_form import RForm
+
+logger = get_logger(__name__)
+
+DEFAULT_EVALUATOR = 'OneClassSVMEvaluator'
+
+
+@dataclass
+class BatchTask:
+    """ Одна запись датасета для распознавания: сигнал и точка, куда кидаем первую точку формы """
+    entry_id: str
+    signal_mv: np.ndarray
+    frequency: int
+    seminal_point: float
+    true_points: Dict[str, float]  # ручная разметка записи, для последующей сверки
+
+
+def load_form(form_id: int, db_path: str = DB_PATH) -> Form:
+    """ Загружает форму из базы со всеми шагами, треками и пазлами """
+    from CORE.db.db_manager import DBManager
+    from CORE.db.forms_services import FormService
+
+    with DBManager(db_path).get_connection() as conn:
+        form = FormService().get_form_by_id(conn=conn, form_id=form_id)
+    if form is None:
+        raise ValueError(f"Форма {form_id} не найдена в базе {db_path}")
+    return form
+
+
+def get_evaluator_class(name: str) -> Type[BaseEvaluator]:
+    """ Класс оценщика по имени (оценщики, обучаемые только на позитивной выборке) """
+    if name not in positive_only.__all__:
+        raise ValueError(f"Неизвестный оценщик {name}, доступны: {', '.join(positive_only.__all__)}")
+    return getattr(positive_only, name)
+
+
+def build_evaluator(form: Form, dataset: ExemplarsDataset, evaluator_class: Type[BaseEvaluator],
+                    cache_dir: Optional[str] = PARAMETRISED_CACHE_PATH, workers: int = 1) -> BaseEvaluator:
+    """
+    Обучает оценщик на параметрах размеченных экземпляров датасета (как в симуляторе).
+    cache_dir - папка кэша таблиц ParametrisedDataset, None - параметризовать заново;
+    workers - число процессов для параметризации
+    """
+    # параметризация дописывает параметры в экземпляры, поэтому работаем с копией
+    parametrised_dataset = ParametrisedDataset(form=form, raw_exemplars=deepcopy(dataset), cache_dir=cache_dir,
+                                               workers=workers)
+    try:
+        return evaluator_class(positive_dataset=parametrised_dataset)
+    except TypeError:
+        return evaluator_class()
+
+
+def make_tasks(form: Form, dataset: ExemplarsDataset, seminal_shift: float = 0.0) -> List[BatchTask]:
+    """
+    Задачи для всех записей датасета. Первая точка формы кидается в размеченную координату
+    первой точки, сдвинутую на seminal_shift секунд. Записи без этой точки пропускаются.
+    """
+    first_point = form.points[0].name
+    tasks = []
+    for entry_id in dataset.get_all_ids():
+        exemplar = dataset.get_exemplar_by_id(entry_id)
+        coord = exemplar.get_point_coord(first_point)
+        if coord is None:
+            logger.warning(f"Запись {entry_id} пропущена: нет точки {first_point}")
+            continue
+        signal = exemplar.get_signal()
+        true_points = {point.name: exemplar.get_point_coord(point.name) for point in form.points
+                       if exemplar.contains_point(point.name)}
+        tasks.append(BatchTask(entry_id=entry_id, signal_mv=np.asarray(signal.signal_mv), frequency=signal.frequency,
+                               seminal_point=coord + seminal_shift, true_points=true_points))
+    return tasks
+
+
+def exemplar_to_dict(exemplar: Exemplar, point_names: Sequence[str]) -> Dict[str, Any]:
+    """ Итоговый экземпляр в виде, пригодном для json """
+    return {
+        'evaluation_result': exemplar.evaluation_result,
+        'points': {name: exemplar.get_point_coord(name) for name in point_names if exemplar.contains_point(name)},
+        'parameters': {name: exemplar.get_parameter_value(name) for name in exemplar.get_param_names()},
+    }
+
+
+def pool_to_result(task: BatchTask, pool: Optional[ExemplarsPool], point_names: Sequence[str],
+                   elapsed_s: float, error: Optional[str] = None) -> Dict[str, Any]:
+    """ Строка выходного файла для одной записи """
+    return {
+        'id': task.entry_id,
+        'seminal_point': task.seminal_point,
+        'true_points': task.true_points,
+        'exemplars': [exemplar_to_dict(exemplar, point_names) for exemplar in pool] if pool is not None else [],
+        'elapsed_s': elapsed_s,
+        'error': error,
+    }
+
+
+# --- Процесс-обработчик: своя RForm на каждый процесс ---
+
+_worker_rform: Optional[RForm] = None
+
+
+def _init_worker(form: Form, evaluator: BaseEvaluator, max_pool_size: int) -> None:
+    """ Инициализатор процесса пула: форма компилируется один раз на процесс """
+    global _worker_rform
+    _worker_rform = RForm(form, evaluator=evaluator, max_pool_size=max_pool_size)
+
+
+def _run_task(task: BatchTask) -> Dict[str, Any]:
+    """ Распознает форму на одной записи. Ошибка на записи не останавливает пакет, а попадает в результат """
+    point_names = [point.name for point in _worker_rform.form.points]
+    start = time.perf_counter()
+    try:
+        signal = Signal(signal_mv=task.signal_mv, frequency=task.frequency)
+        pool = _worker_rform.run(signal, task.seminal_point)
+        return pool_to_result(task, pool, point_names, time.perf_counter() - start)
+    except Exception as e:
+        logger.exception(f"Ошибка распознавания записи {task.entry_id}: {e}")
+        return pool_to_result(task, None, point_names, time.perf_counter() - start, error=f"{type(e).__name__}: {e}")
+
+
+def _to_json(value: Any) -> Any:
+    """ numpy-скаляры и массивы в параметрах экземпляров """
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Не сериализуется в json: {type(value).__name__}")
+
+
+def run_batch(form: Form, evaluator: BaseEvaluator, tasks: Iterable[BatchTask], output_path: str,
+              workers: int = 1, max_pool_size: int = 5) -> int:
+    """
+    Распознает форму на всех задачах и пишет результаты в output_path (JSON Lines).
+
+    :param form: форма
+    :param evaluator: обученный оценщик, копируется в каждый процесс
+    :param tasks: записи для распознавания
+    :param output_path: выходной файл, перезаписывается
+    :param workers: число процессов; 1 - все в текущем процессе, без пула
+    :param max_pool_size: сколько лучших экземпляров оставлять после каждого шага
+    :return: число записанных результатов
+    """
+    tasks = list(tasks)
+    written = 0
+    with open(output_path, 'w', encoding='utf-8') as output:
+        def write(result: Dict[str, Any]) -> None:
+            nonlocal written
+            output.write(json.dumps(result, ensure_ascii=False, default=_to_json) + '\n')
+            output.flush()  # результат на диске сразу, даже если пакет прервут
+            written += 1
+            if written % 100 == 0 or written == len(tasks):
+                logger.info(f"Обработано записей: {written}/{len(tasks)}")
+
+        if workers <= 1:
+            _init_worker(form, evaluator, max_pool_size)
+            for task in tasks:
+                write(_run_task(task))
+            return written
+
+        # spawn: fork процесса с потоками (BLAS, sklearn) может зависнуть
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_worker, initargs=(form, evaluator, max_pool_size)) as executor:
+            futures = [executor.submit(_run_task, task) for task in tasks]
+            for future in as_completed(futures):
+                write(future.result())
+    return written
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    from CORE.datasets_wrappers.ludb import LUDB
+
+    parser = argparse.ArgumentParser(description="Пакетное распознавание формы на записях датасета экземпляров")
+    parser.add_argument('--form-id', type=int, required=True, help="id формы в базе")
+    parser.add_argument('--dataset', help="json-датасет экземпляров (по умолчанию - датасет формы)")
+    parser.add_argument('--output', default='batch_results.jsonl', help="выходной файл JSON Lines")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="число процессов")
+    parser.add_argument('--evaluator', default=DEFAULT_EVALUATOR, help="класс оценщика")
+    parser.add_argument('--max-pool-size', type=int, default=5, help="размер пула экземпляров на шаге")
+    parser.add_argument('--seminal-shift', type=float, default=0.0,
+                        help="сдвиг (с) стартовой точки от размеченной координаты первой точки формы")
+    parser.add_argument('--db', default=DB_PATH, help="путь к базе форм")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="не брать параметры датасета из кэша, а параметризовать заново")
+    args = parser.parse_args(argv)
+
+    setup_logging(level=logging.INFO)
+    logger.setLevel(logging.INFO)  # логгер модуля создан до настройки
+
+    form = load_form(args.form_id, args.db)
+    dataset = ExemplarsDataset(form_dataset_name=args.dataset or form.path_to_dataset, outer_dataset=LUDB())
+    evaluator = build_evaluator(form, dataset, get_evaluator_class(args.evaluator),
+                                cache_dir=None if args.no_cache else PARAMETRISED_CACHE_PATH, workers=args.workers)
+    tasks = make_tasks(form, dataset, seminal_shift=args.seminal_shift)
+
+    start = time.perf_counter()
+    written = run_batch(form, evaluator, tasks, args.output, workers=args.workers, max_pool_size=args.max_pool_size)
+    logger.info(f"Форма {form.name}: {written} записей за {time.perf_counter() - start:.1f} с -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
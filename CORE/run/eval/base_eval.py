@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
-from typing import List, Tuple, Optional
+from collections import defaultdict
+from typing import Any, Collection, Dict, FrozenSet, Iterable, List, Sequence, Tuple, Optional
 import numpy as np
 
 from CORE.run import Exemplar
@@ -17,6 +18,27 @@ class BaseEvaluator(ABC):
         """
         pass
 
+    def eval_exemplars(self, exemplars: Sequence[Exemplar]) -> np.ndarray:
+        """
+        Оценки сразу для списка экземпляров (например, для всех дочерних экземпляров шага).
+        По умолчанию - eval_exemplar для каждого, оценщики переопределяют этот метод, чтобы
+        вызывать модель один раз на всю матрицу параметров.
+
+        :param exemplars: оцениваемые экземпляры, возможно, заполненные лишь частично
+        :return: массив оценок из [0;1] в том же порядке, что и экземпляры
+        """
+        return np.array([self.eval_exemplar(exemplar) for exemplar in exemplars], dtype=float)
+
+    def prepare(self, param_subsets: Iterable[Collection[str]]) -> None:
+        """
+        Заранее готовит оценщик к экземплярам с заданными наборами параметров
+        (например, наборами после каждого шага формы, см. Schema.get_params_by_step_num).
+        Оценщики без подмоделей ничего не делают (см. SubmodelsMixin.prepare).
+
+        :param param_subsets: наборы имен параметров, которые будут у оцениваемых экземпляров
+        """
+        pass
+
     def _get_common_data(self, exemplar: Exemplar, dataset_param_names: List[str], positive_dataset) -> Tuple[
         Optional[np.ndarray], Optional[np.ndarray], List[str]]:
         """
@@ -31,24 +53,145 @@ class BaseEvaluator(ABC):
                  - matrix: numpy массив формы (n_samples, len(common_params)) или None, если общих параметров нет
                  - common_params: список общих имен параметров в том же порядке, что и в dataset_param_names
         """
-        # Находим общие параметры, сохраняя порядок из dataset_param_names
-        dataset_params_set = set(dataset_param_names)
-        exemplar_params_set = set(exemplar.get_param_names())
-
-        # Сохраняем порядок из dataset_param_names
-        common_params = [p for p in dataset_param_names if p in exemplar_params_set]
+        common_params = self._get_common_params(exemplar, dataset_param_names)
 
         # Если нет общих параметров, возвращаем None
         if not common_params:
             return None, None, []
 
-        # Формируем вектор значений из экземпляра
-        vector = np.array([[
-            exemplar.get_parameter_value(p) for p in common_params
-        ]])
+        vector = self._get_exemplar_vector(exemplar, common_params)
+        matrix = self._get_dataset_matrix(positive_dataset, common_params)
+
+        return vector, matrix, common_params
 
-        # Формируем матрицу данных из датасета
+    @staticmethod
+    def _get_common_params(exemplar: Exemplar, dataset_param_names: List[str]) -> List[str]:
+        """ Параметры экземпляра, которые есть в датасете, в порядке dataset_param_names """
+        exemplar_params_set = set(exemplar.get_param_names())
+        return [p for p in dataset_param_names if p in exemplar_params_set]
+
+    @staticmethod
+    def _get_exemplar_vector(exemplar: Exemplar, common_params: List[str]) -> np.ndarray:
+        """ Вектор значений экземпляра формы (1, len(common_params)) """
+        return Exemplar.parameters_matrix([exemplar], common_params)
+
+    @staticmethod
+    def _get_dataset_matrix(positive_dataset, common_params: List[str]) -> np.ndarray:
+        """ Матрица значений датасета формы (n_samples, len(common_params)) """
         data_list = [positive_dataset.get_parameter_values(p) for p in common_params]
-        matrix = np.array(data_list).T
+        return np.array(data_list).T
 
-        return vector, matrix, common_params
+
+class SubmodelsMixin(ABC):
+    """
+    Для оценщиков с подмоделями: у частично достроенного экземпляра есть лишь часть параметров формы,
+    и оценщик обучает на датасете positive_dataset отдельную подмодель для каждого набора общих параметров.
+    Наследник вызывает super().__init__() и определяет _fit_submodel и _score_matrix.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._submodels: Dict[FrozenSet[str], Any] = {}  # набор общих параметров -> подмодель
+
+    def prepare(self, param_subsets: Iterable[Collection[str]]) -> None:
+        """
+        Заранее обучает подмодели для заданных наборов параметров (см. BaseEvaluator.prepare),
+        чтобы во время распознавания они уже были готовы.
+        """
+        dataset_param_names = self.positive_dataset.param_names
+        for param_subset in param_subsets:
+            param_subset = set(param_subset)
+            common_params = [p for p in dataset_param_names if p in param_subset]
+            if common_params:
+                self._get_submodel(common_params)
+
+    def _get_submodel(self, common_params: List[str]) -> Any:
+        """
+        Подмодель, обученная на датасете только по общим параметрам (у частично достроенного
+        экземпляра есть лишь часть параметров формы). Обучается при первом запросе данного
+        набора параметров и дальше переиспользуется для всех экземпляров с тем же набором.
+
+        :param common_params: общие параметры в порядке параметров датасета
+        :return: то, что вернул _fit_submodel
+        """
+        key = frozenset(common_params)
+        if key not in self._submodels:
+            self._submodels[key] = self._fit_submodel(common_params)
+        return self._submodels[key]
+
+    @abstractmethod
+    def _fit_submodel(self, common_params: List[str]) -> Any:
+        """ Обучение подмодели по подмножеству параметров (см. _get_submodel) """
+
+    def _eval_exemplars_by_common_params(self, exemplars: Sequence[Exemplar],
+                                         dataset_param_names: List[str]) -> np.ndarray:
+        """
+        Реализация eval_exemplars для оценщиков с подмоделями: экземпляры группируются по набору
+        общих с датасетом параметров, и каждая группа оценивается одним вызовом _score_matrix.
+        Экземпляры без общих параметров получают 0.0.
+        """
+        scores = np.zeros(len(exemplars))
+        for common_params, indices, matrix in self._group_by_common_params(exemplars, dataset_param_names):
+            scores[indices] = self._score_matrix(common_params, matrix)
+        return scores
+
+    def _group_by_common_params(self, exemplars: Sequence[Exemplar], dataset_param_names: List[str]) -> List[
+        Tuple[List[str], np.ndarray, np.ndarray]]:
+        """
+        Группы экземпляров с одинаковым набором общих с датасетом параметров (группы без общих параметров
+        пропускаются). У экземпляров с общей раскладкой (см. Exemplar.get_shared_layout) наборы
+        определяются сразу по маске заполненных ячеек матрицы параметров.
+
+        :return: список (общие параметры в порядке dataset_param_names, номера экземпляров, их матрица значений)
+        """
+        layout = Exemplar.get_shared_layout(exemplars)
+        if layout is not None:
+            columns_params = [p for p in dataset_param_names if p in layout.param_index]
+            matrix = Exemplar.parameters_matrix(exemplars, columns_params)
+            masks, inverse = np.unique(~np.isnan(matrix), axis=0, return_inverse=True)
+            groups = []
+            for group_num, mask in enumerate(masks):
+                if not mask.any():
+                    continue
+                indices = np.flatnonzero(inverse.ravel() == group_num)
+                groups.append(([p for p, present in zip(columns_params, mask) if present], indices,
+                               matrix[np.ix_(indices, np.flatnonzero(mask))]))
+            return groups
+
+        indices_by_params: Dict[Tuple[str, ...], List[int]] = defaultdict(list)
+        for i, exemplar in enumerate(exemplars):
+            indices_by_params[tuple(self._get_common_params(exemplar, dataset_param_names))].append(i)
+        return [(list(common_params), np.array(indices), Exemplar.parameters_matrix([exemplars[i] for i in indices],
+                                                                                    common_params))
+                for common_params, indices in indices_by_params.items() if common_params]
+
+    @abstractmethod
+    def _score_matrix(self, common_params: List[str], matrix: np.ndarray) -> np.ndarray:
+        """
+        Оценки строк матрицы (n_exemplars, len(common_params)) значений экземпляров
+        по общим параметрам (см. _eval_exemplars_by_common_params).
+        """
+
+
+class ParamScoresMixin(ABC):
+    """ Для оценщиков, оценивающих каждый параметр по отдельности: наследник определяет _score_param_values """
+
+    def _score_params_of_exemplars(self, exemplars: Sequence[Exemplar]) -> List[np.ndarray]:
+        """
+        Значения каждого параметра собираются со всех экземпляров и оцениваются одним вызовом _score_param_values.
+
+        :return: для каждого экземпляра - массив оценок его параметров в порядке get_param_names()
+        """
+        exemplar_indices, param_codes, values, code_names = Exemplar.collect_parameters(exemplars)
+        scores = np.zeros(len(values))
+        for code in np.unique(param_codes):
+            mask = param_codes == code
+            scores[mask] = self._score_param_values(code_names[code], values[mask])
+
+        # пары (экземпляр, параметр) идут по экземплярам, поэтому оценки режутся на куски по числу параметров
+        counts = np.bincount(exemplar_indices, minlength=len(exemplars))
+        return np.split(scores, np.cumsum(counts)[:-1])
+
+    @abstractmethod
+    def _score_param_values(self, param_name: str, values: np.ndarray) -> np.ndarray:
+        """ Оценки массива значений одного параметра (см. _score_params_of_exemplars) """
@@ -1,3 +1,5 @@
+from typing import List, Optional, Sequence, Tuple
+
 import numpy as np
 from scipy.stats import percentileofscore
 from sklearn.neighbors import LocalOutlierFactor
@@ -5,10 +7,10 @@ from sklearn.preprocessing import StandardScaler
 
 from CORE.datasets_wrappers.form_associated.parametrised_dataset import ParametrisedDataset
 from CORE.run import Exemplar
-from CORE.run.eval.base_eval import BaseEvaluator
+from CORE.run.eval.base_eval import BaseEvaluator, SubmodelsMixin
 
 
-class LOFPercentileEvaluator(BaseEvaluator):
+class LOFPercentileEvaluator(SubmodelsMixin, BaseEvaluator):
     """
     Версия LOF-оценщика с нормализацией через перцентили эталонной выборки.
 
@@ -23,6 +25,7 @@ class LOFPercentileEvaluator(BaseEvaluator):
             contamination: float = 'auto',
             normalize: bool = True
     ):
+        super().__init__()
         self.positive_dataset = positive_dataset
         self.param_names = positive_dataset.param_names
         self.n_neighbors = n_neighbors
@@ -61,48 +64,52 @@ class LOFPercentileEvaluator(BaseEvaluator):
         - Нормальная точка получает оценку близкую к 1 (высокий процентиль)
         - Выброс получает оценку близкую к 0 (низкий процентиль)
         """
-        # Получаем вектор, матрицу и список общих параметров
-        x, data_matrix, common_params = self._get_common_data(
-            exemplar, self.param_names, self.positive_dataset
-        )
+        return float(self.eval_exemplars([exemplar])[0])
+
+    def eval_exemplars(self, exemplars: Sequence[Exemplar]) -> np.ndarray:
+        """ Оценки списка экземпляров: по одному вызову LOF на каждый набор общих параметров """
+        return self._eval_exemplars_by_common_params(exemplars, self.param_names)
+
+    def _score_matrix(self, common_params: List[str], matrix: np.ndarray) -> np.ndarray:
+        # LOF, обученный на актуальных данных (обучается один раз на каждый набор параметров)
+        scaler, lof, reference_scores = self._get_submodel(common_params)
+
+        # Нормализуем экземпляры тем же скейлером, что и датасет
+        x_normalized = scaler.transform(matrix) if scaler is not None else matrix
+
+        # Получаем LOF-оценки
+        try:
+            lof_scores = lof.score_samples(x_normalized)
+        except AttributeError:
+            lof_scores = lof.decision_function(x_normalized)
+
+        # Вычисляем процентили
+        percentiles = percentileofscore(reference_scores, lof_scores, kind='weak')
 
-        # Если нет общих параметров, возвращаем минимальную оценку
-        if x is None:
-            return 0.0
+        # Нормализуем в [0; 1]
+        return percentiles / 100.0
+
+    def _fit_submodel(self, common_params: List[str]) -> Tuple[Optional[StandardScaler], LocalOutlierFactor, np.ndarray]:
+        """ Скейлер, LOF и эталонные LOF-оценки датасета только по параметрам common_params """
+        data_matrix = self._get_dataset_matrix(self.positive_dataset, common_params)
 
         # Нормализуем данные
         if self.normalize:
-            temp_scaler = StandardScaler()
-            data_normalized = temp_scaler.fit_transform(data_matrix)
-            x_normalized = temp_scaler.transform(x)
+            scaler = StandardScaler()
+            data_normalized = scaler.fit_transform(data_matrix)
         else:
+            scaler = None
             data_normalized = data_matrix
-            x_normalized = x
 
         # Обучаем LOF на актуальных данных
-        temp_lof = LocalOutlierFactor(
+        lof = LocalOutlierFactor(
             n_neighbors=min(self.n_neighbors, len(data_normalized) - 1),  # не больше, чем точек
             contamination=self.contamination,
             novelty=True
         )
-        temp_lof.fit(data_normalized)
-
-        # Получаем LOF-оценку
-        try:
-            lof_score = temp_lof.score_samples(x_normalized)[0]
-        except AttributeError:
-            lof_score = temp_lof.decision_function(x_normalized)[0]
-
-        # Получаем эталонные оценки
-        temp_reference_scores = temp_lof.negative_outlier_factor_
-
-        # Вычисляем процентиль
-        percentile = percentileofscore(temp_reference_scores, lof_score, kind='weak')
-
-        # Нормализуем в [0; 1]
-        score = percentile / 100.0
+        lof.fit(data_normalized)
 
-        return score
+        return scaler, lof, lof.negative_outlier_factor_
 
 
 if __name__ == "__main__":
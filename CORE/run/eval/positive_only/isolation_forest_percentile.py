@@ -1,3 +1,5 @@
+from typing import List, Optional, Sequence, Tuple
+
 import numpy as np
 from scipy.stats import percentileofscore
 from sklearn.ensemble import IsolationForest
@@ -5,10 +7,10 @@ from sklearn.preprocessing import StandardScaler
 
 from CORE.datasets_wrappers.form_associated.parametrised_dataset import ParametrisedDataset
 from CORE.run import Exemplar
-from CORE.run.eval.base_eval import BaseEvaluator
+from CORE.run.eval.base_eval import BaseEvaluator, SubmodelsMixin
 
 
-class IsolationForestPercentileEvaluator(BaseEvaluator):
+class IsolationForestPercentileEvaluator(SubmodelsMixin, BaseEvaluator):
     """
     Isolation Forest изолирует аномалии случайными разбиениями пространства.
     Чем меньше разбиений нужно для изоляции точки, тем она более аномальна.
@@ -24,6 +26,7 @@ class IsolationForestPercentileEvaluator(BaseEvaluator):
             normalize: bool = True,
             random_state: int = 42
     ):
+        super().__init__()
         self.positive_dataset = positive_dataset
         self.param_names = positive_dataset.param_names
         self.normalize = normalize
@@ -54,46 +57,50 @@ class IsolationForestPercentileEvaluator(BaseEvaluator):
 
     def eval_exemplar(self, exemplar: Exemplar) -> float:
         """Оценка = процентиль в эталонном распределении."""
-        # Получаем вектор, матрицу и список общих параметров
-        x, data_matrix, common_params = self._get_common_data(
-            exemplar, self.param_names, self.positive_dataset
-        )
+        return float(self.eval_exemplars([exemplar])[0])
+
+    def eval_exemplars(self, exemplars: Sequence[Exemplar]) -> np.ndarray:
+        """ Оценки списка экземпляров: по одному вызову леса на каждый набор общих параметров """
+        return self._eval_exemplars_by_common_params(exemplars, self.param_names)
+
+    def _score_matrix(self, common_params: List[str], matrix: np.ndarray) -> np.ndarray:
+        # Лес, обученный на актуальных данных (обучается один раз на каждый набор параметров)
+        scaler, iforest, reference_scores = self._get_submodel(common_params)
+
+        # Нормализуем экземпляры тем же скейлером, что и датасет
+        x_normalized = scaler.transform(matrix) if scaler is not None else matrix
+
+        # Получаем оценки
+        iforest_scores = iforest.score_samples(x_normalized)
+
+        # Вычисляем процентили (доля эталонных точек с меньшей оценкой)
+        percentiles = percentileofscore(reference_scores, iforest_scores, kind='mean')
 
-        # Если нет общих параметров, возвращаем минимальную оценку
-        if x is None:
-            return 0.0
+        # Нормализуем в [0; 1]
+        return percentiles / 100.0
+
+    def _fit_submodel(self, common_params: List[str]) -> Tuple[Optional[StandardScaler], IsolationForest, np.ndarray]:
+        """ Скейлер, Isolation Forest и эталонные оценки датасета только по параметрам common_params """
+        data_matrix = self._get_dataset_matrix(self.positive_dataset, common_params)
 
         # Нормализуем данные
         if self.normalize:
-            temp_scaler = StandardScaler()
-            data_normalized = temp_scaler.fit_transform(data_matrix)
-            x_normalized = temp_scaler.transform(x)
+            scaler = StandardScaler()
+            data_normalized = scaler.fit_transform(data_matrix)
         else:
+            scaler = None
             data_normalized = data_matrix
-            x_normalized = x
 
         # Обучаем Isolation Forest на актуальных данных
-        temp_iforest = IsolationForest(
+        iforest = IsolationForest(
             n_estimators=self.iforest.n_estimators,
             contamination=self.iforest.contamination,
             random_state=self.iforest.random_state,
             bootstrap=True
         )
-        temp_iforest.fit(data_normalized)
-
-        # Получаем оценку
-        iforest_score = temp_iforest.score_samples(x_normalized)[0]
-
-        # Получаем эталонные оценки
-        temp_reference_scores = temp_iforest.score_samples(data_normalized)
-
-        # Вычисляем процентиль (доля эталонных точек с меньшей оценкой)
-        percentile = percentileofscore(temp_reference_scores, iforest_score, kind='mean')
-
-        # Нормализуем в [0; 1]
-        score = percentile / 100.0
+        iforest.fit(data_normalized)
 
-        return float(score)
+        return scaler, iforest, iforest.score_samples(data_normalized)
 
 
 if __name__ == "__main__":
@@ -1,21 +1,28 @@
-from typing import Dict, List
+from typing import Dict, List, Optional, Sequence, Tuple
 
+import numpy as np
+from scipy.signal import fftconvolve
 from scipy.stats import gaussian_kde
 
 from CORE.datasets_wrappers.form_associated.parametrised_dataset import ParametrisedDataset
 from CORE.run import Exemplar
-from CORE.run.eval.base_eval import BaseEvaluator
+from CORE.run.eval.base_eval import BaseEvaluator, ParamScoresMixin
 
 
-class KDE_Eval(BaseEvaluator):
+class KDE_Eval(ParamScoresMixin, BaseEvaluator):
     """
     Оценка экземпляра через оценку плотности ядра (Kernel Density Estimation, KDE) с гауссовым ядром.
 
     Алгоритм:
-    1. На этапе инициализации для каждого параметра из позитивной выборки строится непараметрическая оценка плотности распределения (KDE).
+    1. На этапе инициализации для каждого параметра из позитивной выборки строится непараметрическая оценка плотности распределения (KDE)
+       и находится максимум плотности на значениях выборки (им нормируется плотность).
     2. Для каждого параметра оцениваемого экземпляра вычисляется плотность вероятности его значения согласно KDE.
     3. Итоговая оценка — среднее значение плотностей по всем параметрам, нормализованное в интервал [0;1].
 
+    Если задан grid_size, плотность каждого параметра заранее считается на равномерной сетке
+    (линейный биннинг выборки и свертка с гауссовым ядром через FFT), и оценка значения сводится
+    к линейной интерполяции по сетке - сразу для всех параметров всех экземпляров.
+
     Преимущества:
     * Не требует предположений о форме распределения (непараметрический метод).
     * Устойчив к выбросам.
@@ -23,13 +30,21 @@ class KDE_Eval(BaseEvaluator):
     * Естественная интерпретация: высокая плотность — типичное значение, низкая — нетипичное.
     """
 
-    def __init__(self, positive_dataset: ParametrisedDataset):
+    # Сетка и ядро обрезаются на таком числе ширин окна
+    GRID_BANDWIDTHS_MARGIN = 4.0
+
+    def __init__(self, positive_dataset: ParametrisedDataset, grid_size: Optional[int] = None):
         """
         Инициализирует объект, строя KDE для каждого параметра позитивной выборки.
 
         Args:
             positive_dataset (ParametrisedDataset): позитивная выборка для построения KDE.
+            grid_size (Optional[int]): число узлов сетки для приближенной оценки плотности; None - точное вычисление KDE.
         """
+        if grid_size is not None and grid_size < 2:
+            raise ValueError("В сетке KDE должно быть хотя бы 2 узла")
+        self.grid_size = grid_size
+
         self.param_to_kde: Dict[str, gaussian_kde] = {}
         for param in positive_dataset.param_names:
             vals: List[float] = positive_dataset.get_parameter_values(param)
@@ -41,6 +56,18 @@ class KDE_Eval(BaseEvaluator):
                 data = np.array(vals)
                 self.param_to_kde[param] = gaussian_kde(data)
 
+        # Нормировка: максимум плотности на значениях выборки (None - параметр всегда оценивается как нетипичный)
+        self.param_to_max_density: Dict[str, Optional[float]] = {
+            param: self._max_density(kde) for param, kde in self.param_to_kde.items()}
+
+        # Сетки плотностей: параметр -> (первый узел, шаг, плотности в узлах, нормировка)
+        self.param_to_grid: Dict[str, Tuple[float, float, np.ndarray, float]] = {}
+        if grid_size is not None:
+            for param, kde in self.param_to_kde.items():
+                grid = self._density_on_grid(kde, grid_size)
+                if grid is not None:
+                    self.param_to_grid[param] = grid
+
     def _create_single_value_kde(self, value: float) -> callable:
         """Создаёт KDE‑аналог для одиночного значения."""
 
@@ -52,6 +79,57 @@ class KDE_Eval(BaseEvaluator):
 
         return kde_func
 
+    @staticmethod
+    def _max_density(kde: gaussian_kde) -> Optional[float]:
+        """ Максимум плотности на типичном диапазоне значений (на самой выборке), None - если его не посчитать """
+        try:
+            sample_densities = kde.evaluate(kde.dataset)
+            return float(np.max(sample_densities))
+        except Exception:
+            return None
+
+    @classmethod
+    def _density_on_grid(cls, kde: gaussian_kde, grid_size: int) -> Optional[Tuple[float, float, np.ndarray, float]]:
+        """
+        Плотность KDE на равномерной сетке: линейный биннинг выборки в узлы сетки и свертка
+        с гауссовым ядром через FFT, O(n + grid_size * log(grid_size)) вместо O(n * grid_size).
+
+        :return: (первый узел, шаг, плотности в узлах, нормировка) или None, если ширина окна вырождена
+                 (тогда параметр оценивается точно)
+        """
+        if not isinstance(kde, gaussian_kde):
+            return None
+        data = kde.dataset[0]
+        if not np.isfinite(data).all():
+            # Номера узлов для NaN и бесконечностей не определены - такой параметр оценивается точно
+            return None
+        bandwidth = float(np.sqrt(kde.covariance[0, 0]))
+        margin = cls.GRID_BANDWIDTHS_MARGIN * bandwidth
+        start, stop = float(data.min()) - margin, float(data.max()) + margin
+        if not (np.isfinite(bandwidth) and bandwidth > 0 and stop > start):
+            return None
+        step = (stop - start) / (grid_size - 1)
+
+        # Линейный биннинг: вес каждой точки делится между двумя соседними узлами
+        positions = (data - start) / step
+        left = np.clip(np.floor(positions).astype(int), 0, grid_size - 2)
+        right_share = positions - left
+        counts = (np.bincount(left, weights=kde.weights * (1 - right_share), minlength=grid_size) +
+                  np.bincount(left + 1, weights=kde.weights * right_share, minlength=grid_size))
+
+        # Гауссово ядро в узлах сетки, обрезанное на margin
+        half_width = min(grid_size - 1, int(np.ceil(margin / step)))
+        offsets = np.arange(-half_width, half_width + 1) * step
+        kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2) / (bandwidth * np.sqrt(2 * np.pi))
+
+        densities = np.maximum(fftconvolve(counts, kernel, mode='same'), 0.0)
+
+        # Нормировка, как и в точном режиме, по максимуму плотности на значениях выборки
+        max_density = float(np.max(np.interp(data, start + step * np.arange(grid_size), densities)))
+        if not max_density > 0:
+            return None
+        return start, step, densities, max_density
+
     def _eval_one_param(self, param_name: str, real_value: float) -> float:
         """
         Вычисляет плотность вероятности значения параметра согласно KDE.
@@ -61,20 +139,26 @@ class KDE_Eval(BaseEvaluator):
             real_value (float): значение параметра в экземпляре.
 
         Returns:
-            float: плотность вероятности в точке real_value, нормализованная в [0; 1].
+            float: плотность вероятности в точке real_value, нормализованная в [0; 1].
         """
+        return float(self._score_param_values(param_name, np.array([real_value], dtype=float))[0])
+
+    def _score_param_values(self, param_name: str, values: np.ndarray) -> np.ndarray:
+        """ Нормализованные в [0; 1] плотности сразу для массива значений параметра (см. _eval_one_param) """
         kde = self.param_to_kde[param_name]
+        max_density = self.param_to_max_density[param_name]
+        # Нечисловые значения (NaN, бесконечности) нетипичны и не портят оценку остальных значений
+        finite = np.isfinite(values)
+        normalized_scores = np.zeros(len(values))
         try:
-            # Вычисляем плотность в точке
-            density = kde.evaluate([real_value])[0]
-            # Нормализуем плотность: ищем максимум на типичном диапазоне значений
-            sample_vals = kde.dataset
-            sample_densities = kde.evaluate(sample_vals)
-            max_density = np.max(sample_densities)
-            normalized_score = min(1.0, density / max_density)  # Ограничиваем сверху 1.0
+            # Вычисляем плотность в точках
+            densities = kde.evaluate(values[finite])
+            # Нормализуем плотность на максимум, посчитанный при инициализации
+            ratios = densities / max_density
+            normalized_scores[finite] = np.where(ratios < 1.0, ratios, 1.0)  # Ограничиваем сверху 1.0
         except Exception:
-            normalized_score = 0.0  # В случае ошибки считаем значение нетипичным
-        return normalized_score
+            pass  # В случае ошибки считаем значения нетипичными
+        return normalized_scores
 
     def eval_exemplar(self, exemplar: Exemplar) -> float:
         """
@@ -84,19 +168,68 @@ class KDE_Eval(BaseEvaluator):
             exemplar (Exemplar): экземпляр для оценки.
 
         Returns:
-            float: средняя нормализованная плотность в интервале [0; 1].
+            float: средняя нормализованная плотность в интервале [0; 1].
+        """
+        return float(self.eval_exemplars([exemplar])[0])
+
+    def eval_exemplars(self, exemplars: Sequence[Exemplar]) -> np.ndarray:
+        """ Оценки списка экземпляров: KDE каждого параметра вычисляется один раз на все экземпляры """
+        if self.grid_size is not None:
+            return self._eval_exemplars_on_grid(exemplars)
+
+        scores = np.zeros(len(exemplars))
+        for i, param_scores in enumerate(self._score_params_of_exemplars(exemplars)):
+            if len(param_scores):
+                # Среднее по всем параметрам
+                scores[i] = np.mean(param_scores)
+        return scores
+
+    def _eval_exemplars_on_grid(self, exemplars: Sequence[Exemplar]) -> np.ndarray:
+        """
+        Оценки списка экземпляров по заранее посчитанным сеткам: все пары (экземпляр, параметр)
+        интерполируются одним векторным проходом. Параметры без сетки и нечисловые значения оцениваются точно.
         """
-        scores = []
-        params_names = exemplar.get_param_names()
-        for param_name in params_names:
-            real_val = exemplar.get_parameter_value(param_name)
-            score = self._eval_one_param(param_name, real_val)
-            scores.append(score)
-        if not scores:
-            return 0.0
-        # Среднее по всем параметрам
-        avg_score = float(np.mean(scores))
-        return avg_score
+        exemplar_indices, param_codes, values, code_names = Exemplar.collect_parameters(exemplars)
+        scores = np.zeros(len(values))
+
+        code_on_grid = np.array([name in self.param_to_grid for name in code_names], dtype=bool)
+        # Нечисловые значения (NaN, бесконечности) не попадают ни в один узел и оцениваются точно
+        on_grid = code_on_grid[param_codes] & np.isfinite(values)
+        if on_grid.any():
+            # Характеристики сеток по номеру имени параметра (у параметров без сетки - заглушки)
+            no_grid = (0.0, 1.0, np.zeros(2), 1.0)
+            code_grids = [self.param_to_grid.get(name, no_grid) for name in code_names]
+            code_starts, code_steps, code_max_densities = (np.array(column, dtype=float) for column in zip(*(
+                (start, step, max_density) for start, step, _, max_density in code_grids)))
+            code_sizes = np.array([len(densities) for _, _, densities, _ in code_grids])
+            grid_codes = param_codes[on_grid]
+            starts, steps, max_densities = code_starts[grid_codes], code_steps[grid_codes], code_max_densities[grid_codes]
+            sizes = code_sizes[grid_codes]
+
+            # Дробный номер узла сетки, точки вне сетки получают нулевую плотность
+            positions = (values[on_grid] - starts) / steps
+            inside = (positions >= 0) & (positions <= sizes - 1)
+            left = np.clip(np.floor(positions), 0, sizes - 2).astype(int)
+            right_share = np.clip(positions - left, 0.0, 1.0)
+
+            # Плотности всех сеток одним массивом, номер узла сдвигается на начало сетки параметра
+            flat_densities = np.concatenate([densities for _, _, densities, _ in code_grids])
+            code_offsets = np.cumsum([0] + [len(densities) for _, _, densities, _ in code_grids[:-1]])
+            offsets = code_offsets[grid_codes]
+            densities = ((1 - right_share) * flat_densities[offsets + left] +
+                         right_share * flat_densities[offsets + left + 1])
+
+            ratios = np.where(inside, densities, 0.0) / max_densities
+            scores[on_grid] = np.where(ratios < 1.0, ratios, 1.0)
+
+        for code in np.unique(param_codes[~on_grid]):
+            mask = (param_codes == code) & ~on_grid
+            scores[mask] = self._score_param_values(code_names[code], values[mask])
+
+        # Среднее по параметрам каждого экземпляра
+        counts = np.bincount(exemplar_indices, minlength=len(exemplars))
+        sums = np.bincount(exemplar_indices, weights=scores, minlength=len(exemplars))
+        return np.divide(sums, counts, out=np.zeros(len(exemplars)), where=counts > 0)
 
 
 if __name__ == "__main__":
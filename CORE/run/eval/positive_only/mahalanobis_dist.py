@@ -1,22 +1,26 @@
+from typing import List, Sequence, Tuple
+
 import numpy as np
 
 from CORE.datasets_wrappers.form_associated.parametrised_dataset import ParametrisedDataset
 from CORE.run import Exemplar
-from CORE.run.eval.base_eval import BaseEvaluator
+from CORE.run.eval.base_eval import BaseEvaluator, SubmodelsMixin
+from CORE.run.eval.utils import cholesky_with_regularization, mahalanobis_squared
 
 
-class MahalanobisEval(BaseEvaluator):
+class MahalanobisEval(SubmodelsMixin, BaseEvaluator):
     """
     Оценка экземпляра через расстояние Махаланобиса, учитывающее корреляции между параметрами.
 
     Алгоритм:
-    1. На этапе инициализации:
-       - собираются все параметры позитивной выборки в матрицу данных;
+    1. Для каждого набора параметров, встречающегося у оцениваемых экземпляров (один раз на набор):
+       - собираются эти параметры позитивной выборки в матрицу данных;
        - вычисляются вектор средних значений (mean_vector) и ковариационная матрица (cov_matrix);
-       - находится обратная ковариационная матрица (inv_cov) для расчёта расстояния.
+       - находится ее разложение Холецкого (chol_factor) для расчёта расстояния.
     2. Для оцениваемого экземпляра:
        - формируется вектор его значений по общим параметрам;
-       - вычисляется расстояние Махаланобиса между этим вектором и средним вектором выборки;
+       - вычисляется расстояние Махаланобиса между этим вектором и средним вектором выборки
+         (одно решение треугольной системы);
        - расстояние преобразуется в оценку похожести.
 
     Преимущества:
@@ -38,90 +42,51 @@ class MahalanobisEval(BaseEvaluator):
         Args:
             positive_dataset (ParametrisedDataset): позитивная выборка для построения модели.
         """
+        super().__init__()
         self.positive_dataset = positive_dataset
         self.param_names = positive_dataset.param_names
 
-    def _get_stats_for_params(self, param_names: list) -> tuple:
+    def _fit_submodel(self, common_params: List[str]) -> Tuple[np.ndarray, np.ndarray]:
         """
         Вычисляет статистики (среднее, ковариационную матрицу) для указанных параметров.
 
         Args:
-            param_names (list): список имен параметров
+            common_params (list): список имен параметров
 
         Returns:
-            tuple: (mean_vector, inv_cov_matrix) где:
+            tuple: (mean_vector, chol_factor) где:
                    - mean_vector: вектор средних
-                   - inv_cov_matrix: обратная ковариационная матрица
+                   - chol_factor: множитель Холецкого ковариационной матрицы
         """
         # Собираем данные только для указанных параметров
-        data_list = []
-        for param in param_names:
-            vals = self.positive_dataset.get_parameter_values(param)
-            data_list.append(vals)
-
-        data_matrix = np.array(data_list)  # Форма: (n_params, n_observations)
+        data_matrix = self._get_dataset_matrix(self.positive_dataset, common_params)  # (n_observations, n_params)
 
         # Вычисляем вектор средних и ковариационную матрицу
-        mean_vector = np.mean(data_matrix, axis=1)
-        cov_matrix = np.cov(data_matrix)
+        mean_vector = np.mean(data_matrix, axis=0)
+        cov_matrix = np.cov(data_matrix, rowvar=False)
 
-        # Обрабатываем случай вырожденной матрицы
-        try:
-            inv_cov = np.linalg.inv(cov_matrix)
-        except np.linalg.LinAlgError:
-            # Если матрица вырождена, добавляем регуляризацию
-            epsilon = 1e-8
-            inv_cov = np.linalg.inv(cov_matrix + epsilon * np.eye(len(param_names)))
+        # Вырожденная матрица регуляризуется внутри
+        chol_factor = cholesky_with_regularization(cov_matrix)
 
-        return mean_vector, inv_cov
+        return mean_vector, chol_factor
 
-    def _mahalanobis_distance(self, x: np.ndarray, mean_vector: np.ndarray, inv_cov: np.ndarray) -> float:
-        """
-        Вычисляет расстояние Махаланобиса между вектором x и средним вектором выборки.
+    def eval_exemplar(self, exemplar: Exemplar) -> float:
+        return float(self.eval_exemplars([exemplar])[0])
 
-        Args:
-            x (np.ndarray): вектор значений экземпляра.
-            mean_vector (np.ndarray): вектор средних.
-            inv_cov (np.ndarray): обратная ковариационная матрица.
+    def eval_exemplars(self, exemplars: Sequence[Exemplar]) -> np.ndarray:
+        """ Оценки списка экземпляров: расстояния для всех экземпляров с одним набором параметров считаются разом """
+        return self._eval_exemplars_by_common_params(exemplars, self.param_names)
 
-        Returns:
-            float: квадрат расстояния Махаланобиса.
-        """
-        diff = x - mean_vector
-        distance_squared = diff.T @ inv_cov @ diff
-        return distance_squared
+    def _score_matrix(self, common_params: List[str], matrix: np.ndarray) -> np.ndarray:
+        # Статистики выборки по общим параметрам (считаются один раз на каждый набор параметров)
+        mean_vector, chol_factor = self._get_submodel(common_params)
 
-    def eval_exemplar(self, exemplar: Exemplar) -> float:
-        # Получаем вектор, матрицу и список общих параметров
-        x, data_matrix, common_params = self._get_common_data(
-            exemplar, self.param_names, self.positive_dataset
-        )
-
-        # Если нет общих параметров, возвращаем минимальную оценку
-        if x is None:
-            return 0.0
-
-        # Если общих параметров меньше, чем в датасете, пересчитываем статистику
-        if len(common_params) < len(self.param_names):
-            # Получаем статистики только для общих параметров
-            mean_vector, inv_cov = self._get_stats_for_params(common_params)
-            x_vector = x.flatten()  # Преобразуем в одномерный массив
-        else:
-            # Используем предвычисленные статистики для всех параметров
-            # Но нужно убедиться, что порядок параметров правильный
-            # Для этого нужно создать mean_vector и inv_cov в правильном порядке
-            # В исходном коде они были в порядке self.param_names
-            mean_vector, inv_cov = self._get_stats_for_params(self.param_names)
-            x_vector = x.flatten()
-
-        # Вычисляем расстояние Махаланобиса
-        mahal_dist_sq = self._mahalanobis_distance(x_vector, mean_vector, inv_cov)
+        # Вычисляем расстояния Махаланобиса
+        mahal_dist_sq = mahalanobis_squared(matrix, mean_vector, chol_factor)
 
         # Преобразуем расстояние в оценку [0;1]
         # Используем нелинейное преобразование для плавного убывания
-        score = 1.0 / (1.0 + np.sqrt(mahal_dist_sq))
-
-        return float(score)
+        return 1.0 / (1.0 + np.sqrt(mahal_dist_sq))
 
 
 if __name__ == "__main__":
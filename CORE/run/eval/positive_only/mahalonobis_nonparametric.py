@@ -1,18 +1,22 @@
+from typing import List, Sequence, Tuple
+
 import numpy as np
 from scipy.stats import percentileofscore
 from sklearn.preprocessing import StandardScaler
 
 from CORE.datasets_wrappers.form_associated.parametrised_dataset import ParametrisedDataset
 from CORE.run import Exemplar
-from CORE.run.eval.base_eval import BaseEvaluator
+from CORE.run.eval.base_eval import BaseEvaluator, SubmodelsMixin
+from CORE.run.eval.utils import cholesky_with_regularization, mahalanobis_squared
 
 
-class MahalanobisNonparametricEval(BaseEvaluator):
+class MahalanobisNonparametricEval(SubmodelsMixin, BaseEvaluator):
     """
     Оценка экземпляра через непараметрическую интерпретацию расстояний Махаланобиса.
     """
 
     def __init__(self, positive_dataset: ParametrisedDataset, regularization=1e-6):
+        super().__init__()
         self.positive_dataset = positive_dataset
         self.all_param_names = positive_dataset.param_names
         self.regularization = regularization
@@ -25,95 +29,61 @@ class MahalanobisNonparametricEval(BaseEvaluator):
         self.scaler = StandardScaler()
         self.full_data_matrix_normalized = self.scaler.fit_transform(self.full_data_matrix.T).T
 
-    def _get_stats_for_params(self, param_names: list) -> tuple:
+    def _fit_submodel(self, common_params: List[str]) -> Tuple[StandardScaler, np.ndarray, np.ndarray, np.ndarray]:
         """
-        Вычисляет статистики (mean_vector, inv_cov, scaler, reference_distances) для указанных параметров.
+        Вычисляет статистики (scaler, mean_vector, chol_factor, reference_distances) для указанных параметров.
 
         Args:
-            param_names (list): список имен параметров
+            common_params (list): список имен параметров
 
         Returns:
-            tuple: (scaler, mean_vector, inv_cov, reference_distances)
+            tuple: (scaler, mean_vector, chol_factor, reference_distances)
         """
         # Собираем данные только для указанных параметров
-        data_list = []
-        for param in param_names:
-            vals = self.positive_dataset.get_parameter_values(param)
-            data_list.append(vals)
-
-        data_matrix = np.array(data_list)  # shape: (n_features, n_samples)
+        data_matrix = self._get_dataset_matrix(self.positive_dataset, common_params)  # shape: (n_samples, n_features)
 
         # Нормализация данных
         scaler = StandardScaler()
-        data_matrix_normalized = scaler.fit_transform(data_matrix.T).T
+        data_matrix_normalized = scaler.fit_transform(data_matrix)
 
-        mean_vector = np.mean(data_matrix_normalized, axis=1)
-        cov_matrix = np.cov(data_matrix_normalized)
+        mean_vector = np.mean(data_matrix_normalized, axis=0)
+        cov_matrix = np.atleast_2d(np.cov(data_matrix_normalized, rowvar=False))
 
         # Регуляризация ковариационной матрицы
-        n_features = len(param_names)
+        n_features = len(common_params)
         cov_matrix_reg = cov_matrix + self.regularization * np.eye(n_features)
+        chol_factor = cholesky_with_regularization(cov_matrix_reg, epsilon=self.regularization)
 
-        # Вычисляем обратную матрицу
-        try:
-            inv_cov = np.linalg.inv(cov_matrix_reg)
-        except np.linalg.LinAlgError:
-            # Если всё ещё вырождена, используем псевдообратную
-            inv_cov = np.linalg.pinv(cov_matrix_reg)
-
-        # Вычисляем эталонное распределение расстояний
-        reference_distances = self._compute_reference_distances(data_matrix_normalized, mean_vector, inv_cov)
-
-        return scaler, mean_vector, inv_cov, reference_distances
-
-    def _compute_reference_distances(self, data_matrix_normalized: np.ndarray, mean_vector: np.ndarray,
-                                     inv_cov: np.ndarray) -> np.ndarray:
-        """Вычисляет расстояния Махаланобиса для всех наблюдений."""
-        distances = []
-        n_samples = data_matrix_normalized.shape[1]
-
-        for i in range(n_samples):
-            x_i = data_matrix_normalized[:, i]
-            diff = x_i - mean_vector
-            dist_sq = diff.T @ inv_cov @ diff
-            distances.append(np.sqrt(max(dist_sq, 0)))
-
-        return np.array(distances)
+        # Вычисляем эталонное распределение расстояний (для всех наблюдений сразу)
+        reference_distances = np.sqrt(np.maximum(mahalanobis_squared(data_matrix_normalized, mean_vector, chol_factor), 0))
 
-    def _mahalanobis_distance(self, x: np.ndarray, mean_vector: np.ndarray, inv_cov: np.ndarray) -> float:
-        """Вычисляет расстояние Махаланобиса для нормализованного вектора x."""
-        diff = x - mean_vector
-        dist_sq = diff.T @ inv_cov @ diff
-        return np.sqrt(max(dist_sq, 0))
+        return scaler, mean_vector, chol_factor, reference_distances
 
     def eval_exemplar(self, exemplar: Exemplar) -> float:
         """
         Возвращает оценку экземпляра в интервале [0; 1].
         """
-        # Получаем вектор, матрицу и список общих параметров
-        x, data_matrix, common_params = self._get_common_data(
-            exemplar, self.all_param_names, self.positive_dataset
-        )
+        return float(self.eval_exemplars([exemplar])[0])
 
-        # Если нет общих параметров, возвращаем минимальную оценку
-        if x is None:
-            return 0.0
+    def eval_exemplars(self, exemplars: Sequence[Exemplar]) -> np.ndarray:
+        """ Оценки списка экземпляров: расстояния для всех экземпляров с одним набором параметров считаются разом """
+        return self._eval_exemplars_by_common_params(exemplars, self.all_param_names)
 
-        # Получаем статистики для общих параметров
-        scaler, mean_vector, inv_cov, reference_distances = self._get_stats_for_params(common_params)
+    def _score_matrix(self, common_params: List[str], matrix: np.ndarray) -> np.ndarray:
+        # Получаем статистики для общих параметров (считаются один раз на каждый набор параметров)
+        scaler, mean_vector, chol_factor, reference_distances = self._get_submodel(common_params)
 
-        # Нормализуем вектор
-        x_normalized = scaler.transform(x).flatten()
+        # Нормализуем векторы
+        x_normalized = scaler.transform(matrix)
 
-        # Расстояние Махаланобиса
-        new_distance = self._mahalanobis_distance(x_normalized, mean_vector, inv_cov)
+        # Расстояния Махаланобиса
+        new_distances = np.sqrt(np.maximum(mahalanobis_squared(x_normalized, mean_vector, chol_factor), 0))
 
-        # Процентиль в эталонном распределении
-        percentile = percentileofscore(reference_distances, new_distance)
+        # Процентили в эталонном распределении
+        percentiles = percentileofscore(reference_distances, new_distances)
 
-        # Инвертируем процентиль в оценку
-        score = 1.0 - percentile / 100.0
-        return score
+        # Инвертируем процентили в оценки
+        return 1.0 - percentiles / 100.0
 
 
 if __name__ == "__main__":
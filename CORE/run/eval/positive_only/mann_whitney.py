@@ -1,13 +1,14 @@
-from typing import Dict, List
+from typing import Dict, List, Sequence
 
-import scipy.stats as stats
+import numpy as np
+from scipy.special import ndtr
 
 from CORE.datasets_wrappers.form_associated.parametrised_dataset import ParametrisedDataset
 from CORE.run import Exemplar
-from CORE.run.eval.base_eval import BaseEvaluator
+from CORE.run.eval.base_eval import BaseEvaluator, ParamScoresMixin
 
 
-class MannWhitneyEval(BaseEvaluator):
+class MannWhitneyEval(ParamScoresMixin, BaseEvaluator):
     """Оценка экземпляра через критерий Манна‑Уитни: чем выше значение, тем больше похожесть на выборку.
 
     Для каждого параметра оцениваемого экземпляра:
@@ -15,56 +16,99 @@ class MannWhitneyEval(BaseEvaluator):
        - применяется критерий Манна‑Уитни для сравнения двух выборок: эталонной позитивной и одноэлементной;
        - получается p‑значение — вероятность того, что выборки происходят из одного распределения;
        - p‑значение преобразуется в оценку похожести: `score = 1.0 - p_value`.
+
+    Критерий считается так же, как scipy.stats.mannwhitneyu(alternative='two-sided', method='auto'),
+    но без ранжирования объединенной выборки на каждый вызов: эталонная выборка сортируется один раз,
+    а ранг нового значения находится бинарным поиском - сразу для всех значений параметра.
        """
 
     def __init__(self, positive_dataset: ParametrisedDataset):
         """Инициализирует объект, сохраняя значения параметров из позитивного датасета."""
         self.param_to_values: Dict[str, List[float]] = {}
+        self.param_to_sorted: Dict[str, np.ndarray] = {}  # отсортированные значения выборки
+        self.param_to_tie_term: Dict[str, float] = {}  # сумма (t^3 - t) по группам одинаковых значений выборки
         for param in positive_dataset.param_names:
             vals: List[float] = positive_dataset.get_parameter_values(param)
             self.param_to_values[param] = vals
 
+            sorted_vals = np.sort(np.asarray(vals, dtype=float))
+            _, tie_counts = np.unique(sorted_vals, return_counts=True)
+            self.param_to_sorted[param] = sorted_vals
+            self.param_to_tie_term[param] = float(np.sum(tie_counts ** 3 - tie_counts))
+
     def _eval_one_param(self, param_name: str, real_value: float) -> float:
         """Вычисляет оценку похожести одного параметра на выборку (чем выше, тем лучше)."""
-        vals = self.param_to_values.get(param_name)
-        if vals is None:
+        return float(self._score_param_values(param_name, np.array([real_value], dtype=float))[0])
+
+    def _score_param_values(self, param_name: str, values: np.ndarray) -> np.ndarray:
+        """Оценки похожести сразу для массива значений параметра (см. _eval_one_param)."""
+        sorted_vals = self.param_to_sorted.get(param_name)
+        if sorted_vals is None:
             raise ValueError(f"Parameter '{param_name}' not found in training data.")
 
-        sample_a = vals  # Выборка из позитивного датасета
-        sample_b = [real_value]  # Значение из экземпляра
-
-        try:
-            _, p_value = stats.mannwhitneyu(
-                sample_a, sample_b,
-                alternative='two-sided',
-                method='auto'
-            )
-        except ValueError as e:
-            if 'All numbers are identical' in str(e):
-                p_value = 1.0  # Максимальная похожесть
-            else:
-                raise e
+        p_values = self._p_values(sorted_vals, self.param_to_tie_term[param_name], values)
 
         # Преобразуем p‑значение: чем ближе к 1, тем выше оценка
-        score = 1.0 - p_value
-        return score
+        return 1.0 - p_values
+
+    @staticmethod
+    def _p_values(sorted_vals: np.ndarray, tie_term: float, values: np.ndarray) -> np.ndarray:
+        """
+        Двусторонние p-значения критерия Манна-Уитни для выборки sorted_vals и каждого из одноэлементных
+        выборок [value]. Одно значение y в объединенной выборке меняет только свою группу совпадений,
+        поэтому U и поправка на связки считаются по числу элементов выборки меньше и равных y.
+
+        :param sorted_vals: отсортированная эталонная выборка
+        :param tie_term: сумма (t^3 - t) по группам одинаковых значений эталонной выборки
+        :param values: значения, для каждого из которых считается p-значение
+        """
+        n1 = len(sorted_vals)
+        if n1 == 0:
+            raise ValueError('`x` and `y` must be of nonzero size.')
+        n = n1 + 1
+        less = np.searchsorted(sorted_vals, values, side='left')
+        equal = np.searchsorted(sorted_vals, values, side='right') - less
+
+        # U1 - число пар (x, y), где x > y (совпадения считаются за половину)
+        u1 = (n1 - less - equal) + 0.5 * equal
+        u = np.maximum(u1, n1 - u1)
+
+        # При n2 = 1 method='auto' выбирает точный расчет, если в объединенной выборке нет связок.
+        # Точное распределение U тогда равномерно на 0..n1: sf(U) = (n1 - U + 1) / (n1 + 1)
+        p_exact = 2 * (n1 - u + 1) / (n1 + 1)
+
+        # Иначе - нормальное приближение с поправками на непрерывность и на связки
+        full_tie_term = tie_term + 3 * equal * (equal + 1)  # группа значения y выросла на 1 элемент
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sigma = np.sqrt(n1 / 12 * ((n + 1) - full_tie_term / (n * (n - 1))))
+            numerator = u1 - n1 / 2
+            z = (numerator - 0.5 * np.sign(numerator)) / sigma
+        p_asymptotic = 2 * ndtr(-np.abs(z))
+
+        has_ties = (tie_term > 0) | (equal > 0)
+        p_values = np.clip(np.where(has_ties, p_asymptotic, p_exact), 0.0, 1.0)
+
+        # Все числа одинаковые - максимальная похожесть
+        p_values[equal == n1] = 1.0
+        # NaN (в выборке они сортируются в конец) дают NaN, как в scipy
+        p_values[np.isnan(values)] = np.nan
+        if np.isnan(sorted_vals[-1]):
+            p_values[:] = np.nan
+        return p_values
 
     def eval_exemplar(self, exemplar: Exemplar) -> float:
         """Возвращает итоговую оценку экземпляра: сумма оценок по параметрам, нормализованная на их количество."""
-        scores = []
-        params_names = exemplar.get_param_names()
-
-        for param_name in params_names:
-            real_val = exemplar.get_parameter_value(param_name)
-            score = self._eval_one_param(param_name, real_val)
-            scores.append(score)
-
-        if not scores:
-            return 0.0
-
-        # Нормализуем: среднее по всем параметрам → значение в [0;1]
-        avg_score = sum(scores) / len(scores)
-        return 1 - avg_score
+        return float(self.eval_exemplars([exemplar])[0])
+
+    def eval_exemplars(self, exemplars: Sequence[Exemplar]) -> np.ndarray:
+        """Оценки списка экземпляров: каждый параметр оценивается одним проходом по всем экземплярам."""
+        scores = np.zeros(len(exemplars))
+        for i, param_scores in enumerate(self._score_params_of_exemplars(exemplars)):
+            if len(param_scores):
+                # Нормализуем: среднее по всем параметрам → значение в [0;1]
+                avg_score = sum(param_scores) / len(param_scores)
+                scores[i] = 1 - avg_score
+        return scores
 
 
 if __name__ == "__main__":
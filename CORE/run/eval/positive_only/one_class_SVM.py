@@ -1,3 +1,5 @@
+from typing import List, Optional, Sequence, Tuple, Union
+
 from sklearn.preprocessing import RobustScaler  # более устойчив к выбросам
 from sklearn.preprocessing import StandardScaler
 from sklearn.svm import OneClassSVM
@@ -5,10 +7,10 @@ import numpy as np
 
 from CORE.datasets_wrappers.form_associated.parametrised_dataset import ParametrisedDataset
 from CORE.run import Exemplar
-from CORE.run.eval.base_eval import BaseEvaluator
+from CORE.run.eval.base_eval import BaseEvaluator, SubmodelsMixin
 
 
-class OneClassSVMEvaluator(BaseEvaluator):
+class OneClassSVMEvaluator(SubmodelsMixin, BaseEvaluator):
     """
     Оценка экземпляра через One-Class SVM.
 
@@ -30,6 +32,7 @@ class OneClassSVMEvaluator(BaseEvaluator):
             normalize: bool = True,
             use_robust_scaler: bool = True
     ):
+        super().__init__()
         self.positive_dataset = positive_dataset
         self.param_names = positive_dataset.param_names
         self.nu = nu
@@ -59,53 +62,58 @@ class OneClassSVMEvaluator(BaseEvaluator):
         # Вычисляем эталонные оценки для калибровки
         self.reference_scores = self.svm.score_samples(self.data_normalized)
 
-    def _sigmoid_normalize(self, score: float, reference_scores: np.ndarray) -> float:
-        """Нормализует оценку SVM в интервал [0; 1] через сигмоиду."""
+    def _sigmoid_normalize(self, scores: np.ndarray, reference_scores: np.ndarray) -> np.ndarray:
+        """Нормализует оценки SVM в интервал [0; 1] через сигмоиду."""
         # Масштабируем относительно медианы эталонных оценок
         median_score = np.median(reference_scores)
-        scaled = (score - median_score) / (reference_scores.std() + 1e-8)
+        scaled = (scores - median_score) / (reference_scores.std() + 1e-8)
 
         # Сигмоида: 1 / (1 + exp(-scaled))
         normalized = 1.0 / (1.0 + np.exp(-scaled))
-        return float(normalized)
+        return normalized
 
     def eval_exemplar(self, exemplar: Exemplar) -> float:
         """Возвращает оценку экземпляра в [0; 1]."""
-        # Получаем вектор, матрицу и список общих параметров
-        x, data_matrix, common_params = self._get_common_data(
-            exemplar, self.param_names, self.positive_dataset
-        )
+        return float(self.eval_exemplars([exemplar])[0])
+
+    def eval_exemplars(self, exemplars: Sequence[Exemplar]) -> np.ndarray:
+        """ Оценки списка экземпляров: по одному вызову SVM на каждый набор общих параметров """
+        return self._eval_exemplars_by_common_params(exemplars, self.param_names)
+
+    def _score_matrix(self, common_params: List[str], matrix: np.ndarray) -> np.ndarray:
+        # SVM, обученный на актуальных данных (обучается один раз на каждый набор параметров)
+        scaler, svm, reference_scores = self._get_submodel(common_params)
 
-        # Если нет общих параметров, возвращаем минимальную оценку
-        if x is None:
-            return 0.0
+        # Нормализуем экземпляры тем же скейлером, что и датасет
+        x_normalized = scaler.transform(matrix) if scaler is not None else matrix
+
+        # Получаем оценки
+        svm_scores = svm.score_samples(x_normalized)
+
+        # Нормализуем через сигмоиду
+        return self._sigmoid_normalize(svm_scores, reference_scores)
+
+    def _fit_submodel(self, common_params: List[str]) -> Tuple[
+        Optional[Union[RobustScaler, StandardScaler]], OneClassSVM, np.ndarray]:
+        """ Скейлер, One-Class SVM и эталонные оценки датасета только по параметрам common_params """
+        data_matrix = self._get_dataset_matrix(self.positive_dataset, common_params)
 
         # Нормализуем данные
         if self.normalize:
             if self.use_robust_scaler:
-                temp_scaler = RobustScaler()
+                scaler = RobustScaler()
             else:
-                temp_scaler = StandardScaler()
-            data_normalized = temp_scaler.fit_transform(data_matrix)
-            x_normalized = temp_scaler.transform(x)
+                scaler = StandardScaler()
+            data_normalized = scaler.fit_transform(data_matrix)
         else:
+            scaler = None
             data_normalized = data_matrix
-            x_normalized = x
 
         # Обучаем SVM на актуальных данных
-        temp_svm = OneClassSVM(kernel=self.svm.kernel, nu=self.nu, gamma=self.gamma)
-        temp_svm.fit(data_normalized)
-
-        # Получаем оценку
-        svm_score = temp_svm.score_samples(x_normalized)[0]
-
-        # Получаем эталонные оценки для нормализации
-        temp_reference_scores = temp_svm.score_samples(data_normalized)
-
-        # Нормализуем через сигмоиду
-        score = self._sigmoid_normalize(svm_score, temp_reference_scores)
+        svm = OneClassSVM(kernel=self.svm.kernel, nu=self.nu, gamma=self.gamma)
+        svm.fit(data_normalized)
 
-        return score
+        return scaler, svm, svm.score_samples(data_normalized)
 
 
 if __name__ == "__main__":
@@ -1,3 +1,5 @@
+from typing import List, Optional, Sequence, Tuple
+
 import numpy as np
 from sklearn.covariance import EllipticEnvelope
 from sklearn.preprocessing import StandardScaler
@@ -5,10 +7,10 @@ from scipy.stats import chi2
 
 from CORE.datasets_wrappers.form_associated.parametrised_dataset import ParametrisedDataset
 from CORE.run import Exemplar
-from CORE.run.eval.base_eval import BaseEvaluator
+from CORE.run.eval.base_eval import BaseEvaluator, SubmodelsMixin
 
 
-class EllipticEnvelopeEvaluator(BaseEvaluator):
+class EllipticEnvelopeEvaluator(SubmodelsMixin, BaseEvaluator):
     """
     Оценка экземпляра через Elliptic Envelope (Robust Mahalanobis distance).
 
@@ -29,6 +31,7 @@ class EllipticEnvelopeEvaluator(BaseEvaluator):
             normalize: bool = True,
             random_state: int = None
     ):
+        super().__init__()
         self.positive_dataset = positive_dataset
         self.all_param_names = positive_dataset.param_names
         self.contamination = contamination
@@ -36,23 +39,19 @@ class EllipticEnvelopeEvaluator(BaseEvaluator):
         self.normalize = normalize
         self.random_state = random_state
 
-    def _get_model_for_params(self, param_names: list) -> tuple:
+    def _fit_submodel(self, common_params: List[str]) -> Tuple[Optional[StandardScaler], EllipticEnvelope, np.ndarray]:
         """
-        Обучает Elliptic Envelope для указанных параметров.
+        Обучает Elliptic Envelope для указанных параметров (один раз на каждый набор параметров,
+        поэтому при random_state=None все экземпляры с одним набором оцениваются одной и той же моделью).
 
         Args:
-            param_names (list): список имен параметров
+            common_params (list): список имен параметров
 
         Returns:
             tuple: (scaler, ee, reference_distances)
         """
         # Собираем данные только для указанных параметров
-        data_list = []
-        for param in param_names:
-            vals = self.positive_dataset.get_parameter_values(param)
-            data_list.append(vals)
-
-        data_matrix = np.array(data_list).T
+        data_matrix = self._get_dataset_matrix(self.positive_dataset, common_params)
 
         # Нормализация
         if self.normalize:
@@ -82,38 +81,34 @@ class EllipticEnvelopeEvaluator(BaseEvaluator):
         Используем хи-квадрат распределение для преобразования расстояния
         Махаланобиса в вероятность.
         """
-        # Получаем вектор, матрицу и список общих параметров
-        x, data_matrix, common_params = self._get_common_data(
-            exemplar, self.all_param_names, self.positive_dataset
-        )
+        return float(self.eval_exemplars([exemplar])[0])
 
-        # Если нет общих параметров, возвращаем минимальную оценку
-        if x is None:
-            return 0.0
+    def eval_exemplars(self, exemplars: Sequence[Exemplar]) -> np.ndarray:
+        """ Оценки списка экземпляров: по одному вызову модели на каждый набор общих параметров """
+        return self._eval_exemplars_by_common_params(exemplars, self.all_param_names)
 
-        # Обучаем модель для общих параметров
-        scaler, ee, reference_distances = self._get_model_for_params(common_params)
+    def _score_matrix(self, common_params: List[str], matrix: np.ndarray) -> np.ndarray:
+        # Модель для общих параметров (обучается один раз на каждый набор параметров)
+        scaler, ee, reference_distances = self._get_submodel(common_params)
 
-        # Нормализуем вектор
+        # Нормализуем векторы
         if scaler is not None:
-            x_normalized = scaler.transform(x)
+            x_normalized = scaler.transform(matrix)
         else:
-            x_normalized = x
+            x_normalized = matrix
 
-        # Вычисляем расстояние Махаланобиса
-        mahal_dist = ee.mahalanobis(x_normalized)[0]
+        # Вычисляем расстояния Махаланобиса
+        mahal_dists = ee.mahalanobis(x_normalized)
 
         # Преобразуем расстояние в вероятность через хи-квадрат
         # Степени свободы = количество признаков
         df = len(common_params)
-        p_value = 1 - chi2.cdf(mahal_dist, df)
+        p_values = 1 - chi2.cdf(mahal_dists, df)
 
         # p_value - это вероятность получить такое же или большее расстояние
         # для точки из того же распределения
         # Нормализуем в [0; 1], где 1 = идеальное совпадение
-        score = p_value
-
-        return float(score)
+        return p_values
 
 
 if __name__ == "__main__":
@@ -1,13 +1,15 @@
 from dataclasses import dataclass
 from statistics import mean, stdev
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Sequence
+
+import numpy as np
 
 from CORE.datasets_wrappers.form_associated.parametrised_dataset import ParametrisedDataset
 from CORE.run import Exemplar
-from CORE.run.eval.base_eval import BaseEvaluator
+from CORE.run.eval.base_eval import BaseEvaluator, ParamScoresMixin
 
 
-class SumDistsEval(BaseEvaluator):
+class SumDistsEval(ParamScoresMixin, BaseEvaluator):
     """
     Оценка экземпляра через нормированные отклонения параметров от матожидания позитивной выборки.
 
@@ -51,6 +53,10 @@ class SumDistsEval(BaseEvaluator):
 
     def _eval_one_param(self, param_name: str, real_value: float) -> float:
         """Вычисляет оценку похожести одного параметра на выборку (чем выше, тем лучше)."""
+        return float(self._score_param_values(param_name, np.array([real_value], dtype=float))[0])
+
+    def _score_param_values(self, param_name: str, values: np.ndarray) -> np.ndarray:
+        """Оценки похожести сразу для массива значений параметра (см. _eval_one_param)."""
         mu_sigma = self.param_to_mu_sigma.get(param_name)
         if mu_sigma is None:
             raise ValueError(f"Parameter '{param_name}' not found in training data.")
@@ -61,32 +67,28 @@ class SumDistsEval(BaseEvaluator):
         # Вычисляем нормированное отклонение
         if sigma == 0:
             # Если все значения в выборке одинаковы, отклонение не имеет смысла — максимальная похожесть
-            normalized_deviation = 0.0
+            normalized_deviations = np.zeros(len(values))
         else:
-            normalized_deviation = abs(real_value - mu) / sigma
+            normalized_deviations = np.abs(values - mu) / sigma
 
         # Преобразуем отклонение в оценку похожести: чем меньше отклонение, тем выше оценка
         # Используем сигмоидоподобное преобразование для плавного перехода в [0;1]
-        score = 1.0 / (1.0 + normalized_deviation)
+        scores = 1.0 / (1.0 + normalized_deviations)
 
-        return score
+        return scores
 
     def eval_exemplar(self, exemplar: Exemplar) -> float:
         """Возвращает итоговую оценку экземпляра: среднее по оценкам параметров в интервале [0;1]."""
-        scores = []
-        params_names = exemplar.get_param_names()
-
-        for param_name in params_names:
-            real_val = exemplar.get_parameter_value(param_name)
-            score = self._eval_one_param(param_name, real_val)
-            scores.append(score)
-
-        if not scores:
-            return 0.0
-
-        # Нормализуем: среднее по всем параметрам → значение в [0; 1]
-        avg_score = sum(scores) / len(scores)
-        return avg_score
+        return float(self.eval_exemplars([exemplar])[0])
+
+    def eval_exemplars(self, exemplars: Sequence[Exemplar]) -> np.ndarray:
+        """Оценки списка экземпляров: отклонения каждого параметра считаются разом для всех экземпляров."""
+        avg_scores = np.zeros(len(exemplars))
+        for i, param_scores in enumerate(self._score_params_of_exemplars(exemplars)):
+            if len(param_scores):
+                # Нормализуем: среднее по всем параметрам → значение в [0; 1]
+                avg_scores[i] = sum(param_scores.tolist()) / len(param_scores)
+        return avg_scores
 
 
 if __name__ == "__main__":
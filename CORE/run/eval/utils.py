@@ -0,0 +1,39 @@
+import numpy as np
+from scipy.linalg import solve_triangular
+
+
+def cholesky_with_regularization(cov_matrix: np.ndarray, epsilon: float = 1e-8, max_attempts: int = 10) -> np.ndarray:
+    """
+    Нижний треугольный множитель Холецкого L ковариационной матрицы (cov = L @ L.T).
+    Если матрица вырождена (не положительно определена), к диагонали добавляется epsilon,
+    который увеличивается в 10 раз до тех пор, пока разложение не получится.
+
+    :param cov_matrix: ковариационная матрица (для одного параметра допустим скаляр, как его возвращает np.cov)
+    :param epsilon: начальная регуляризация
+    :param max_attempts: сколько раз пробовать увеличить регуляризацию
+    :raises np.linalg.LinAlgError: если разложить не удалось (например, в данных есть NaN)
+    :return: матрица L
+    """
+    cov_matrix = np.atleast_2d(cov_matrix)
+    identity = np.eye(len(cov_matrix))
+    regularization = 0.0
+    for _ in range(max_attempts + 1):
+        try:
+            return np.linalg.cholesky(cov_matrix + regularization * identity)
+        except np.linalg.LinAlgError:
+            regularization = epsilon if regularization == 0.0 else regularization * 10
+    raise np.linalg.LinAlgError("Не удалось разложить ковариационную матрицу по Холецкому")
+
+
+def mahalanobis_squared(points: np.ndarray, mean_vector: np.ndarray, chol_factor: np.ndarray) -> np.ndarray:
+    """
+    Квадраты расстояний Махаланобиса от точек до среднего: |L^-1 (x - mean)|^2 (одно треугольное решение).
+
+    :param points: матрица (n_points, n_features) или один вектор (n_features,)
+    :param mean_vector: вектор средних (n_features,)
+    :param chol_factor: множитель Холецкого ковариационной матрицы, см. cholesky_with_regularization
+    :return: массив (n_points,) или скаляр для одного вектора
+    """
+    diff = np.asarray(points, dtype=float) - mean_vector
+    z = solve_triangular(chol_factor, diff.T, lower=True)
+    return np.sum(z * z, axis=0)
@@ -1,3 +1,6 @@
+from typing import Sequence
+
+import numpy as np
 from sklearn.model_selection import cross_val_score
 from sklearn.neighbors import KNeighborsClassifier
 from sklearn.preprocessing import StandardScaler
@@ -93,22 +96,29 @@ class KNNBinaryEvaluator(BaseEvaluator):
         """
         Возвращает вероятность принадлежности экземпляра к позитивному классу.
         """
-        # Получаем вектор значений
+        return float(self.eval_exemplars([exemplar])[0])
+
+    def eval_exemplars(self, exemplars: Sequence[Exemplar]) -> np.ndarray:
+        """
+        Вероятности принадлежности к позитивному классу для списка экземпляров (один вызов predict_proba).
+        """
+        if len(exemplars) == 0:
+            return np.zeros(0)
+
+        # Получаем матрицу значений
         x_raw = np.array([[
             exemplar.get_parameter_value(p) for p in self.param_names
-        ]])
+        ] for exemplar in exemplars])
 
         # Нормализуем
         x = self.scaler.transform(x_raw)
 
         # Получаем вероятности
-        proba = self.knn.predict_proba(x)[0]
+        proba = self.knn.predict_proba(x)
 
         # Находим индекс позитивного класса (метка 1)
         pos_class_idx = np.where(self.knn.classes_ == 1)[0][0]
-        score = proba[pos_class_idx]
-
-        return float(score)
+        return proba[:, pos_class_idx]
 
 
 if __name__ == "__main__":
@@ -1,3 +1,6 @@
+from typing import Sequence
+
+import numpy as np
 from sklearn.preprocessing import StandardScaler
 from sklearn.svm import SVC
 
@@ -59,20 +62,29 @@ class RBFSVMEvaluator(BaseEvaluator):
         """
         Возвращает вероятность принадлежности к позитивному классу.
         """
-        # Получаем вектор значений
-        x_raw = np.array([[exemplar.get_parameter_value(p) for p in self.param_names]])
+        return float(self.eval_exemplars([exemplar])[0])
+
+    def eval_exemplars(self, exemplars: Sequence[Exemplar]) -> np.ndarray:
+        """
+        Вероятности принадлежности к позитивному классу для списка экземпляров (один вызов predict_proba).
+        """
+        if len(exemplars) == 0:
+            return np.zeros(0)
+
+        # Получаем матрицу значений
+        x_raw = np.array([[
+            exemplar.get_parameter_value(p) for p in self.param_names
+        ] for exemplar in exemplars])
 
         # Нормализуем
         x = self.scaler.transform(x_raw)
 
-        # Получаем вероятность класса 1
-        proba = self.svm.predict_proba(x)[0]
+        # Получаем вероятности
+        proba = self.svm.predict_proba(x)
 
-        # Находим индекс позитивного класса
+        # Находим индекс позитивного класса (метка 1)
         pos_class_idx = np.where(self.svm.classes_ == 1)[0][0]
-        score = proba[pos_class_idx]
-
-        return float(score)
+        return proba[:, pos_class_idx]
 
 
 if __name__ == "__main__":
@@ -1,3 +1,6 @@
+from typing import Sequence
+
+import numpy as np
 from sklearn.ensemble import GradientBoostingClassifier
 
 from CORE.datasets_wrappers.form_associated.parametrised_dataset import ParametrisedDataset
@@ -62,19 +65,26 @@ class GradientBoostingEvaluator(BaseEvaluator):
         """
         Возвращает вероятность принадлежности к позитивному классу.
         """
-        # Получаем вектор значений
+        return float(self.eval_exemplars([exemplar])[0])
+
+    def eval_exemplars(self, exemplars: Sequence[Exemplar]) -> np.ndarray:
+        """
+        Вероятности принадлежности к позитивному классу для списка экземпляров (один вызов predict_proba).
+        """
+        if len(exemplars) == 0:
+            return np.zeros(0)
+
+        # Получаем матрицу значений
         x = np.array([[
             exemplar.get_parameter_value(p) for p in self.param_names
-        ]])
+        ] for exemplar in exemplars])
 
         # Получаем вероятности
-        proba = self.gb.predict_proba(x)[0]
+        proba = self.gb.predict_proba(x)
 
-        # Находим индекс позитивного класса
+        # Находим индекс позитивного класса (метка 1)
         pos_class_idx = np.where(self.gb.classes_ == 1)[0][0]
-        score = proba[pos_class_idx]
-
-        return float(score)
+        return proba[:, pos_class_idx]
 
 
 if __name__ == "__main__":
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Optional, Sequence
 
 import numpy as np
 import torch
@@ -270,23 +270,21 @@ class PyTorchMLPEvaluator(BaseEvaluator):
         """
         Возвращает вероятность принадлежности к позитивному классу.
         """
-        # Получаем вектор значений
-        x_raw = np.array([[
-            exemplar.get_parameter_value(p) for p in self.param_names
-        ]])
-
-        # Нормализуем
-        x = self.scaler.transform(x_raw)
+        return float(self.eval_exemplars([exemplar])[0])
 
-        # Преобразуем в тензор и предсказываем
-        self.model.eval()
-        x_tensor = torch.FloatTensor(x).to(self.device)
+    def eval_exemplars(self, exemplars: Sequence[Exemplar]) -> np.ndarray:
+        """
+        Вероятности принадлежности к позитивному классу для списка экземпляров (один проход сети, см. predict_proba_batch).
+        """
+        if len(exemplars) == 0:
+            return np.zeros(0)
 
-        with torch.no_grad():
-            logits = self.model(x_tensor)
-            probability = torch.sigmoid(logits).cpu().numpy()[0, 0]
+        # Получаем матрицу значений
+        x_raw = np.array([[
+            exemplar.get_parameter_value(p) for p in self.param_names
+        ] for exemplar in exemplars])
 
-        return float(probability)
+        return self.predict_proba_batch(x_raw)
 
     def predict_proba_batch(self, X: np.ndarray) -> np.ndarray:
         """
@@ -1,4 +1,8 @@
-from typing import Any, Dict, Tuple, Optional, List
+from collections import ChainMap
+from copy import deepcopy
+from typing import Any, Callable, Dict, Tuple, Optional, List, MutableMapping, Sequence
+
+import numpy as np
 
 from CORE import Signal
 from CORE.logger import get_logger
@@ -7,20 +11,85 @@ logger = get_logger(__name__)
 from CORE.exeptions import CoreError
 
 
+class ExemplarLayout:
+    """ Раскладка экземпляров одной формы: в какой ячейке массива значений экземпляра лежит
+    координата какой точки и значение какого параметра (сначала все точки, затем все параметры).
+    Строится один раз на форму (см. from_schema) и разделяется всеми ее экземплярами.
+    """
+    __slots__ = ('point_names', 'param_names', 'point_index', 'param_index', 'n_points')
+
+    def __init__(self, point_names: Sequence[str], param_names: Sequence[str]):
+        """
+        :param point_names: имена точек в порядке ячеек (повторы отбрасываются)
+        :param param_names: имена параметров в порядке ячеек (повторы отбрасываются)
+        """
+        self.point_names: Tuple[str, ...] = tuple(dict.fromkeys(point_names))
+        self.param_names: Tuple[str, ...] = tuple(dict.fromkeys(param_names))
+        self.n_points = len(self.point_names)
+        # имя -> номер ячейки в массиве значений экземпляра
+        self.point_index: Dict[str, int] = {name: i for i, name in enumerate(self.point_names)}
+        self.param_index: Dict[str, int] = {name: self.n_points + i for i, name in enumerate(self.param_names)}
+
+    def __len__(self):
+        return self.n_points + len(self.param_names)
+
+    @classmethod
+    def from_schema(cls, schema) -> 'ExemplarLayout':
+        """
+        Раскладка по скомпилированной схеме формы: точки в порядке шагов, параметры в порядке запуска PC
+        (как их и получает растущий экземпляр), затем прочие точки и параметры формы.
+
+        :param schema: CORE.run.schema.Schema после compile()
+        """
+        steps = schema.steps_sorted
+        point_names = [step.get_step_obj().target_point.name for step in steps]
+        point_names += [point.name for point in schema.form.points]
+        param_names = schema.get_params_by_step_num(len(steps) - 1) if steps else []
+        param_names += [parameter.name for parameter in schema.form.parameters]
+        return cls(point_names, param_names)
+
+
+def _is_array_value(value: Any) -> bool:
+    """ Можно ли хранить значение в ячейке массива раскладки: float, но не NaN (NaN там значит "нет значения") """
+    return isinstance(value, float) and value == value
+
+
 class Exemplar:
     """ Экземпляр формы — конкретная расстановка точек на конкретном одномерном сигнале ЭКГ.
     С каждым шагом установки этот экземпляр получает новые точки и параметры, и таким образом "растет".
     Класс представляет собой геттеры-сеттеры с над точками, параметрами и оценкой экземпляра.
     По ходу роста оценка меняется из-вне. Перезапись существующих точек и параметров вызовет исключения.
+
+    Сигнал экземпляра неизменяем, поэтому при наращивании (make_child) и копировании он не копируется,
+    а разделяется между экземплярами. Вместо сигнала экземпляр может держать функцию его загрузки
+    (см. with_signal_loader) - тогда сигнал загружается при каждом обращении к signal и в экземпляре не хранится.
+
+    Если задана раскладка формы (ExemplarLayout, так делает RForm), координаты точек и значения
+    параметров лежат в одном массиве float по номерам ячеек раскладки (NaN - точки или параметра еще нет),
+    а словари _points и _parameters хранят только то, что в массив не попало (имена вне раскладки,
+    значения не float, NaN). Без раскладки (датасеты, копии в симуляторе) всё хранится в словарях.
     """
+    __slots__ = ('_signal', '_signal_loader', '_layout', '_data', '_track_ids', '_points', '_parameters',
+                 '_evaluation_result', 'failed_HCs_ids', 'passed_HCs_ids', 'id')
 
-    def __init__(self, signal: Signal):
+    def __init__(self, signal: Signal, layout: Optional[ExemplarLayout] = None):
         """
         :param signal: объект сигнала, на котором размещаются точки
+        :param layout: раскладка точек и параметров формы, None - хранить всё в словарях
         """
-        self.signal = signal
-        self._points: Dict[str, Tuple[float, int]] = {}  # Хранилище точек: имя -> (координата, track_id)
-        self._parameters: Dict[str, Any] = {}  # Хранилище параметров: имя -> значение
+        self._signal: Optional[Signal] = signal
+        self._signal_loader: Optional[Callable[[], Signal]] = None
+        self._layout: Optional[ExemplarLayout] = layout
+        if layout is None:
+            self._data: Optional[np.ndarray] = None
+            self._track_ids: Optional[List[Any]] = None
+            self._points: Optional[MutableMapping[str, Tuple[float, int]]] = {}  # имя -> (координата, track_id)
+            self._parameters: Optional[MutableMapping[str, Any]] = {}  # имя -> значение
+        else:
+            self._data = np.full(len(layout), np.nan)  # координаты точек и значения параметров по ячейкам раскладки
+            self._track_ids = [None] * layout.n_points
+            self._points = None  # точки и параметры вне массива, заводятся по необходимости
+            self._parameters = None
         self.evaluation_result: Optional[float] = None
 
         self.failed_HCs_ids: [List[int]] = []  # id проваленных жестких условий.
@@ -28,8 +97,103 @@ class Exemplar:
 
         self.id: Optional[Any] = None
 
+    @classmethod
+    def with_signal_loader(cls, signal_loader: Callable[[], Signal],
+                           layout: Optional[ExemplarLayout] = None) -> 'Exemplar':
+        """
+        Экземпляр, который вместо сигнала держит функцию его загрузки: так экземпляры датасета
+        не держат в памяти сигналы, а берут их по ключу записи из ограниченного кэша датасета.
+        Точки такого экземпляра добавляются без проверки выхода за сигнал (он еще не загружен).
+
+        :param signal_loader: функция без аргументов, возвращающая сигнал экземпляра
+        :param layout: раскладка точек и параметров формы (см. __init__)
+        """
+        exemplar = cls(None, layout)
+        exemplar._signal_loader = signal_loader
+        return exemplar
+
+    @property
+    def signal(self) -> Signal:
+        if self._signal is None and self._signal_loader is not None:
+            return self._signal_loader()
+        return self._signal
+
+    @signal.setter
+    def signal(self, signal: Signal) -> None:
+        self._signal = signal
+        self._signal_loader = None
+
+    @property
+    def layout(self) -> Optional[ExemplarLayout]:
+        return self._layout
+
+    def make_child(self) -> 'Exemplar':
+        """
+        Создает дочерний экземпляр для наращивания на следующем шаге.
+        Потомок ссылается на тот же сигнал (и ту же раскладку), массив значений раскладки копируется,
+        а точки и параметры из словарей видит через цепочку словарей (ChainMap):
+        новые точки и параметры пишутся только в собственный словарь потомка.
+        Родителя после создания потомков менять не следует — изменения словарей будут видны и в потомках.
+
+        :return: дочерний экземпляр с теми же точками, параметрами, оценкой и списками HC
+        """
+        child = Exemplar.__new__(Exemplar)
+        child._signal = self._signal
+        child._signal_loader = self._signal_loader
+        child._layout = self._layout
+        if self._layout is None:
+            child._data = child._track_ids = None
+        else:
+            child._data = self._data.copy()
+            child._track_ids = list(self._track_ids)
+        child._points = self._new_child_map(self._points)
+        child._parameters = self._new_child_map(self._parameters)
+        child._evaluation_result = self._evaluation_result
+        child.failed_HCs_ids = list(self.failed_HCs_ids)
+        child.passed_HCs_ids = list(self.passed_HCs_ids)
+        child.id = self.id
+        return child
+
+    @staticmethod
+    def _new_child_map(parent_map: Optional[MutableMapping]) -> Optional[ChainMap]:
+        if parent_map is None:
+            return None
+        if isinstance(parent_map, ChainMap):
+            return parent_map.new_child()
+        return ChainMap({}, parent_map)
+
+    def __deepcopy__(self, memo):
+        """
+        Глубокая копия экземпляра, которую можно менять как угодно (в т.ч. удалять точки).
+        Сигнал неизменяемый и поэтому не копируется (как и функция его загрузки). Копия всегда без раскладки: точки и параметры
+        (из массива и из цепочек словарей потомка) собираются в обычные словари.
+        """
+        new_exemplar = Exemplar.__new__(Exemplar)
+        memo[id(self)] = new_exemplar
+        new_exemplar._signal = self._signal
+        new_exemplar._signal_loader = self._signal_loader
+        new_exemplar._layout = new_exemplar._data = new_exemplar._track_ids = None
+        new_exemplar._points = deepcopy(self.get_points(), memo)
+        new_exemplar._parameters = deepcopy(self.get_parameters(), memo)
+        new_exemplar._evaluation_result = self._evaluation_result
+        new_exemplar.failed_HCs_ids = deepcopy(self.failed_HCs_ids, memo)
+        new_exemplar.passed_HCs_ids = deepcopy(self.passed_HCs_ids, memo)
+        new_exemplar.id = deepcopy(self.id, memo)
+        return new_exemplar
+
     def get_param_names(self) -> List[str]:
-        return list(self._parameters.keys())
+        """ Имена параметров экземпляра: сначала в порядке раскладки (если она есть), затем в порядке добавления """
+        names = []
+        if self._layout is not None:
+            values = self._data.tolist()[self._layout.n_points:]
+            names = [name for name, value in zip(self._layout.param_names, values) if value == value]
+        if self._parameters:
+            names.extend(self._parameters.keys())
+        return names
+
+    def get_parameters(self) -> Dict[str, Any]:
+        """ Все параметры экземпляра: имя -> значение, в порядке get_param_names() """
+        return {name: self.get_parameter_value(name) for name in self.get_param_names()}
 
     def add_point(self, point_name: str, point_coord_t: float, track_id: Any) -> bool:
         """
@@ -43,17 +207,46 @@ class Exemplar:
         :raises ValueError: при попытке перезаписи
         """
         # Проверяем, что имя точки ещё не используется
-        if point_name in self._points:
+        if self.contains_point(point_name):
             raise CoreError(f"Точка {point_name} уже сущетсвует, не должно возникать попыток перезаписи")
 
-        # Проверяем, что момент времени находится в пределах сигнала
-        if not self.signal.is_moment_in_signal(point_coord_t):
+        # Проверяем, что момент времени находится в пределах сигнала (незагруженный сигнал не трогаем)
+        if self._signal is not None and not self._signal.is_moment_in_signal(point_coord_t):
             return False
 
         # Добавляем точку (сохраняем пару: координата + track_id)
+        if self._layout is not None:
+            i = self._layout.point_index.get(point_name)
+            if i is not None and _is_array_value(point_coord_t):
+                self._data[i] = point_coord_t
+                self._track_ids[i] = track_id
+                return True
+            if self._points is None:
+                self._points = {}
         self._points[point_name] = (point_coord_t, track_id)
         return True
 
+    def _get_point(self, point_name: str) -> Optional[Tuple[float, Any]]:
+        """ Пара (координата, track_id) точки или None, если точки нет """
+        if self._layout is not None:
+            i = self._layout.point_index.get(point_name)
+            if i is not None and self._data[i] == self._data[i]:
+                return self._data.item(i), self._track_ids[i]
+        if self._points:
+            return self._points.get(point_name)
+        return None
+
+    def get_points(self) -> Dict[str, Tuple[float, Any]]:
+        """ Все точки экземпляра: имя -> (координата, track_id), сначала в порядке раскладки, затем в порядке добавления """
+        points = {}
+        if self._layout is not None:
+            for name, coord, track_id in zip(self._layout.point_names, self._data.tolist(), self._track_ids):
+                if coord == coord:
+                    points[name] = (coord, track_id)
+        if self._points:
+            points.update(self._points)
+        return points
+
     def contains_point(self, point_name: str) -> bool:
         """
         Проверяет наличие точки с заданным именем.
@@ -61,7 +254,7 @@ class Exemplar:
         :param point_name: имя точки
         :return: True, если точка существует, False иначе
         """
-        return point_name in self._points
+        return self._get_point(point_name) is not None
 
     def get_point_coord(self, point_name: str) -> Optional[float]:
         """
@@ -70,10 +263,11 @@ class Exemplar:
         :param point_name: имя точки
         :return: временная координата точки в секундах, None если точка не найдена
         """
-        if not self.contains_point(point_name):
+        point = self._get_point(point_name)
+        if point is None:
             return None
 
-        return self._points[point_name][0]  # Возвращаем только координату (первый элемент пары)
+        return point[0]  # Возвращаем только координату (первый элемент пары)
 
     def get_point_track_id(self, point_name: str) -> Any:
         """
@@ -83,10 +277,11 @@ class Exemplar:
         :return: идентификатор трека, связанный с точкой
         :raises ValueError: если точка не найдена
         """
-        if not self.contains_point(point_name):
+        point = self._get_point(point_name)
+        if point is None:
             raise CoreError(f"Точка {point_name} не найдена")
 
-        return self._points[point_name][1]  # Возвращаем track_id (второй элемент пары)
+        return point[1]  # Возвращаем track_id (второй элемент пары)
 
     def add_parameter(self, param_name: str, param_value: Any) -> None:
         """
@@ -98,9 +293,16 @@ class Exemplar:
         """
 
         # Если параметр уже существует
-        if param_name in self._parameters:
+        if self.contains_parameter(param_name):
             raise CoreError(f"{param_name} уже сущетсвует, не должно возникать попыток перезаписи")
 
+        if self._layout is not None:
+            i = self._layout.param_index.get(param_name)
+            if i is not None and _is_array_value(param_value):
+                self._data[i] = param_value
+                return
+            if self._parameters is None:
+                self._parameters = {}
         self._parameters[param_name] = param_value
 
 
@@ -111,7 +313,11 @@ class Exemplar:
         :param param_name: имя параметра
         :return: True, если параметр существует, False иначе
         """
-        return param_name in self._parameters
+        if self._layout is not None:
+            i = self._layout.param_index.get(param_name)
+            if i is not None and self._data[i] == self._data[i]:
+                return True
+        return bool(self._parameters) and param_name in self._parameters
 
     def get_parameter_value(self, param_name: str) -> Optional[Any]:
         """
@@ -120,10 +326,72 @@ class Exemplar:
         :param param_name: имя параметра
         :return: значение параметра, None если параметр не найден
         """
-        if not self.contains_parameter(param_name):
+        if self._layout is not None:
+            i = self._layout.param_index.get(param_name)
+            if i is not None and self._data[i] == self._data[i]:
+                return self._data.item(i)
+        if not self._parameters:
             return None
 
-        return self._parameters[param_name]
+        return self._parameters.get(param_name)
+
+    @staticmethod
+    def get_shared_layout(exemplars: Sequence['Exemplar']) -> Optional[ExemplarLayout]:
+        """
+        Общая раскладка экземпляров, если все параметры всех экземпляров лежат в ее массивах
+        (тогда их можно брать из массивов значений целиком, см. parameters_matrix), иначе None.
+        """
+        if not exemplars:
+            return None
+        layout = getattr(exemplars[0], '_layout', None)
+        if layout is None:
+            return None
+        for exemplar in exemplars:
+            if not isinstance(exemplar, Exemplar) or exemplar._layout is not layout or exemplar._parameters:
+                return None
+        return layout
+
+    @staticmethod
+    def parameters_matrix(exemplars: Sequence['Exemplar'], param_names: Sequence[str]) -> np.ndarray:
+        """
+        Матрица значений параметров (len(exemplars), len(param_names)), строки в порядке экземпляров.
+        У экземпляров с общей раскладкой столбцы берутся прямо из их массивов значений,
+        у остальных (без раскладки, любые объекты с get_parameter_value) - по именам.
+        Отсутствующий параметр - NaN.
+        """
+        layout = Exemplar.get_shared_layout(exemplars)
+        if layout is not None and all(name in layout.param_index for name in param_names):
+            columns = [layout.param_index[name] for name in param_names]
+            return np.stack([exemplar._data for exemplar in exemplars])[:, columns]
+        return np.array([[exemplar.get_parameter_value(name) for name in param_names] for exemplar in exemplars],
+                        dtype=float).reshape(len(exemplars), len(param_names))
+
+    @staticmethod
+    def collect_parameters(exemplars: Sequence['Exemplar']) -> Tuple[np.ndarray, np.ndarray, np.ndarray, List[str]]:
+        """
+        Все пары (экземпляр, параметр) списка экземпляров одним "длинным" набором массивов -
+        для оценщиков, оценивающих каждый параметр по отдельности.
+
+        :return: (exemplar_indices, param_codes, values, code_names), где для каждой пары
+                 exemplar_indices - номер экземпляра в списке, param_codes - номер имени параметра в code_names,
+                 values - значение параметра (float). Пары идут по экземплярам, внутри экземпляра -
+                 в порядке его get_param_names()
+        """
+        layout = Exemplar.get_shared_layout(exemplars)
+        if layout is not None:
+            matrix = np.stack([exemplar._data for exemplar in exemplars])[:, layout.n_points:]
+            exemplar_indices, param_codes = np.nonzero(~np.isnan(matrix))
+            return exemplar_indices, param_codes, matrix[exemplar_indices, param_codes], list(layout.param_names)
+
+        codes: Dict[str, int] = {}
+        exemplar_indices, param_codes, values = [], [], []
+        for i, exemplar in enumerate(exemplars):
+            for param_name in exemplar.get_param_names():
+                exemplar_indices.append(i)
+                param_codes.append(codes.setdefault(param_name, len(codes)))
+                values.append(exemplar.get_parameter_value(param_name))
+        return (np.array(exemplar_indices, dtype=int), np.array(param_codes, dtype=int),
+                np.array(values, dtype=float), list(codes))
 
     def get_signal(self) -> Signal:
         """
@@ -162,7 +430,10 @@ class Exemplar:
         self._evaluation_result = value
 
     def __len__(self):
-        return len(self._points)
+        n_points = len(self._points) if self._points else 0
+        if self._layout is not None:
+            n_points += sum(coord == coord for coord in self._data.tolist()[:self._layout.n_points])
+        return n_points
 
     def get_failed_hc_ids(self) -> List[int]:
         """Возвращает список ID проваленных жестких условий."""
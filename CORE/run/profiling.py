@@ -0,0 +1,269 @@
+"""
+Профилирование запуска формы: сколько времени и сколько раз работал каждый шаг, трек, пазл и оценщик
+(RunProfiler), и как эти запуски шли во времени (ChromeTracer).
+
+По умолчанию run-слой ничего не замеряет. Наблюдатель (RunObserver) подключается к форме
+через RForm.set_observer (или attach_profiler, attach_tracer) - тогда каждый запуск объекта run-слоя сообщает
+наблюдателю о своем начале и конце. Без наблюдателя цена - одна проверка атрибута на запуск.
+
+Пример:
+    profiler = attach_profiler(rform)
+    rform.run(signal, seminal_point)
+    print(profiler.summary())
+
+    tracer = attach_tracer(rform)
+    rform.run(signal, seminal_point)
+    tracer.save('run_trace.json')  # открыть в ui.perfetto.dev или speedscope.app
+"""
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from CORE.visual_debug.results_datcalsses.step_res import StepRes
+from CORE.visual_debug.results_datcalsses.track_res import TrackRes
+
+# Виды объектов run-слоя, о запусках которых сообщается наблюдателю (пазлы - по CLASS_TYPES)
+FORM = 'form'
+POOL = 'pool'  # шаг формы для всего пула экземпляров (внутри - запуски шага на каждом родительском экземпляре)
+STEP = 'step'
+TRACK = 'track'
+PARAMETRISE = 'parametrise'  # все PC шага на одном экземпляре
+CONDITIONS = 'conditions'  # все HC на одном экземпляре
+EVAL = 'eval'
+
+
+class RunObserver:
+    """
+    Наблюдатель запуска формы. Получает начало (begin) и конец (end) каждого запуска:
+    kind - вид объекта (FORM, POOL, STEP, TRACK, PARAMETRISE, CONDITIONS, EVAL или тип пазла 'SM', 'PS', 'PC', 'HC'),
+    obj_id - его id (id пазла, трека или формы в базе, номер шага в форме), name - имя для отчета.
+    Запуски вложены: конец всегда приходит к последнему начатому. Базовый класс ничего не делает.
+    """
+
+    def begin(self, kind: str, obj_id: Any, name: str) -> None:
+        pass
+
+    def end(self, kind: str, obj_id: Any, name: str, result: Any, error: Optional[BaseException]) -> None:
+        """
+        :param result: то, что вернул запуск (None, если было исключение)
+        :param error: исключение, которым закончился запуск, или None
+        """
+        pass
+
+    def observe(self, kind: str, obj_id: Any, name: str, func: Callable, *args, **kwargs) -> Any:
+        """ Выполняет func(*args, **kwargs), сообщая о начале и конце; исключения пробрасываются дальше """
+        self.begin(kind, obj_id, name)
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            self.end(kind, obj_id, name, None, e)
+            raise
+        self.end(kind, obj_id, name, result, None)
+        return result
+
+
+def output_size(result: Any) -> Optional[int]:
+    """
+    Размер результата запуска для отчета: длина сигнала SM, число точек PS и трека,
+    число параметров PC, число дочерних экземпляров шага, размер пула, число оценок оценщика.
+    None - у результата нет размера (HC, параметризация).
+    """
+    if isinstance(result, tuple):  # RStep.run: (StepRes, экземпляры)
+        return len(result[1])
+    if isinstance(result, TrackRes):
+        return len(result.get_all_ps_coords_flat())
+    if hasattr(result, '__len__'):  # Signal, списки, словари, массивы оценок
+        return len(result)
+    return None
+
+
+@dataclass
+class RunStats:
+    """ Накопленная статистика запусков одного объекта run-слоя """
+    kind: str
+    obj_id: Any
+    name: str
+    calls: int = 0
+    total_s: float = 0.0  # все время запусков, вместе с вложенными
+    self_s: float = 0.0  # время без вложенных запусков (например, трек без своих SM и PS)
+    max_s: float = 0.0
+    output_size: int = 0  # суммарный размер результатов, см. output_size
+    errors: Dict[str, int] = field(default_factory=dict)  # имя класса исключения -> сколько раз
+
+    @property
+    def mean_s(self) -> float:
+        return self.total_s / self.calls if self.calls else 0.0
+
+    @property
+    def errors_count(self) -> int:
+        return sum(self.errors.values())
+
+
+@dataclass
+class SpanProfile:
+    """ Один запуск объекта run-слоя с вложенными запусками - прикрепляется к StepRes и TrackRes """
+    kind: str
+    obj_id: Any
+    name: str
+    elapsed_s: float = 0.0
+    output_size: Optional[int] = None
+    error: Optional[str] = None
+    children: List['SpanProfile'] = field(default_factory=list)
+
+    def get_children_by_kind(self, kind: str) -> List['SpanProfile']:
+        return [child for child in self.children if child.kind == kind]
+
+    def format(self, indent: str = '') -> str:
+        """ Дерево запуска в текстовом виде (например, для карточек шага и трека в симуляторе) """
+        line = f"{indent}{self.kind} {self.obj_id} {self.name}: {self.elapsed_s * 1e3:.3f} ms".rstrip()
+        if self.output_size is not None:
+            line += f", размер {self.output_size}"
+        if self.error is not None:
+            line += f", {self.error}"
+        return '\n'.join([line] + [child.format(indent + '  ') for child in self.children])
+
+
+class RunProfiler(RunObserver):
+    """
+    Наблюдатель, который копит по каждому объекту (вид, id) число запусков, время, исключения
+    и размеры результатов, а к результатам шагов и треков (StepRes.profile, TrackRes.profile)
+    прикрепляет профиль именно этого запуска.
+
+    Запуски SM и PS, результат которых взят из кэша треков, не выполняются и не считаются.
+    """
+
+    def __init__(self):
+        self.stats: Dict[Tuple[str, Any], RunStats] = {}
+        self._stack: List[Tuple[SpanProfile, float, float]] = []  # (профиль, начало, время вложенных)
+
+    def reset(self) -> None:
+        self.stats.clear()
+        self._stack.clear()
+
+    def begin(self, kind: str, obj_id: Any, name: str) -> None:
+        self._stack.append((SpanProfile(kind=kind, obj_id=obj_id, name=name), time.perf_counter(), 0.0))
+
+    def end(self, kind: str, obj_id: Any, name: str, result: Any, error: Optional[BaseException]) -> None:
+        span, start, children_s = self._stack.pop()
+        elapsed = time.perf_counter() - start
+        span.elapsed_s = elapsed
+        if self._stack:
+            parent, parent_start, parent_children_s = self._stack[-1]
+            parent.children.append(span)
+            self._stack[-1] = (parent, parent_start, parent_children_s + elapsed)
+
+        stats = self.stats.get((kind, obj_id))
+        if stats is None:
+            stats = self.stats[(kind, obj_id)] = RunStats(kind=kind, obj_id=obj_id, name=name)
+        stats.calls += 1
+        stats.total_s += elapsed
+        stats.self_s += elapsed - children_s
+        stats.max_s = max(stats.max_s, elapsed)
+
+        if error is not None:
+            error_name = type(error).__name__
+            span.error = error_name
+            stats.errors[error_name] = stats.errors.get(error_name, 0) + 1
+            return
+
+        span.output_size = output_size(result)
+        if span.output_size is not None:
+            stats.output_size += span.output_size
+        res = result[0] if isinstance(result, tuple) else result
+        if isinstance(res, (StepRes, TrackRes)):
+            res.profile = span
+
+    def get_stats(self, kind: str, obj_id: Any) -> Optional[RunStats]:
+        return self.stats.get((kind, obj_id))
+
+    def get_sorted_stats(self, sort_by: str = 'self_s') -> List[RunStats]:
+        """ Статистика всех объектов по убыванию поля sort_by (total_s, self_s, calls, max_s, ...) """
+        return sorted(self.stats.values(), key=lambda stats: getattr(stats, sort_by), reverse=True)
+
+    def summary(self, sort_by: str = 'self_s', limit: Optional[int] = None) -> str:
+        """ Таблица статистики для печати: самые затратные объекты сверху """
+        rows = self.get_sorted_stats(sort_by)[:limit]
+        lines = [f"{'вид':<6} {'id':>6} {'имя':<28} {'вызовов':>8} {'всего, ms':>10} {'своё, ms':>10} "
+                 f"{'сред, ms':>9} {'макс, ms':>9} {'размер':>8}  исключения"]
+        for stats in rows:
+            errors = ', '.join(f"{name}: {count}" for name, count in sorted(stats.errors.items()))
+            lines.append(f"{stats.kind:<6} {str(stats.obj_id):>6} {stats.name[:28]:<28} {stats.calls:>8} "
+                         f"{stats.total_s * 1e3:>10.2f} {stats.self_s * 1e3:>10.2f} {stats.mean_s * 1e3:>9.3f} "
+                         f"{stats.max_s * 1e3:>9.3f} {stats.output_size:>8}  {errors}")
+        return '\n'.join(lines)
+
+
+class ChromeTracer(RunObserver):
+    """
+    Записывает запуски как вложенные интервалы (события B/E) в формате Chrome Trace Event,
+    который открывается в Perfetto (ui.perfetto.dev), chrome://tracing и speedscope.
+
+    На одну установку формы получается дерево: форма -> шаги для пула -> шаг на каждом родительском
+    экземпляре -> треки -> SM, PS; параметризация -> PC; проверка условий -> HC; вызов оценщика.
+    События копятся в памяти, поэтому трассировать стоит отдельные записи, а не весь пакет.
+    """
+
+    def __init__(self):
+        self.events: List[Dict[str, Any]] = []
+        self._start_ns = time.perf_counter_ns()
+        self._pid = os.getpid()
+
+    def clear(self) -> None:
+        self.events.clear()
+
+    def _timestamp_us(self) -> float:
+        return (time.perf_counter_ns() - self._start_ns) / 1e3
+
+    def begin(self, kind: str, obj_id: Any, name: str) -> None:
+        title = f"{kind} {obj_id} {name}".rstrip()
+        self.events.append({'name': title, 'cat': kind, 'ph': 'B', 'ts': self._timestamp_us(),
+                            'pid': self._pid, 'tid': threading.get_ident()})
+
+    def end(self, kind: str, obj_id: Any, name: str, result: Any, error: Optional[BaseException]) -> None:
+        event = {'ph': 'E', 'ts': self._timestamp_us(), 'pid': self._pid, 'tid': threading.get_ident()}
+        if error is not None:
+            event['args'] = {'error': f"{type(error).__name__}: {error}"}
+        else:
+            size = output_size(result)
+            if size is not None:
+                event['args'] = {'size': size}
+        self.events.append(event)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'traceEvents': self.events, 'displayTimeUnit': 'ms'}
+
+    def save(self, path: str) -> None:
+        """ Сохраняет трассу в json-файл """
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+
+
+def attach_tracer(rform, tracer: Optional[ChromeTracer] = None) -> ChromeTracer:
+    """
+    Подключает трассировщик ко всем шагам, трекам, пазлам и оценщику формы.
+    Отключить - rform.set_observer(None).
+
+    :param rform: RForm
+    :param tracer: трассировщик (по умолчанию новый)
+    :return: подключенный трассировщик
+    """
+    tracer = tracer if tracer is not None else ChromeTracer()
+    rform.set_observer(tracer)
+    return tracer
+
+
+def attach_profiler(rform, profiler: Optional[RunProfiler] = None) -> RunProfiler:
+    """
+    Подключает профилировщик ко всем шагам, трекам, пазлам и оценщику формы.
+    Отключить - rform.set_observer(None).
+
+    :param rform: RForm
+    :param profiler: профилировщик (по умолчанию новый)
+    :return: подключенный профилировщик
+    """
+    profiler = profiler if profiler is not None else RunProfiler()
+    rform.set_observer(profiler)
+    return profiler
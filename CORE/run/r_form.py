@@ -1,14 +1,19 @@
-from typing import List, Tuple, Optional
+from typing import List, Tuple, Optional, Sequence
 
 from CORE import Signal
 from CORE.db_dataclasses import Form
 from CORE.exeptions import SchemaError
-from CORE.run import Exemplar
+from CORE.logger import get_logger
+from CORE.run import Exemplar, ExemplarLayout
 from CORE.run.eval.base_eval import BaseEvaluator
 from CORE.run.exemplars_pool import ExemplarsPool
+from CORE.run.profiling import EVAL, FORM, POOL, RunObserver
 from CORE.run.r_step import RStep
 from CORE.run.r_steps_creator import RStepsListCreator
 from CORE.run.schema import Schema
+from CORE.run.track_cache import TrackCache
+
+logger = get_logger(__name__)
 
 
 class RForm:
@@ -16,7 +21,16 @@ class RForm:
     Основной класс, экспортируемый библиотекой установщика форм - запускает установку формы на одномерном сигнале, и выдает несколько вариантов ее установки
     """
 
-    def __init__(self, form: Form, evaluator: BaseEvaluator, max_pool_size: int = 5):
+    def __init__(self, form: Form, evaluator: BaseEvaluator, max_pool_size: int = 5, track_cache_size: int = 256,
+                 lean: bool = True):
+        """
+        :param form: датакласс формы
+        :param evaluator: оценщик экземпляров
+        :param max_pool_size: сколько лучших экземпляров оставлять после каждого шага
+        :param track_cache_size: сколько результатов SM/PS хранить в кэше треков в пределах одного запуска
+        :param lean: запускать шаги без отладочных результатов (StepRes и т.п., см. RStep.run) - run и run_many
+                     их все равно не возвращают. Прямые вызовы RStep.run (симулятор) это не затрагивает
+        """
         self.form = form
         self.schema = Schema(form)  # сохраняем схему
         sucess = self.schema.compile()
@@ -24,9 +38,54 @@ class RForm:
             raise SchemaError
 
         self.max_pool_size = max_pool_size
+        self.track_cache_size = track_cache_size
         self.evaluator = evaluator
+        self.lean = lean
+
+        # наблюдатель запусков (см. CORE.run.profiling), None - не наблюдать
+        self.observer: Optional[RunObserver] = None
+
+        # раскладка точек и параметров экземпляров формы: их значения хранятся в массиве float (см. Exemplar)
+        self.layout = ExemplarLayout.from_schema(self.schema)
 
         self.rsteps: List[RStep] = RStepsListCreator().from_db_form(form, self.schema)
+        self._compile_pazzles()
+        self._prepare_evaluator()
+
+    def _compile_pazzles(self) -> None:
+        """
+        Фаза компиляции: каждый пазл формы один раз разбирается в готовый к запуску объект
+        (класс, типизированные аргументы конструктора, соответствия имен), чтобы при распознавании
+        на каждом экземпляре оставался только вызов run.
+        Пазл, который не удалось разобрать, не мешает созданию формы (например, в симуляторе
+        при отладке недоделанной формы): ошибка будет выброшена при его запуске.
+        """
+        for rstep in self.rsteps:
+            try:
+                rstep.compile()
+            except Exception as e:
+                logger.warning(f"Не удалось скомпилировать пазлы шага {rstep.num_in_form}: {e}")
+
+    def _prepare_evaluator(self) -> None:
+        """
+        Набор параметров экземпляра после каждого шага известен из схемы, поэтому модели оценщика
+        по этим наборам обучаются один раз при создании формы, а не на первых экземплярах.
+        Как и при компиляции пазлов, ошибка здесь не мешает созданию формы и повторится при оценке.
+        """
+        param_subsets = [self.schema.get_params_by_step_num(i) for i in range(len(self.rsteps))]
+        try:
+            self.evaluator.prepare(param_subsets)
+        except Exception as e:
+            logger.warning(f"Не удалось подготовить оценщик {type(self.evaluator).__name__}: {e}")
+
+    def set_observer(self, observer: Optional[RunObserver]) -> None:
+        """
+        Подключает наблюдателя (например, CORE.run.profiling.RunProfiler) к форме, всем ее шагам,
+        трекам, пазлам и вызовам оценщика. None - отключает.
+        """
+        self.observer = observer
+        for rstep in self.rsteps:
+            rstep.set_observer(observer)
 
     def run(self, big_signal: Signal, seminal_point: float) -> ExemplarsPool:
         """
@@ -42,7 +101,40 @@ class RForm:
         :param seminal_point: это координата во времени (секунды), куда мы "ориентировочно" кидаем первую точку формы
         :return: набор экземпляров
         """
-        initial_exemplar = Exemplar(signal=big_signal)
+        # Родители из пула часто получают одинаковые интервалы поиска - их треки считаем один раз
+        track_cache = TrackCache(max_size=self.track_cache_size)
+        return self._run_from_seminal_point(big_signal, seminal_point, track_cache)
+
+    def run_many(self, big_signal: Signal, seminal_points: Sequence[float],
+                 sm_on_whole_signal: bool = False) -> List[ExemplarsPool]:
+        """
+        Распознает несколько экземпляров формы на одном сигнале (например, все комплексы записи) -
+        то же, что run для каждой точки из seminal_points, но с общей работой между ними:
+        скомпилированные пазлы и подготовленный оценщик формы, временная ось сигнала и кэш треков
+        (совпадающие интервалы поиска у соседних экземпляров считаются один раз).
+
+        :param big_signal: сигнал, на котором должны уместиться все экземпляры
+        :param seminal_points: координаты (секунды), куда "ориентировочно" кидаем первую точку каждого экземпляра
+        :param sm_on_whole_signal: применять SM треков один раз ко всему сигналу, а не к интервалу каждого шага
+                                   каждого экземпляра (см. RTrack.run) - быстро для длинных записей, но результат
+                                   SM у краев интервалов может немного отличаться от run
+        :return: пулы экземпляров в порядке seminal_points
+        """
+        track_cache = TrackCache(max_size=self.track_cache_size)
+        return [self._run_from_seminal_point(big_signal, seminal_point, track_cache, sm_on_whole_signal)
+                for seminal_point in seminal_points]
+
+    def _run_from_seminal_point(self, big_signal: Signal, seminal_point: float, track_cache: TrackCache,
+                                sm_on_whole_signal: bool = False) -> ExemplarsPool:
+        """ Установка одного экземпляра формы (см. run) с заданным кэшем треков """
+        if self.observer is not None:
+            return self.observer.observe(FORM, self.form.id, self.form.name, self._grow_exemplars, big_signal,
+                                         seminal_point, track_cache, sm_on_whole_signal)
+        return self._grow_exemplars(big_signal, seminal_point, track_cache, sm_on_whole_signal)
+
+    def _grow_exemplars(self, big_signal: Signal, seminal_point: float, track_cache: TrackCache,
+                        sm_on_whole_signal: bool) -> ExemplarsPool:
+        initial_exemplar = Exemplar(signal=big_signal, layout=self.layout)
         initial_exemplar.evaluation_result = 0.0
         exemplars_pool = ExemplarsPool(signal=big_signal, max_size=self.max_pool_size)
         exemplars_pool.add_exemplar(initial_exemplar)
@@ -51,22 +143,42 @@ class RForm:
 
         for rstep in self.rsteps:
             # на основе прошлого пула "недорощенных" экземпляров составляем новый пул - в нем экземпляры на одну точку длиннее
-            new_pool = ExemplarsPool(signal=big_signal, max_size=self.max_pool_size)
-
-            for parent_exemplar in exemplars_pool:
-                # каждый старый экземпляр дает несколько дочерних
-                # Игнорируем StepRes, так как он не нужен для текущей логики
-                _, exemplars = rstep.run(parent_exemplar)
-
-                # все дочерние экземпляры от всех старых экземпляров собираем воедино
-                for exemplar in exemplars:
-                    exemplar.evaluation_result = self.evaluator.eval_exemplar(exemplar)
-                    new_pool.add_exemplar(exemplar)
-
-            exemplars_pool = new_pool
+            if self.observer is not None:
+                exemplars_pool = self.observer.observe(POOL, rstep.num_in_form, rstep.target_point_name,
+                                                       self._grow_pool, rstep, exemplars_pool, track_cache,
+                                                       sm_on_whole_signal)
+            else:
+                exemplars_pool = self._grow_pool(rstep, exemplars_pool, track_cache, sm_on_whole_signal)
 
         return exemplars_pool
 
+    def _grow_pool(self, rstep: RStep, exemplars_pool: ExemplarsPool, track_cache: TrackCache,
+                   sm_on_whole_signal: bool) -> ExemplarsPool:
+        """ Один шаг формы для всех экземпляров пула: новый пул из их оцененных дочерних экземпляров """
+        new_pool = ExemplarsPool(signal=exemplars_pool.signal, max_size=self.max_pool_size)
+
+        children: List[Exemplar] = []
+        for parent_exemplar in exemplars_pool:
+            # каждый старый экземпляр дает несколько дочерних
+            # Игнорируем StepRes, так как он не нужен для текущей логики
+            _, exemplars = rstep.run(parent_exemplar, track_cache=track_cache,
+                                     sm_on_whole_signal=sm_on_whole_signal, lean=self.lean)
+
+            # все дочерние экземпляры от всех старых экземпляров собираем воедино
+            children.extend(exemplars)
+
+        # оцениваем всех детей шага одним вызовом оценщика
+        if self.observer is not None:
+            scores = self.observer.observe(EVAL, rstep.num_in_form, type(self.evaluator).__name__,
+                                           self.evaluator.eval_exemplars, children)
+        else:
+            scores = self.evaluator.eval_exemplars(children)
+        for exemplar, score in zip(children, scores):
+            exemplar.evaluation_result = float(score)
+            new_pool.add_exemplar(exemplar)
+
+        return new_pool
+
     def find_track_by_sm_id(self, sm_id: int) -> Optional[Tuple[int, int]]:
         """
         Находит трек, содержащий SM с указанным ID.
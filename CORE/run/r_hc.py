@@ -1,11 +1,13 @@
 from __future__ import annotations
 
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Tuple, Optional
 
 from CORE.db_dataclasses import BasePazzle, Parameter
+from CORE.enums import CLASS_TYPES
 from CORE.exeptions import RunPazzleError
 from CORE.pazzles_lib.hc_base import HCBase
 from CORE.run import Exemplar
+from CORE.run.profiling import RunObserver
 from CORE.run.run_pazzle import PazzleParser
 
 
@@ -22,12 +24,38 @@ class R_HC:
 
         self.id = base_pazzle.id
 
+        # Результаты разбора пазла, заполняются один раз в compile()
+        self._runnable: Optional[HCBase] = None
+        self._input_params_mapping: Dict[str, str] = {}  # {имя_параметра_в_cls: имя_параметра_в_форме}
+
+        # наблюдатель запусков (см. CORE.run.profiling), None - не наблюдать
+        self.observer: Optional[RunObserver] = None
+
+    def compile(self) -> None:
+        """
+        Разбирает пазл один раз: создает runnable-объект с типизированными аргументами
+        конструктора и запоминает соответствие имен входных параметров класса именам из формы.
+        Повторный вызов ничего не делает.
+
+        :raise RunPazzleError: если не удалось создать экземпляр класса или сопоставить имена
+        """
+        if self._runnable is not None:
+            return
+        parser = PazzleParser(self.base_pazzle, form_points=[], form_params=self.form_params)
+
+        runnable = self._create_runnable(parser)
+        try:
+            self._input_params_mapping = parser.map_input_params_names()
+        except Exception as e:
+            raise RunPazzleError.params_mapping_failed(self.base_pazzle.id, str(e))
+        self._runnable = runnable
+
     def run(self, exemplar: Exemplar) -> bool:
         """
         Основной метод выполнения пазла на конкретном экземпляре.
 
         Выполняет последовательность шагов:
-        1. Создание runnable-объекта (экземпляра класса пазла)
+        1. Разбор пазла и создание runnable-объекта (только при первом запуске, см. compile)
         2. Сбор данных параметров из экземпляра
         3. Настройка runnable-объекта
         4. Запуск и получение результата
@@ -36,13 +64,18 @@ class R_HC:
         :raise RunPazzleError: различные ошибки выполнения пазла
         :return Флаг выполнения условия (is_condition_fitted)
         """
-        parser = PazzleParser(self.base_pazzle, form_points=[], form_params=self.form_params)
+        if self.observer is not None:
+            return self.observer.observe(CLASS_TYPES.HC.value, self.base_pazzle.id, self.base_pazzle.class_ref.name,
+                                         self._run, exemplar)
+        return self._run(exemplar)
 
-        # 1. Создание runnable-объекта
-        runnable = self._create_runnable(parser)
+    def _run(self, exemplar: Exemplar) -> bool:
+        # 1. Разбор пазла и создание runnable-объекта
+        self.compile()
+        runnable = self._runnable
 
         # 2. Сбор данных параметров
-        params_data, absent_params = self._collect_input_params(parser, exemplar)
+        params_data, absent_params = self._collect_input_params(exemplar)
         if absent_params:
             raise RunPazzleError.missing_input_params(self.base_pazzle.id, absent_params)
 
@@ -68,27 +101,17 @@ class R_HC:
 
             raise RunPazzleError.class_creation_failed(self.base_pazzle.id, str(e))
 
-    def _collect_input_params(self, parser: PazzleParser, exemplar: Exemplar) -> Tuple[Dict[str, Any], List[str]]:
+    def _collect_input_params(self, exemplar: Exemplar) -> Tuple[Dict[str, Any], List[str]]:
         """
-        Собирает значения параметров из экземпляра формы.
+        Собирает значения параметров из экземпляра формы по соответствию имен, полученному в compile().
 
-        :param parser: объект парсера для получения соответствия имен параметров
         :param exemplar: экземпляр формы
-        :raise RunPazzleError: если не удалось получить соответствие имен параметров
         :return Кортеж (словарь с данными параметров, список отсутствующих параметров)
         """
-        # Получение соответствия имен параметров
-        try:
-            required_params = parser.map_input_params_names()
-        except Exception as e:
-
-            raise RunPazzleError.params_mapping_failed(self.base_pazzle.id, str(e))
-
-        # Сбор данных параметров
         params_data = {}
         absent_params = []
 
-        for class_param_name, exemplar_param_name in required_params.items():
+        for class_param_name, exemplar_param_name in self._input_params_mapping.items():
             param_value = exemplar.get_parameter_value(exemplar_param_name)
             if param_value is None:
                 absent_params.append(exemplar_param_name)
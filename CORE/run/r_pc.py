@@ -1,18 +1,23 @@
 from __future__ import annotations
 
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Tuple, Optional
 
 from CORE.db_dataclasses import BasePazzle, Point, Parameter
+from CORE.enums import CLASS_TYPES
 from CORE.exeptions import RunPazzleError, PazzleOutOfSignal
 from CORE.pazzles_lib.pc_base import PCBase
 from CORE.run import Exemplar
+from CORE.run.profiling import RunObserver
 from CORE.run.run_pazzle import PazzleParser
 
 
 class R_PC:
     """ Класс измерителя параметров. Принимает экземпляр с частично заполннными
     точками/параметроми и проводит замер некоторых новых параметров,
-    которым он посвещен. Исходный экземпляр не изменяет"""
+    которым он посвещен. Исходный экземпляр не изменяет.
+
+    Разбор пазла (класс, аргументы конструктора, соответствия имен) делается один раз в compile(),
+    runnable-объект переиспользуется: перед каждым запуском в него заново регистрируются точки и параметры"""
     def __init__(self, base_pazzle: BasePazzle, form_points: List[Point], form_params: List[Parameter]):
         """
         Инициализация экземпляра R_PC из класса, служащего (де)сериализаци из БД.
@@ -25,12 +30,49 @@ class R_PC:
         self.form_points = form_points
         self.form_params = form_params
 
+        # Результаты разбора пазла, заполняются один раз в compile()
+        self._runnable: Optional[PCBase] = None
+        self._points_mapping: Dict[str, str] = {}  # {имя_точки_в_cls: имя_точки_в_форме}
+        self._input_params_mapping: Dict[str, str] = {}  # {имя_параметра_в_cls: имя_параметра_в_форме}
+        self._output_params_mapping: Dict[str, str] = {}  # {имя_выходного_параметра_в_cls: имя_параметра_в_форме}
+
+        # наблюдатель запусков (см. CORE.run.profiling), None - не наблюдать
+        self.observer: Optional[RunObserver] = None
+
+    def compile(self) -> None:
+        """
+        Разбирает пазл один раз: создает runnable-объект с типизированными аргументами
+        конструктора и запоминает соответствия имен точек и параметров класса именам из формы.
+        Повторный вызов ничего не делает.
+
+        :raise RunPazzleError: если не удалось создать экземпляр класса или сопоставить имена
+        """
+        if self._runnable is not None:
+            return
+        parser = PazzleParser(self.base_pazzle, form_points=self.form_points, form_params=self.form_params)
+
+        runnable = self._create_runnable(parser)
+        try:
+            points_mapping = parser.map_point_names()
+        except Exception as e:
+            raise RunPazzleError.points_mapping_failed(self.base_pazzle.id, str(e))
+        try:
+            input_params_mapping = parser.map_input_params_names()
+            output_params_mapping = parser.map_output_params_names()
+        except Exception as e:
+            raise RunPazzleError.params_mapping_failed(self.base_pazzle.id, str(e))
+
+        self._points_mapping = points_mapping
+        self._input_params_mapping = input_params_mapping
+        self._output_params_mapping = output_params_mapping
+        self._runnable = runnable
+
     def run(self, exemplar: Exemplar) -> Dict[str, Any]:
         """
         Основной метод выполнения пазла на конкретном экземпляре.
 
         Выполняет последовательность шагов:
-        1. Создание runnable-объекта (экземпляра класса пазла)
+        1. Разбор пазла и создание runnable-объекта (только при первом запуске, см. compile)
         2. Сбор данных точек из экземпляра
         3. Сбор данных параметров из экземпляра
         4. Настройка runnable-объекта
@@ -42,18 +84,23 @@ class R_PC:
         :raise RunPazzleError: различные ошибки выполнения пазла
         :return Словарь с результатами измерений {имя_параметра_в форме: его померенное значение}
         """
-        parser = PazzleParser(self.base_pazzle, form_points=self.form_points, form_params=self.form_params)
+        if self.observer is not None:
+            return self.observer.observe(CLASS_TYPES.PC.value, self.base_pazzle.id, self.base_pazzle.class_ref.name,
+                                         self._run, exemplar)
+        return self._run(exemplar)
 
-        # 1. Создание runnable-объекта
-        runnable = self._create_runnable(parser)
+    def _run(self, exemplar: Exemplar) -> Dict[str, Any]:
+        # 1. Разбор пазла и создание runnable-объекта
+        self.compile()
+        runnable = self._runnable
 
         # 2. Сбор данных точек
-        points_data, absent_points = self._collect_input_points(parser, exemplar)
+        points_data, absent_points = self._collect_input_points(exemplar)
         if absent_points:
             raise RunPazzleError.missing_input_points(self.base_pazzle.id, absent_points)
 
         # 3. Сбор данных параметров
-        params_data, absent_params = self._collect_input_params(parser, exemplar)
+        params_data, absent_params = self._collect_input_params(exemplar)
         if absent_params:
             raise RunPazzleError.missing_input_params(self.base_pazzle.id, absent_params)
 
@@ -65,7 +112,7 @@ class R_PC:
         measurement_res = self._execute_runnable(runnable, exemplar.signal)
 
         # 6. Ремампинг имен параметров из сигнатуры класса в соотвествющие имена из сигнутры формы
-        return self._remap_output_params_to_form_params(measurement_res, parser)
+        return self._remap_output_params_to_form_params(measurement_res)
 
     def _create_runnable(self, parser: PazzleParser) -> PCBase:
         """
@@ -82,26 +129,17 @@ class R_PC:
         except Exception as e:
             raise RunPazzleError.class_creation_failed(self.base_pazzle.id, str(e)) from e
 
-    def _collect_input_points(self, parser: PazzleParser, exemplar: Exemplar) -> Tuple[Dict[str, float], List[str]]:
+    def _collect_input_points(self, exemplar: Exemplar) -> Tuple[Dict[str, float], List[str]]:
         """
-        Собирает данные точек из экземпляра формы.
+        Собирает данные точек из экземпляра формы по соответствию имен, полученному в compile().
 
-        :param parser: объект парсера для получения соответствия имен точек
         :param exemplar: экземпляр формы
-        :raise RunPazzleError: если не удалось получить соответствие имен точек
         :return Кортеж (словарь с данными точек, список отсутствующих точек)
         """
-        # Получение соответствия имен точек
-        try:
-            required_points = parser.map_point_names()
-        except Exception as e:
-            raise RunPazzleError.points_mapping_failed(self.base_pazzle.id, str(e))
-
-        # Сбор данных точек
         points_data = {}
         absent_points = []
 
-        for class_point_name, exemplar_point_name in required_points.items():
+        for class_point_name, exemplar_point_name in self._points_mapping.items():
             point_coord = exemplar.get_point_coord(exemplar_point_name)
             if point_coord is None:
                 absent_points.append(exemplar_point_name)
@@ -110,26 +148,17 @@ class R_PC:
 
         return points_data, absent_points
 
-    def _collect_input_params(self, parser: PazzleParser, exemplar: Exemplar) -> Tuple[Dict[str, Any], List[str]]:
+    def _collect_input_params(self, exemplar: Exemplar) -> Tuple[Dict[str, Any], List[str]]:
         """
-        Собирает значения параметров из экземпляра формы.
+        Собирает значения параметров из экземпляра формы по соответствию имен, полученному в compile().
 
-        :param parser: объект парсера для получения соответствия имен параметров
         :param exemplar: экземпляр формы
-        :raise RunPazzleError: если не удалось получить соответствие имен параметров
         :return Кортеж (словарь с данными параметров, список отсутствующих параметров)
         """
-        # Получение соответствия имен параметров
-        try:
-            required_params = parser.map_input_params_names()
-        except Exception as e:
-            raise RunPazzleError.params_mapping_failed(self.base_pazzle.id, str(e))
-
-        # Сбор данных параметров
         params_data = {}
         absent_params = []
 
-        for class_param_name, exemplar_param_name in required_params.items():
+        for class_param_name, exemplar_param_name in self._input_params_mapping.items():
             param_value = exemplar.get_parameter_value(exemplar_param_name)
             if param_value is None:
                 absent_params.append(exemplar_param_name)
@@ -159,23 +188,16 @@ class R_PC:
             class_name = self.base_pazzle.class_ref.name
             raise RunPazzleError.execution_error(self.base_pazzle.id, class_name, str(e))
 
-    def _remap_output_params_to_form_params(
-            self,
-            params_of_class_calculated: Dict[str, Any],
-            parser: PazzleParser
-    ) -> Dict[str, Any]:
+    def _remap_output_params_to_form_params(self, params_of_class_calculated: Dict[str, Any]) -> Dict[str, Any]:
         """
         Преобразует словарь параметров: заменяет ключи (имена из сигнатуры класса)
         на соответствующие имена параметров формы.
 
         :param params_of_class_calculated: {имя параметра в сигнатуре: значение}
-        :param parser: объект, предоставляющий отображение имён
         :return: {имя параметра в форме: значение}
         """
-        cls_names_to_form_names: Dict[str, str] = parser.map_output_params_names()
-
         return {
             form_name: params_of_class_calculated[cls_name]
-            for cls_name, form_name in cls_names_to_form_names.items()
+            for cls_name, form_name in self._output_params_mapping.items()
             if cls_name in params_of_class_calculated
         }
@@ -1,11 +1,13 @@
 from __future__ import annotations
 
-from typing import List
+from typing import List, Optional
 
 from CORE import Signal
 from CORE.db_dataclasses import BasePazzle
+from CORE.enums import CLASS_TYPES
 from CORE.exeptions import RunPazzleError, PazzleOutOfSignal
 from CORE.pazzles_lib.ps_base import PSBase
+from CORE.run.profiling import RunObserver
 from CORE.run.run_pazzle import PazzleParser
 
 
@@ -19,12 +21,31 @@ class R_PS:
         """
         self.base_pazzle = base_pazzle
 
+        # runnable-объект пазла, создается один раз в compile()
+        self._runnable: Optional[PSBase] = None
+
+        # наблюдатель запусков (см. CORE.run.profiling), None - не наблюдать
+        self.observer: Optional[RunObserver] = None
+
+    def compile(self) -> None:
+        """
+        Разбирает пазл один раз: находит его класс, приводит аргументы конструктора
+        к нужным типам и создает runnable-объект, который потом переиспользуется во всех запусках.
+        Повторный вызов ничего не делает.
+
+        :raise RunPazzleError: если не удалось создать экземпляр класса
+        """
+        if self._runnable is not None:
+            return
+        parser = PazzleParser(self.base_pazzle, form_points=[], form_params=[])
+        self._runnable = self._create_runnable(parser)
+
     def run(self, signal: Signal, left_t: float, right_t: float) -> List[float]:
         """
         Основной метод выполнения пазла на конкретном сигнале.
         Сигнал идет вместе с интервалом, в котором и только в котором может выбирать точки
 
-        Создает и запускает rannable объект пазла
+        Запускает rannable объект пазла (при первом запуске создает его, см. compile)
         :param signal взодной сигнал
         :param left_t левая граница интервала а
         :param right_t правая граница интервала
@@ -34,13 +55,16 @@ class R_PS:
         :raise RunPazzleError: различные ошибки выполнения пазла
         :return список координат "особых" (отобранных этим пазлом) точек
         """
-        parser = PazzleParser(self.base_pazzle, form_points=[], form_params=[])
+        if self.observer is not None:
+            return self.observer.observe(CLASS_TYPES.PS.value, self.base_pazzle.id, self.base_pazzle.class_ref.name,
+                                         self._run, signal, left_t, right_t)
+        return self._run(signal, left_t, right_t)
 
-        # Создание runnable-объекта
-        runnable = self._create_runnable(parser)
+    def _run(self, signal: Signal, left_t: float, right_t: float) -> List[float]:
+        self.compile()
 
         # Запуск и получение результата
-        selected_points = self._execute_runnable(runnable, signal, left_t=left_t, right_t=right_t)
+        selected_points = self._execute_runnable(self._runnable, signal, left_t=left_t, right_t=right_t)
 
         # проверим, все ли выбранные точки попали в допустимый интервал
         for point in selected_points:
@@ -1,9 +1,13 @@
 from __future__ import annotations
 
+from typing import Optional
+
 from CORE import Signal
 from CORE.db_dataclasses import BasePazzle
+from CORE.enums import CLASS_TYPES
 from CORE.exeptions import RunPazzleError, PazzleOutOfSignal
 from CORE.pazzles_lib.sm_base import SMBase
+from CORE.run.profiling import RunObserver
 from CORE.run.run_pazzle import PazzleParser
 
 
@@ -17,11 +21,30 @@ class R_SM:
         """
         self.base_pazzle = base_pazzle
 
+        # runnable-объект пазла, создается один раз в compile()
+        self._runnable: Optional[SMBase] = None
+
+        # наблюдатель запусков (см. CORE.run.profiling), None - не наблюдать
+        self.observer: Optional[RunObserver] = None
+
+    def compile(self) -> None:
+        """
+        Разбирает пазл один раз: находит его класс, приводит аргументы конструктора
+        к нужным типам и создает runnable-объект, который потом переиспользуется во всех запусках.
+        Повторный вызов ничего не делает.
+
+        :raise RunPazzleError: если не удалось создать экземпляр класса
+        """
+        if self._runnable is not None:
+            return
+        parser = PazzleParser(self.base_pazzle, form_points=[], form_params=[])
+        self._runnable = self._create_runnable(parser)
+
     def run(self, signal: Signal, left_t: float, right_t: float) -> Signal:
         """
         Основной метод выполнения пазла на конкретном сигнале.
 
-        Создает и запускает rannable объект пазла
+        Запускает rannable объект пазла (при первом запуске создает его, см. compile)
         :param signal сигнал,  для которого будет создаваться модифицированный
         :param left_t левая граница интервала, в котором позже будут выбираться целевый точки шага
         :param right_t левая граница интервала, в котором позже будут выбираться целевый точки шага
@@ -30,13 +53,16 @@ class R_SM:
         :raise RunPazzleError: различные ошибки выполнения пазла
         :return модифицированный сигнал той же длины
         """
-        parser = PazzleParser(self.base_pazzle, form_points=[], form_params=[])
+        if self.observer is not None:
+            return self.observer.observe(CLASS_TYPES.SM.value, self.base_pazzle.id, self.base_pazzle.class_ref.name,
+                                         self._run, signal, left_t, right_t)
+        return self._run(signal, left_t, right_t)
 
-        # Создание runnable-объекта
-        runnable = self._create_runnable(parser)
+    def _run(self, signal: Signal, left_t: float, right_t: float) -> Signal:
+        self.compile()
 
         # Запуск и получение результата
-        new_signal = self._execute_runnable(runnable, signal, left_t=left_t, right_t=right_t)
+        new_signal = self._execute_runnable(self._runnable, signal, left_t=left_t, right_t=right_t)
 
         if len(signal) != len(new_signal):
             raise RunPazzleError.sm_changed_len_of_signal(delta_time=(len(signal) - len(new_signal)),
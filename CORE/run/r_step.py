@@ -1,4 +1,4 @@
-from copy import deepcopy
+from itertools import chain
 from typing import Optional, List, Tuple
 
 from CORE import Signal
@@ -7,11 +7,13 @@ from CORE.datasets_wrappers.form_associated.parametriser import Parametriser
 from CORE.exeptions import RunStepError, PazzleOutOfSignal
 from CORE.logger import get_logger
 from CORE.run import Exemplar
+from CORE.run.profiling import RunObserver, STEP
 from CORE.run.r_hc import R_HC
 from CORE.run.r_pc import R_PC
 from CORE.run.r_track import RTrack
 from CORE.run.schema import Schema
 from CORE.run.step_interval import Interval
+from CORE.run.track_cache import TrackCache
 from CORE.visual_debug.results_datcalsses.step_res import StepRes
 from CORE.visual_debug.results_datcalsses.track_res import TrackRes
 
@@ -42,9 +44,31 @@ class RStep:
         self.r_tracks: List[RTrack] = r_tracks
         self.out_of_signal_tracks = 0
 
+        # наблюдатель запусков (см. CORE.run.profiling), None - не наблюдать
+        self.observer: Optional[RunObserver] = None
+
         # Создаем параметризатор из схемы
         self.parametriser = Parametriser(schema=schema)
 
+    def compile(self) -> None:
+        """
+        Заранее разбирает все пазлы шага: SM и PS всех треков, PC и HC.
+        :raises RunPazzleError
+        """
+        for track in self.r_tracks:
+            track.compile()
+        for r_pazzle in chain(self.rPC_objects, self.rHC_objects):
+            r_pazzle.compile()
+
+    def set_observer(self, observer: Optional[RunObserver]) -> None:
+        """ Подключает наблюдателя к шагу, его трекам, параметризатору, PC и HC (None - отключает) """
+        self.observer = observer
+        self.parametriser.observer = observer
+        for track in self.r_tracks:
+            track.set_observer(observer)
+        for r_pazzle in chain(self.rPC_objects, self.rHC_objects):
+            r_pazzle.observer = observer
+
     def set_step_as_first(self, center: float):
         self.center = center
 
@@ -54,21 +78,34 @@ class RStep:
             return 0.0
         return self.out_of_signal_tracks / len(self.r_tracks)
 
-    def run(self, exemplar: Exemplar, filter_by_hc: bool = True) -> Tuple[StepRes, List[Exemplar]]:
+    def run(self, exemplar: Exemplar, filter_by_hc: bool = True, track_cache: Optional[TrackCache] = None,
+            sm_on_whole_signal: bool = False, lean: bool = False) -> Tuple[Optional[StepRes], List[Exemplar]]:
         """
         Создает на основе переданного "родительского" экземпляра список экзепляров, каждый из которых на точку длиннее родительского.
         Родительский экзепляр не меняется. Дочерние экземпляры имеют гарантированно разные точки (т.е. дочерние экземпляры прорежены по последней точке)
 
         Возвращает кортеж (StepRes, List[Exemplar]), где:
-        - StepRes содержит полную информацию о запуске шага
+        - StepRes содержит полную информацию о запуске шага (None при lean=True)
         - List[Exemplar] содержит созданные экземпляры (для обратной совместимости)
 
         :param exemplar: Экземляр формы (в котором выполнены все шаги, предыдущие к данному)
         :param filter_by_hc: Если True - фильтровать экземпляры по жестким условиям,
                              если False - возвращать все экземпляры (но fit_conditions все равно вызывается)
+        :param track_cache: кэш результатов треков, общий для всех родительских экземпляров шага
+                            (у соседей по пулу интервалы поиска часто совпадают); None - не кэшировать
+        :param sm_on_whole_signal: применять SM треков ко всему сигналу, а не к интервалу шага (см. RTrack.run)
+        :param lean: не собирать StepRes/TrackRes/SM_Res/PS_Res (они держат все промежуточные сигналы треков),
+                     а только точки-кандидаты и дочерние экземпляры - для распознавания без отладки (см. RForm)
         :raises RunStepError, RunTrackError, RunPazzleError
         :return: Кортеж (StepRes, List[Exemplar])
         """
+        if self.observer is not None:
+            return self.observer.observe(STEP, self.num_in_form, self.target_point_name, self._run, exemplar,
+                                         filter_by_hc, track_cache, sm_on_whole_signal, lean)
+        return self._run(exemplar, filter_by_hc, track_cache, sm_on_whole_signal, lean)
+
+    def _run(self, exemplar: Exemplar, filter_by_hc: bool, track_cache: Optional[TrackCache],
+             sm_on_whole_signal: bool, lean: bool) -> Tuple[Optional[StepRes], List[Exemplar]]:
         if len(self.r_tracks) == 0:
             raise RunStepError.empty_tracks_list(self.num_in_form)
         if not self.target_point_name:
@@ -78,13 +115,19 @@ class RStep:
         left_t, right_t = self.interval.get_interval_coords(center=self.center, exemplar=exemplar)
 
         # 2. Запускаем по очереди все треки и собираем результаты
-        tracks_results, filtered_pairs = self._run_all_tracks(exemplar.signal, left_t=left_t, right_t=right_t)
+        tracks_results, filtered_pairs = self._run_all_tracks(exemplar.signal, left_t=left_t, right_t=right_t,
+                                                              track_cache=track_cache,
+                                                              sm_on_whole_signal=sm_on_whole_signal, lean=lean)
+
+        def make_step_res() -> Optional[StepRes]:
+            if lean:
+                return None
+            return StepRes(id=self.num_in_form, signal=exemplar.signal, left_coord=left_t, right_coord=right_t,
+                           tracks_results=tracks_results)
 
         if len(filtered_pairs) == 0:
             # Создаем StepRes с пустыми результатами
-            step_res = StepRes(id=self.num_in_form, signal=exemplar.signal, left_coord=left_t, right_coord=right_t,
-                               tracks_results=tracks_results)
-            return step_res, []
+            return make_step_res(), []
 
         # 3. На основе списка точек-кандидатов (уже профильтрованных от дублей) создаем дочерние экземпляры
         exemplars = self._init_exemplars(exemplar, filtered_pairs)
@@ -97,9 +140,7 @@ class RStep:
             logger.info(
                 "PazzleOutOfSignal: параметризация прервана из-за нехватки сигнала одному или нескольким PC шага")
             # Создаем StepRes с результатами треков, но без экземпляров
-            step_res = StepRes(id=self.num_in_form, signal=exemplar.signal, left_coord=left_t, right_coord=right_t,
-                               tracks_results=tracks_results)
-            return step_res, []
+            return make_step_res(), []
 
         # 5. Проверяем жесткие условия для всех экземпляров и сразу фильтруем (если нужно)
         filtered_exemplars = []
@@ -109,16 +150,14 @@ class RStep:
                 filtered_exemplars.append(ex)
 
         # 6. Создаем StepRes с результатами
-        step_res = StepRes(id=self.num_in_form, signal=exemplar.signal, left_coord=left_t, right_coord=right_t,
-                           tracks_results=tracks_results)
-
-        return step_res, filtered_exemplars
+        return make_step_res(), filtered_exemplars
 
-    def _run_all_tracks(self, signal: Signal, left_t: float, right_t: float) -> Tuple[
-        List[TrackRes], List[Tuple[int, float]]]:
+    def _run_all_tracks(self, signal: Signal, left_t: float, right_t: float,
+                        track_cache: Optional[TrackCache] = None, sm_on_whole_signal: bool = False,
+                        lean: bool = False) -> Tuple[List[TrackRes], List[Tuple[int, float]]]:
         """
         Запускает все треки и собирает:
-        - список TrackRes для каждого трека
+        - список TrackRes для каждого трека (при lean=True пустой: треки возвращают только точки, см. RTrack.find_points)
         - отфильтрованные пары (track_id, point) для создания экземпляров
 
         :return: Кортеж (tracks_results, filtered_pairs)
@@ -129,11 +168,17 @@ class RStep:
         # Шаг 1: запускаем все треки и собираем результаты
         for track in self.r_tracks:
             try:
-                track_res = track.run(signal, left_t=left_t, right_t=right_t)
-                tracks_results.append(track_res)
+                if lean:
+                    track_points = track.find_points(signal, left_t=left_t, right_t=right_t, cache=track_cache,
+                                                     sm_on_whole_signal=sm_on_whole_signal)
+                else:
+                    track_res = track.run(signal, left_t=left_t, right_t=right_t, cache=track_cache,
+                                          sm_on_whole_signal=sm_on_whole_signal)
+                    tracks_results.append(track_res)
+                    track_points = track_res.to_uniq_coords()
 
                 # Собираем пары для фильтрации (используем уникальные координаты трека)
-                for point in track_res.to_uniq_coords():
+                for point in track_points:
                     all_pairs.append((track.id, point))
 
             except PazzleOutOfSignal:
@@ -171,7 +216,7 @@ class RStep:
         exemplars: List[Exemplar] = []
 
         for track_id, point_coord in filtered_pairs:
-            child_exemplar = deepcopy(parent_exemplar)
+            child_exemplar = parent_exemplar.make_child()
             child_exemplar.add_point(point_name=self.target_point_name, point_coord_t=point_coord, track_id=track_id)
             exemplars.append(child_exemplar)
             assert len(parent_exemplar) == len(child_exemplar) - 1, "Должно было произойти наращивание на одну точку"
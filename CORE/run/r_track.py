@@ -1,12 +1,14 @@
-from copy import deepcopy
 from itertools import chain
-from typing import List
+from typing import List, Optional, Tuple
 
 from CORE import Signal
 from CORE.db_dataclasses import Track
 from CORE.exeptions import RunTrackError, RunPazzleError, PazzleOutOfSignal
+from CORE.run.profiling import RunObserver, TRACK
 from CORE.run.r_ps import R_PS
 from CORE.run.r_sm import R_SM
+from CORE.run.track_cache import TrackCache
+from CORE.run.utils import delete_similar_points
 from CORE.visual_debug.results_datcalsses.PS_res import PS_Res
 from CORE.visual_debug.results_datcalsses.SM_res import SM_Res
 from CORE.visual_debug.results_datcalsses.track_res import TrackRes
@@ -17,11 +19,31 @@ class RTrack:
 
     def __init__(self, track: Track):
         self.id: int = track.id
+        # id трека в отчетах наблюдателя: у трека без id в базе - идентичность объекта, чтобы такие треки не сливались
+        self.observed_id = self.id if self.id is not None else id(self)
 
         self.rSM_objects: List[R_SM] = [R_SM(base_pazzle=sm) for sm in track.SMs]
         self.rPS_objects: List[R_PS] = [R_PS(base_pazzle=rs) for rs in track.PSs]
 
-    def run(self, signal: Signal, left_t: float, right_t: float) -> TrackRes:
+        # наблюдатель запусков (см. CORE.run.profiling), None - не наблюдать
+        self.observer: Optional[RunObserver] = None
+
+    def compile(self) -> None:
+        """
+        Заранее разбирает все пазлы трека (см. R_SM.compile, R_PS.compile)
+        :raises RunPazzleError
+        """
+        for r_pazzle in chain(self.rSM_objects, self.rPS_objects):
+            r_pazzle.compile()
+
+    def set_observer(self, observer: Optional[RunObserver]) -> None:
+        """ Подключает наблюдателя к треку и всем его пазлам (None - отключает) """
+        self.observer = observer
+        for r_pazzle in chain(self.rSM_objects, self.rPS_objects):
+            r_pazzle.observer = observer
+
+    def run(self, signal: Signal, left_t: float, right_t: float, cache: Optional[TrackCache] = None,
+            sm_on_whole_signal: bool = False) -> TrackRes:
         """
         Основная функция по применению трека к сигналу. Сначала последовательно
         применяет к сигналу объекты SM, и затем к итоговому модифицированному
@@ -29,63 +51,116 @@ class RTrack:
 
         Возвращает объект TrackRes с полной информацией о запуске.
 
-        Входной сигнал не изменяется, работа только с deepcopy.
+        Входной сигнал не изменяется и не копируется: SM получают его только на чтение
+        и возвращают новые сигналы (см. SMBase.run).
 
         :param signal: длинный сигнал, на основе которого конструкируется модификация
         :param left_t: левая граница интервала
         :param right_t: правая граница интервала
+        :param cache: кэш результатов SM и PS (общий для запусков трека на одном сигнале); None - не кэшировать
+        :param sm_on_whole_signal: применять SM ко всему сигналу, а не к интервалу. Тогда результат SM не зависит
+                                   от интервала и вместе с кэшем считается один раз на сигнал для всех интервалов
+                                   (например, для всех комплексов записи), но у краев интервала может немного
+                                   отличаться от результата SM, примененного только к интервалу
         :raises RunTrackError, PazzleOutOfSignal
 
         :return: TrackRes объект с результатами запуска трека
         """
+        if self.observer is not None:
+            return self.observer.observe(TRACK, self.observed_id, '', self._run, signal, left_t, right_t, cache,
+                                         sm_on_whole_signal)
+        return self._run(signal, left_t, right_t, cache, sm_on_whole_signal)
+
+    def _run(self, signal: Signal, left_t: float, right_t: float, cache: Optional[TrackCache],
+             sm_on_whole_signal: bool) -> TrackRes:
+        sm_signals, ps_points = self._run_pazzles(signal, left_t, right_t, cache, sm_on_whole_signal,
+                                                  keep_sm_signals=True)
+
+        # 1. Результаты SM: каждый SM получает сигнал после предыдущего
+        sm_res_objs = []
+        modified_signal = signal
+        for r_sm, result_signal in zip(self.rSM_objects, sm_signals):
+            sm_res_objs.append(SM_Res(
+                id=r_sm.base_pazzle.id,
+                old_signal=modified_signal,
+                result_signal=result_signal,
+                left_coord=left_t,
+                right_coord=right_t
+            ))
+            modified_signal = result_signal
+
+        # 2. Результаты PS
+        ps_res_objs = []
+        for r_ps, points in zip(self.rPS_objects, ps_points):
+            ps_res_objs.append(PS_Res(
+                id=r_ps.base_pazzle.id,
+                signal=modified_signal,  # все PS видят один и тот же финальный модифицированный сигнал
+                left_coord=left_t,
+                right_coord=right_t,
+                res_coords=points.copy()  # сохраняем исходный список точек
+            ))
+
+        # 3. Создаем и возвращаем TrackRes
+        track_res = TrackRes(
+            id=self.id,
+            signal=signal,
+            left_coord=left_t,
+            right_coord=right_t,
+            ps_res_objs=ps_res_objs,
+            sm_res_objs=sm_res_objs
+        )
+
+        return track_res
+
+    def find_points(self, signal: Signal, left_t: float, right_t: float, cache: Optional[TrackCache] = None,
+                    sm_on_whole_signal: bool = False) -> List[float]:
+        """
+        То же, что run, но без отладочных результатов: возвращает только уникальные точки трека
+        (как TrackRes.to_uniq_coords) и не держит промежуточные сигналы SM дольше, чем они нужны.
+
+        :raises RunTrackError, PazzleOutOfSignal
+        :return: уникальные координаты точек, найденных всеми PS трека
+        """
+        if self.observer is not None:
+            return self.observer.observe(TRACK, self.observed_id, '', self._find_points, signal, left_t, right_t,
+                                         cache, sm_on_whole_signal)
+        return self._find_points(signal, left_t, right_t, cache, sm_on_whole_signal)
+
+    def _find_points(self, signal: Signal, left_t: float, right_t: float, cache: Optional[TrackCache],
+                     sm_on_whole_signal: bool) -> List[float]:
+        _, ps_points = self._run_pazzles(signal, left_t, right_t, cache, sm_on_whole_signal, keep_sm_signals=False)
+        all_points = list(chain.from_iterable(ps_points))
+        delete_similar_points(all_points)
+        return all_points
+
+    def _run_pazzles(self, signal: Signal, left_t: float, right_t: float, cache: Optional[TrackCache],
+                     sm_on_whole_signal: bool, keep_sm_signals: bool) -> Tuple[List[Signal], List[List[float]]]:
+        """
+        Последовательно применяет к сигналу SM трека, затем к итоговому сигналу - все PS.
+
+        :param keep_sm_signals: возвращать результаты всех SM (иначе - пустой список)
+        :raises RunTrackError, PazzleOutOfSignal
+        :return: (сигналы после каждого SM, точки каждого PS)
+        """
         if len(signal) == 0:
             raise RunTrackError.emty_signal(self.id)
 
         try:
             # 1. Запускаем SM-объекты в том порядке, в каком они идут в списке
-            # и собираем результаты каждого SM
-            sm_res_objs = []
-            modified_signal = deepcopy(signal)
-
-            for r_sm in self.rSM_objects:
-                # Запоминаем сигнал до модификации
-                old_signal = modified_signal
-
-                # Запускаем SM и получаем модифицированный сигнал
-                result_signal = r_sm.run(old_signal, left_t=left_t, right_t=right_t)
-
-                # Создаем объект с результатом SM
-                sm_res = SM_Res(
-                    id=r_sm.base_pazzle.id,
-                    old_signal=old_signal,
-                    result_signal=result_signal,
-                    left_coord=left_t,
-                    right_coord=right_t
-                )
-                sm_res_objs.append(sm_res)
-
-                # Обновляем сигнал для следующей итерации
-                modified_signal = result_signal
+            sm_signals = []
+            modified_signal = signal
+            sm_left_t, sm_right_t = (None, None) if sm_on_whole_signal else (left_t, right_t)
+            for sm_index, r_sm in enumerate(self.rSM_objects):
+                modified_signal = self._run_sm(sm_index, r_sm, signal, modified_signal, sm_left_t, sm_right_t, cache)
+                if keep_sm_signals:
+                    sm_signals.append(modified_signal)
 
             # 2. Запускаем PS-объекты на измененном сигнале
-            ps_res_objs = []
-            for r_ps in self.rPS_objects:
-                # Запускаем PS и получаем список координат
-                points = r_ps.run(modified_signal, left_t, right_t)
-
-                # Создаем объект с результатом PS
-                ps_res = PS_Res(
-                    id=r_ps.base_pazzle.id,
-                    signal=modified_signal,  # все PS видят один и тот же финальный модифицированный сигнал
-                    left_coord=left_t,
-                    right_coord=right_t,
-                    res_coords=points.copy()  # сохраняем исходный список точек
-                )
-                ps_res_objs.append(ps_res)
+            ps_points = [self._run_ps(ps_index, r_ps, signal, modified_signal, left_t, right_t, cache)
+                         for ps_index, r_ps in enumerate(self.rPS_objects)]
 
             # 3. Проверяем, все ли точки в интервале
-            all_points = list(chain.from_iterable(ps_res.res_coords for ps_res in ps_res_objs))
-            if any(point < left_t or point > right_t for point in all_points):
+            if any(point < left_t or point > right_t for point in chain.from_iterable(ps_points)):
                 raise RunTrackError.selected_points_out_of_interval(
                     track_id=self.id, right_t=right_t, left_t=left_t
                 )
@@ -97,14 +172,31 @@ class RTrack:
             # Но это не обязательно аварийная ситуация - поэтому надо переделать наверх, шагу
             raise
 
-        # 4. Создаем и возвращаем TrackRes
-        track_res = TrackRes(
-            id=self.id,
-            signal=signal,
-            left_coord=left_t,
-            right_coord=right_t,
-            ps_res_objs=ps_res_objs,
-            sm_res_objs=sm_res_objs
-        )
-
-        return track_res
+        return sm_signals, ps_points
+
+    def _run_sm(self, sm_index: int, r_sm: R_SM, signal: Signal, old_signal: Signal, left_t: Optional[float],
+                right_t: Optional[float], cache: Optional[TrackCache]) -> Signal:
+        """ Запуск очередного SM трека. Результат однозначно определяется треком, исходным сигналом,
+        номером SM и интервалом (None - весь сигнал), поэтому по ним и ищем в кэше """
+        if cache is None:
+            return r_sm.run(old_signal, left_t=left_t, right_t=right_t)
+
+        key = TrackCache.make_key('SM', signal, self, sm_index, left_t, right_t)
+        result_signal = cache.get(key, signal)
+        if result_signal is None:
+            result_signal = r_sm.run(old_signal, left_t=left_t, right_t=right_t)
+            cache.put(key, signal, result_signal)
+        return result_signal
+
+    def _run_ps(self, ps_index: int, r_ps: R_PS, signal: Signal, modified_signal: Signal, left_t: float,
+                right_t: float, cache: Optional[TrackCache]) -> List[float]:
+        """ Запуск PS трека на сигнале после всех SM (см. _run_sm про ключ кэша) """
+        if cache is None:
+            return r_ps.run(modified_signal, left_t, right_t)
+
+        key = TrackCache.make_key('PS', signal, self, ps_index, left_t, right_t)
+        points = cache.get(key, signal)
+        if points is None:
+            points = r_ps.run(modified_signal, left_t, right_t)
+            cache.put(key, signal, points)
+        return points
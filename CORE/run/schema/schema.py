@@ -137,6 +137,20 @@ class Schema:
         hcs = [whc.hc for whc in self.steps_sorted[step_num].wHCs]
         return hcs
 
+    def get_params_by_step_num(self, step_num: int) -> List[str]:
+        """
+        Имена параметров, которые есть у экземпляра после выполнения шага step_num:
+        их возвращают PC этого и всех предыдущих шагов (в порядке запуска PC).
+
+        :param step_num: номер шага (начиная с 0)
+        :return: список имен параметров
+        """
+        params = []
+        for step in self.steps_sorted[:step_num + 1]:
+            for wpc in step.wPCs:
+                params.extend(wpc.returned_params())
+        return params
+
     def to_text(self) -> str:
         text = ""
 
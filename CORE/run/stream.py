@@ -0,0 +1,190 @@
+"""
+Потоковое распознавание формы на непрерывной записи ЭКГ, которая поступает кусками
+(из генератора, из читателя файла и т.п.) и целиком в памяти не держится.
+"""
+import math
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy.signal import find_peaks
+
+from CORE import Signal
+from CORE.logger import get_logger
+from CORE.run.exemplars_pool import ExemplarsPool
+from CORE.run.r_form import RForm
+from CORE.run.r_step import RStep
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class StreamResult:
+    """ Распознанный экземпляр формы: точка, куда кидали первую точку формы, и итоговый пул """
+    seminal_point: float
+    pool: ExemplarsPool
+
+
+class PeaksSeminalPointsFinder:
+    """
+    Простой поиск стартовых точек: пики модуля отклонения сигнала от медианы,
+    не ниже доли threshold_ratio от его 99-го перцентиля и не чаще, чем раз в min_distance_t секунд
+    (для QRS-подобных форм - R-зубцы).
+    """
+
+    def __init__(self, threshold_ratio: float = 0.5, min_distance_t: float = 0.3):
+        self.threshold_ratio = threshold_ratio
+        self.min_distance_t = min_distance_t
+
+    def __call__(self, signal: Signal) -> List[float]:
+        if len(signal) == 0:
+            return []
+        deviation = np.abs(signal.signal_mv - np.median(signal.signal_mv))
+        height = self.threshold_ratio * np.percentile(deviation, 99)
+        if height <= 0:
+            return []
+        distance = max(1, int(self.min_distance_t * signal.frequency))
+        peaks, _ = find_peaks(deviation, height=height, distance=distance)
+        return signal.time[peaks].tolist()
+
+
+def get_form_extent(rsteps: Sequence[RStep]) -> Tuple[float, float]:
+    """
+    Насколько далеко (в секундах) влево и вправо от стартовой точки могут зайти интервалы поиска шагов формы.
+    Границы точек оцениваются по шагам: точка шага лежит в его интервале, а интервал
+    отсчитывается от стартовой точки или от уже найденных точек.
+
+    :return: (отступ влево, отступ вправо), оба неотрицательные
+    """
+    bounds: Dict[str, Tuple[float, float]] = {}  # имя точки -> (самая левая, самая правая) координата
+    for rstep in rsteps:
+        interval = rstep.interval
+        if interval.left_point_name is not None:
+            left = bounds[interval.left_point_name][0]
+        elif interval.right_point_name is not None:
+            left = bounds[interval.right_point_name][0] - interval.left_padding
+        else:
+            left = -interval.left_padding
+
+        if interval.right_point_name is not None:
+            right = bounds[interval.right_point_name][1]
+        elif interval.left_point_name is not None:
+            right = bounds[interval.left_point_name][1] + interval.right_padding
+        else:
+            right = interval.right_padding
+
+        bounds[rstep.target_point_name] = (left, right)
+
+    if not bounds:
+        return 0.0, 0.0
+    return max(0.0, -min(left for left, _ in bounds.values())), max(0.0, max(right for _, right in bounds.values()))
+
+
+class StreamingRecognizer:
+    """
+    Принимает сигнал кусками и выдает экземпляры формы по мере того, как для них поступил весь нужный сигнал.
+
+    Последние отсчеты хранятся в буфере фиксированного размера - с запасом на самый широкий
+    экземпляр формы (см. get_form_extent) плюс margin_t с каждой стороны для SM и PC, которые смотрят
+    за границы интервалов. Стартовые точки ищутся в буфере после каждого поступления; точка
+    распознается, как только сигнал пришел до ее правой границы (с запасом margin_t), и
+    больше не рассматривается - следующая точка должна быть правее хотя бы на min_distance_t.
+
+    Координаты точек - абсолютное время от начала потока.
+    """
+
+    def __init__(self, rform: RForm, frequency: int = 500,
+                 seminal_points_finder: Optional[Callable[[Signal], List[float]]] = None,
+                 margin_t: float = 0.2, min_distance_t: float = 0.3, sm_on_whole_signal: bool = False):
+        """
+        :param rform: форма для распознавания
+        :param frequency: частота дискретизации потока, Гц
+        :param seminal_points_finder: поиск стартовых точек на сигнале (по умолчанию PeaksSeminalPointsFinder)
+        :param margin_t: запас сигнала (с) слева и справа от интервалов формы
+        :param min_distance_t: минимальное расстояние (с) между соседними стартовыми точками
+        :param sm_on_whole_signal: см. RForm.run_many
+        """
+        self.rform = rform
+        self.frequency = frequency
+        self.seminal_points_finder = seminal_points_finder or PeaksSeminalPointsFinder(min_distance_t=min_distance_t)
+        self.min_distance_t = min_distance_t
+        self.sm_on_whole_signal = sm_on_whole_signal
+
+        self.left_extent_t, self.right_extent_t = get_form_extent(rform.rsteps)
+        self.left_extent_t += margin_t
+        self.right_extent_t += margin_t
+
+        # Буфер вмещает окно одного экземпляра и еще столько же нового сигнала: куски потока
+        # большего размера добавляются по частям, поэтому ни одна стартовая точка не выпадает из буфера
+        window_size = int(math.ceil((self.left_extent_t + self.right_extent_t) * frequency)) + 1
+        self._piece_size = window_size
+        self._buffer = np.zeros(2 * window_size)
+        self._size = 0  # сколько отсчетов в буфере
+        self._start_tick = 0  # абсолютный номер первого отсчета буфера
+
+        self._last_seminal_point: Optional[float] = None
+
+    @property
+    def capacity(self) -> int:
+        """ Размер буфера в отсчетах """
+        return len(self._buffer)
+
+    def feed(self, chunk: Sequence[float]) -> List[StreamResult]:
+        """
+        Добавляет очередной кусок сигнала (мВ).
+
+        :return: экземпляры, для которых теперь есть весь нужный сигнал
+        """
+        chunk = np.asarray(chunk, dtype=np.float64)
+        results = []
+        for start in range(0, len(chunk), self._piece_size):
+            self._append(chunk[start:start + self._piece_size])
+            results.extend(self._recognize_ready(final=False))
+        return results
+
+    def flush(self) -> List[StreamResult]:
+        """
+        Конец потока: распознает оставшиеся стартовые точки на том сигнале, что есть.
+        """
+        return self._recognize_ready(final=True)
+
+    def run(self, chunks: Iterable[Sequence[float]]) -> Iterator[StreamResult]:
+        """ Распознает весь поток кусков, выдавая экземпляры по мере готовности """
+        for chunk in chunks:
+            yield from self.feed(chunk)
+        yield from self.flush()
+
+    def _append(self, piece: np.ndarray) -> None:
+        """ Дописывает кусок (не длиннее половины буфера), при нехватке места вытесняя самые старые отсчеты """
+        overflow = self._size + len(piece) - self.capacity
+        if overflow > 0:
+            self._buffer[:self._size - overflow] = self._buffer[overflow:self._size]
+            self._size -= overflow
+            self._start_tick += overflow
+        self._buffer[self._size:self._size + len(piece)] = piece
+        self._size += len(piece)
+
+    def _buffer_signal(self) -> Signal:
+        """ Содержимое буфера в виде сигнала с абсолютными номерами отсчетов (копия: буфер дальше перезаписывается) """
+        return Signal(signal_mv=self._buffer[:self._size].copy(),
+                      ticks=np.arange(self._start_tick, self._start_tick + self._size), frequency=self.frequency)
+
+    def _recognize_ready(self, final: bool) -> List[StreamResult]:
+        if self._size == 0:
+            return []
+        signal = self._buffer_signal()
+        end_t = (self._start_tick + self._size) / self.frequency
+
+        seminal_points = []
+        for point in sorted(self.seminal_points_finder(signal)):
+            if not final and point + self.right_extent_t > end_t:
+                break  # справа сигнал еще не пришел, точка будет найдена снова при следующем поступлении
+            if self._last_seminal_point is not None and point < self._last_seminal_point + self.min_distance_t:
+                continue  # уже распознана (или слишком близко к распознанной)
+            seminal_points.append(point)
+            self._last_seminal_point = point
+
+        if not seminal_points:
+            return []
+        pools = self.rform.run_many(signal, seminal_points, sm_on_whole_signal=self.sm_on_whole_signal)
+        return [StreamResult(seminal_point=point, pool=pool) for point, pool in zip(seminal_points, pools)]
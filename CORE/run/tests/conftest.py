@@ -0,0 +1,60 @@
+from typing import List, Optional
+
+import pytest
+
+from CORE.db_dataclasses import Form, Point, Step, Track
+from CORE.run.eval.positive_only import SumDistsEval
+from CORE.run.r_form import RForm
+
+
+# --- Вспомогательные классы ---
+
+
+class EmptyDataset:
+    """Датасет без параметров: оценщику нечего сравнивать, все экземпляры получают 0."""
+    param_names = []
+
+    def get_parameter_values(self, param_name):
+        return []
+
+
+def form_with_tracks(r_tracks: List[Track], s_tracks: Optional[List[Track]] = None, form_id: int = 1,
+                     padding_t: float = 0.1) -> Form:
+    """
+    Форма без параметров: точка R в окне +-padding_t от стартовой точки и,
+    если заданы треки s_tracks, точка S в 0.1 с правее R.
+    """
+    r = Point(id=1, name='R')
+    steps = [Step(num_in_form=0, target_point=r, left_padding_t=padding_t, right_padding_t=padding_t,
+                  tracks=r_tracks)]
+    points = [r]
+    if s_tracks is not None:
+        s = Point(id=2, name='S')
+        steps.append(Step(num_in_form=1, target_point=s, left_point=r, right_padding_t=0.1, tracks=s_tracks))
+        points.append(s)
+    name = ''.join(point.name for point in points)
+    return Form(id=form_id, name=name, points=points, parameters=[], steps=steps, HC_PC_objects=[])
+
+
+# --- Фикстуры ---
+
+
+@pytest.fixture
+def empty_evaluator():
+    return SumDistsEval(EmptyDataset())
+
+
+@pytest.fixture
+def make_form():
+    """Фабрика форм с точкой R и, возможно, S (см. form_with_tracks)."""
+    return form_with_tracks
+
+
+@pytest.fixture
+def make_rform(empty_evaluator):
+    """Фабрика RForm из form_with_tracks, экземпляры оцениваются empty_evaluator."""
+
+    def make(*args, **kwargs) -> RForm:
+        return RForm(form_with_tracks(*args, **kwargs), evaluator=empty_evaluator)
+
+    return make
@@ -0,0 +1,59 @@
+import json
+
+import numpy as np
+import pytest
+
+from CORE.db_dataclasses import BaseClass, BasePazzle, Track
+from CORE.run.batch import BatchTask, get_evaluator_class, run_batch
+
+
+# --- Фикстуры ---
+
+
+@pytest.fixture
+def form(make_form):
+    # Одна точка R на глобальном максимуме в окне +-0.1 с от стартовой точки
+    return make_form([Track(id=1, SMs=[], PSs=[BasePazzle(id=2, class_ref=BaseClass(name="GlobalMaxSelector"))])])
+
+
+@pytest.fixture
+def tasks():
+    result = []
+    for i in range(6):
+        signal_mv = np.zeros(1000)
+        peak = 200 + 100 * i
+        signal_mv[peak] = 1.0
+        result.append(BatchTask(entry_id=f"rec_{i}", signal_mv=signal_mv, frequency=500,
+                                seminal_point=peak / 500 + 0.05, true_points={'R': peak / 500}))
+    # Стартовая точка вне сигнала: ошибка записи попадает в результат, пакет продолжается
+    result.append(BatchTask(entry_id="bad", signal_mv=np.zeros(10), frequency=500, seminal_point=5.0, true_points={}))
+    return result
+
+
+def read_results(path):
+    with open(path, encoding='utf-8') as f:
+        return {row['id']: row for row in map(json.loads, f)}
+
+
+# --- Тесты ---
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_run_batch(form, empty_evaluator, tasks, tmp_path, workers):
+    output = tmp_path / "results.jsonl"
+
+    written = run_batch(form, empty_evaluator, tasks, str(output), workers=workers)
+
+    results = read_results(output)
+    assert written == len(results) == len(tasks)
+    for task in tasks[:-1]:
+        row = results[task.entry_id]
+        assert row['error'] is None
+        assert row['exemplars'][0]['points'] == task.true_points
+    assert results['bad']['error'] and results['bad']['exemplars'] == []
+
+
+def test_unknown_evaluator():
+    assert get_evaluator_class('KDE_Eval').__name__ == 'KDE_Eval'
+    with pytest.raises(ValueError):
+        get_evaluator_class('NoSuchEvaluator')
@@ -0,0 +1,35 @@
+import numpy as np
+
+from CORE.benchmarks.cases import BenchmarkCase, BenchmarkData, collect_cases
+from CORE.benchmarks.run_benchmarks import compare, run_benchmarks
+from CORE.benchmarks.synthetic import synthetic_ecg
+
+
+def test_synthetic_ecg_deterministic():
+    """Один и тот же seed - один и тот же сигнал: иначе прогоны несравнимы."""
+    signal1, beats1 = synthetic_ecg(seed=7, seconds=5)
+    signal2, beats2 = synthetic_ecg(seed=7, seconds=5)
+    assert beats1 == beats2
+    np.testing.assert_array_equal(signal1.signal_mv, signal2.signal_mv)
+    assert len(signal1) == 5 * 500
+
+
+def test_run_benchmarks_filter_and_skipped():
+    """Запускаются только отфильтрованные бенчмарки; упавшая подготовка - пропуск с причиной."""
+    def broken():
+        raise ImportError("нет зависимости")
+
+    cases = collect_cases(BenchmarkData()) + [BenchmarkCase('signal/broken', broken)]
+    report = run_benchmarks(cases, name_filter='signal/', min_time=0.001, repeat=2)
+
+    assert report['results']
+    assert all(name.startswith('signal/') for name in report['results'])
+    assert report['skipped'] == {'signal/broken': 'ImportError: нет зависимости'}
+    assert all(result['median_s'] > 0 for result in report['results'].values())
+
+
+def test_compare_flags_regressions():
+    old = {'results': {'a': {'median_s': 1.0}, 'b': {'median_s': 1.0}, 'only_old': {'median_s': 1.0}}}
+    new = {'results': {'a': {'median_s': 1.1}, 'b': {'median_s': 2.0}}}
+    rows = compare(old, new, threshold=1.25)
+    assert [(name, regression) for name, _, _, _, regression in rows] == [('a', False), ('b', True)]
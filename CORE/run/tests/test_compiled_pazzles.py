@@ -0,0 +1,149 @@
+from typing import Any, Dict
+
+import pytest
+
+from CORE.db_dataclasses import (
+    BasePazzle, BaseClass, ClassInputPoint, ObjectInputPointValue, Point,
+    Parameter, ClassInputParam, ObjectInputParamValue,
+    ClassOutputParam, ObjectOutputParamValue, ClassArgument, ObjectArgumentValue
+)
+from CORE.exeptions import RunPazzleError
+from CORE.run import Exemplar
+from CORE.run.r_hc import R_HC
+from CORE.run.r_pc import R_PC
+from CORE.run.run_pazzle.classes_registry import classes_registry
+from CORE.signal_1d import Signal
+
+
+# --- Вспомогательные классы ---
+
+
+class CountingPC:
+    """PC-пазл, считающий, сколько раз его создавали."""
+    created = 0
+
+    def __init__(self, scale: float):
+        self.scale = scale
+        CountingPC.created += 1
+
+    def register_points(self, a: float) -> None:
+        self.a = a
+
+    def register_input_parameters(self, p: float) -> None:
+        self.p = p
+
+    def run(self, signal: Signal) -> Dict[str, Any]:
+        return {'out': self.scale * (self.a + self.p)}
+
+
+class CountingHC:
+    """HC-пазл, считающий, сколько раз его создавали."""
+    created = 0
+
+    def __init__(self, threshold: float):
+        self.threshold = threshold
+        CountingHC.created += 1
+
+    def register_input_parameters(self, p: float) -> None:
+        self.p = p
+
+    def run(self) -> bool:
+        return self.p < self.threshold
+
+
+# --- Фикстуры ---
+
+
+@pytest.fixture
+def form_points():
+    return [Point(id=1, name="A")]
+
+
+@pytest.fixture
+def form_params():
+    return [Parameter(id=10, name="P"), Parameter(id=11, name="RES")]
+
+
+@pytest.fixture
+def pc_pazzle():
+    classes_registry.register("CountingPC", CountingPC)
+    CountingPC.created = 0
+    return BasePazzle(
+        id=7,
+        class_ref=BaseClass(
+            name="CountingPC",
+            constructor_arguments=[ClassArgument(id=100, name="scale", data_type="float")],
+            input_points=[ClassInputPoint(id=1, name="a")],
+            input_params=[ClassInputParam(id=2, name="p")],
+            output_params=[ClassOutputParam(id=3, name="out")],
+        ),
+        argument_values=[ObjectArgumentValue(argument_id=100, argument_value="2")],
+        input_point_values=[ObjectInputPointValue(input_point_id=1, point_id=1)],
+        input_param_values=[ObjectInputParamValue(input_param_id=2, parameter_id=10)],
+        output_param_values=[ObjectOutputParamValue(output_param_id=3, parameter_id=11)],
+    )
+
+
+@pytest.fixture
+def hc_pazzle():
+    classes_registry.register("CountingHC", CountingHC)
+    CountingHC.created = 0
+    return BasePazzle(
+        id=8,
+        class_ref=BaseClass(
+            name="CountingHC",
+            constructor_arguments=[ClassArgument(id=101, name="threshold", data_type="float")],
+            input_params=[ClassInputParam(id=4, name="p")],
+        ),
+        argument_values=[ObjectArgumentValue(argument_id=101, argument_value="0.5")],
+        input_param_values=[ObjectInputParamValue(input_param_id=4, parameter_id=10)],
+    )
+
+
+def make_exemplar(a: float, p: float) -> Exemplar:
+    ex = Exemplar(Signal(signal_mv=[0.0] * 500, frequency=500))
+    ex.add_point("A", a, track_id=None)
+    ex.add_parameter("P", p)
+    return ex
+
+
+# --- Тесты ---
+
+
+def test_pc_created_once_for_many_exemplars(pc_pazzle, form_points, form_params):
+    r_pc = R_PC(pc_pazzle, form_points=form_points, form_params=form_params)
+
+    assert r_pc.run(make_exemplar(0.1, 1.0)) == {"RES": pytest.approx(2.2)}
+    assert r_pc.run(make_exemplar(0.3, 2.0)) == {"RES": pytest.approx(4.6)}
+    assert CountingPC.created == 1
+
+
+def test_pc_compile_is_idempotent(pc_pazzle, form_points, form_params):
+    r_pc = R_PC(pc_pazzle, form_points=form_points, form_params=form_params)
+    r_pc.compile()
+    r_pc.compile()
+    r_pc.run(make_exemplar(0.1, 1.0))
+    assert CountingPC.created == 1
+
+
+def test_pc_missing_point_after_compile(pc_pazzle, form_points, form_params):
+    r_pc = R_PC(pc_pazzle, form_points=form_points, form_params=form_params)
+    r_pc.compile()
+    ex = Exemplar(Signal(signal_mv=[0.0] * 500, frequency=500))
+    ex.add_parameter("P", 1.0)
+    with pytest.raises(RunPazzleError):
+        r_pc.run(ex)
+
+
+def test_pc_mapping_error_raised_on_compile(pc_pazzle, form_params):
+    r_pc = R_PC(pc_pazzle, form_points=[], form_params=form_params)
+    with pytest.raises(RunPazzleError):
+        r_pc.compile()
+
+
+def test_hc_created_once_for_many_exemplars(hc_pazzle, form_params):
+    r_hc = R_HC(hc_pazzle, form_params=form_params)
+
+    assert r_hc.run(make_exemplar(0.1, 0.2)) is True
+    assert r_hc.run(make_exemplar(0.1, 0.9)) is False
+    assert CountingHC.created == 1
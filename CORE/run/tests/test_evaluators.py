@@ -0,0 +1,226 @@
+from functools import partial
+from typing import Dict, List
+
+import numpy as np
+import pytest
+
+from CORE.run import Exemplar
+from CORE.run.eval.positive_only import (
+    EllipticEnvelopeEvaluator, IsolationForestPercentileEvaluator, KDE_Eval, LOFPercentileEvaluator,
+    MahalanobisEval, MahalanobisNonparametricEval, MannWhitneyEval, OneClassSVMEvaluator, SumDistsEval
+)
+from CORE.run.eval.with_contrast.KNN_adaptive_k import KNNBinaryEvaluator
+from CORE.run.eval.with_contrast.RBF_SVM import RBFSVMEvaluator
+from CORE.run.eval.with_contrast.gradient_boosting import GradientBoostingEvaluator
+from CORE.signal_1d import Signal
+
+
+# --- Вспомогательные классы ---
+
+
+class FakeDataset:
+    """Минимальная замена ParametrisedDataset: параметры и их значения по экземплярам датасета."""
+
+    def __init__(self, data: Dict[str, List[float]]):
+        self.data = data
+        self.param_names = list(data.keys())
+
+    def get_parameter_values(self, param_name: str) -> List[float]:
+        return self.data[param_name]
+
+
+# --- Фикстуры ---
+
+
+@pytest.fixture
+def dataset():
+    rng = np.random.default_rng(0)
+    p1 = rng.normal(3, 1, 60)
+    return FakeDataset({
+        'p1': p1.tolist(),
+        'p2': (2 * p1 + rng.normal(0, 0.5, 60)).tolist(),
+        'p3': rng.normal(1, 0.2, 60).tolist(),
+    })
+
+
+@pytest.fixture
+def contrast_dataset():
+    rng = np.random.default_rng(1)
+    p1 = rng.normal(5, 1, 60)
+    return FakeDataset({
+        'p1': p1.tolist(),
+        'p2': (-p1 + rng.normal(0, 0.5, 60)).tolist(),
+        'p3': rng.normal(1.5, 0.3, 60).tolist(),
+    })
+
+
+def make_exemplar(**params: float) -> Exemplar:
+    ex = Exemplar(Signal(signal_mv=[0.0] * 10, frequency=500))
+    for name, value in params.items():
+        ex.add_parameter(name, value)
+    return ex
+
+
+def mlp_evaluator(positive_dataset, contrast_dataset):
+    pytest.importorskip('torch')
+    from CORE.run.eval.with_contrast.neural_network_simple import PyTorchMLPEvaluator
+    return PyTorchMLPEvaluator(positive_dataset, contrast_dataset, epochs=20, verbose=False)
+
+
+EVALUATORS = [LOFPercentileEvaluator, IsolationForestPercentileEvaluator, OneClassSVMEvaluator,
+              MahalanobisEval, MahalanobisNonparametricEval,
+              partial(EllipticEnvelopeEvaluator, random_state=0)]  # MCD без random_state недетерминирован
+CONTRAST_EVALUATORS = [KNNBinaryEvaluator, RBFSVMEvaluator, GradientBoostingEvaluator, mlp_evaluator]
+
+
+# --- Тесты ---
+
+
+@pytest.mark.parametrize("evaluator_cls", EVALUATORS)
+def test_submodel_fitted_once_per_param_subset(dataset, evaluator_cls, monkeypatch):
+    evaluator = evaluator_cls(dataset)
+    fitted = []
+    fit_submodel = evaluator._fit_submodel
+    monkeypatch.setattr(evaluator, '_fit_submodel', lambda params: fitted.append(params) or fit_submodel(params))
+
+    for value in [2.0, 3.0, 4.0]:
+        evaluator.eval_exemplar(make_exemplar(p1=value))
+        evaluator.eval_exemplar(make_exemplar(p2=2 * value, p1=value))
+
+    assert fitted == [['p1'], ['p1', 'p2']]  # колонки всегда в порядке параметров датасета
+
+
+@pytest.mark.parametrize("evaluator_cls", EVALUATORS)
+def test_cached_submodel_gives_same_scores(dataset, evaluator_cls):
+    evaluator = evaluator_cls(dataset)
+    exemplars = [make_exemplar(p1=v, p3=1.0) for v in [1.0, 3.0, 8.0]]
+
+    scores = [evaluator.eval_exemplar(ex) for ex in exemplars]
+    fresh_scores = [evaluator_cls(dataset).eval_exemplar(ex) for ex in exemplars]
+
+    assert scores == fresh_scores
+    assert all(0.0 <= score <= 1.0 for score in scores)
+    assert scores[1] > scores[2]  # выброс оценивается ниже типичного экземпляра
+
+
+@pytest.mark.parametrize("evaluator_cls", EVALUATORS)
+def test_no_common_params(dataset, evaluator_cls):
+    assert evaluator_cls(dataset).eval_exemplar(make_exemplar(other=1.0)) == 0.0
+
+
+@pytest.mark.parametrize("params", [['p1'], ['p1', 'p3'], ['p1', 'p2', 'p3']])
+def test_mahalanobis_matches_inverse_covariance(dataset, params):
+    data = np.array([dataset.get_parameter_values(p) for p in params])
+    mean = data.mean(axis=1)
+    inv_cov = np.linalg.inv(np.atleast_2d(np.cov(data)))
+    x = np.array([4.0, 7.0, 1.3][:len(params)])
+    expected = 1.0 / (1.0 + np.sqrt((x - mean) @ inv_cov @ (x - mean)))
+
+    score = MahalanobisEval(dataset).eval_exemplar(make_exemplar(**dict(zip(params, x))))
+
+    assert score == pytest.approx(expected, rel=1e-9)
+
+
+def test_mahalanobis_degenerate_covariance():
+    # Линейно зависимые параметры: ковариация вырождена, оценка все равно считается
+    dataset = FakeDataset({'a': [1.0, 2.0, 3.0, 4.0], 'b': [2.0, 4.0, 6.0, 8.0]})
+    score = MahalanobisEval(dataset).eval_exemplar(make_exemplar(a=2.5, b=5.0))
+    assert 0.0 < score <= 1.0
+
+
+def test_prepare_fits_submodels_in_advance(dataset, monkeypatch):
+    evaluator = MahalanobisEval(dataset)
+    evaluator.prepare([['p1'], ['p1', 'p2', 'unknown'], []])
+
+    monkeypatch.setattr(evaluator, '_fit_submodel', lambda params: pytest.fail("подмодель не подготовлена"))
+    evaluator.eval_exemplar(make_exemplar(p1=3.0))
+    evaluator.eval_exemplar(make_exemplar(p2=6.0, p1=3.0))
+
+
+@pytest.mark.parametrize("evaluator_cls", EVALUATORS + [KDE_Eval, SumDistsEval, MannWhitneyEval])
+def test_batch_matches_single(dataset, evaluator_cls):
+    evaluator = evaluator_cls(dataset)
+    exemplars = [make_exemplar(p1=3.0), make_exemplar(p1=5.0, p2=6.0), make_exemplar(),
+                 make_exemplar(p3=0.9, p1=2.0), make_exemplar(p1=1.0), make_exemplar(p1=2.5, p2=5.0, p3=1.1)]
+
+    scores = evaluator.eval_exemplars(exemplars)
+
+    assert isinstance(scores, np.ndarray)
+    assert scores.tolist() == pytest.approx([evaluator.eval_exemplar(ex) for ex in exemplars], abs=1e-12)
+    assert len(evaluator.eval_exemplars([])) == 0
+
+
+@pytest.mark.parametrize("evaluator_cls", CONTRAST_EVALUATORS)
+def test_contrast_batch_matches_single(dataset, contrast_dataset, evaluator_cls):
+    evaluator = evaluator_cls(dataset, contrast_dataset)
+    exemplars = [make_exemplar(p1=v, p2=2 * v, p3=1.0 + v / 10) for v in np.linspace(1.0, 7.0, 7)]
+    exemplars += [make_exemplar(p1=5.0, p2=-5.0, p3=1.5)]
+
+    scores = evaluator.eval_exemplars(exemplars)
+
+    assert isinstance(scores, np.ndarray)
+    # сеть PyTorchMLPEvaluator считает во float32
+    assert scores.tolist() == pytest.approx([evaluator.eval_exemplar(ex) for ex in exemplars], abs=1e-6)
+    assert all(0.0 <= score <= 1.0 for score in scores)
+    assert scores[2] > scores[-1]  # типичный позитивный экземпляр выше контрастного
+    assert len(evaluator.eval_exemplars([])) == 0
+
+
+def test_kde_normalizers_precomputed(dataset, monkeypatch):
+    evaluator = KDE_Eval(dataset)
+    exemplar = make_exemplar(p1=3.0, p3=1.0)
+    score = evaluator.eval_exemplar(exemplar)
+
+    # Плотность на выборке считается только при инициализации
+    monkeypatch.setattr(KDE_Eval, '_max_density', staticmethod(lambda kde: pytest.fail("нормировка пересчитана")))
+    assert evaluator.eval_exemplar(exemplar) == score
+    assert 0.0 < score <= 1.0
+
+
+def test_kde_grid_close_to_exact(dataset):
+    dataset.data['single'] = [5.0]
+    dataset.param_names.append('single')
+    exact = KDE_Eval(dataset)
+    grid = KDE_Eval(dataset, grid_size=2048)
+    exemplars = [make_exemplar(p1=v, p2=2 * v, p3=1.0 + v / 10) for v in np.linspace(-2.0, 8.0, 41)]
+    exemplars += [make_exemplar(single=5.0, p1=100.0), make_exemplar()]
+
+    assert set(grid.param_to_grid) == {'p1', 'p2', 'p3'}  # у одиночного значения сетки нет
+    assert grid.eval_exemplars(exemplars) == pytest.approx(exact.eval_exemplars(exemplars), abs=1e-3)
+    assert grid.eval_exemplar(exemplars[20]) == pytest.approx(exact.eval_exemplar(exemplars[20]), abs=1e-3)
+
+    with pytest.raises(KeyError):
+        grid.eval_exemplars([make_exemplar(p1=3.0, unknown=1.0)])
+
+
+def test_kde_grid_non_finite_values(dataset):
+    exact = KDE_Eval(dataset)
+    grid = KDE_Eval(dataset, grid_size=512)
+    exemplars = [make_exemplar(p1=np.nan, p2=0.1), make_exemplar(p1=np.inf, p3=-np.inf), make_exemplar(p1=3.0)]
+
+    scores = exact.eval_exemplars(exemplars)
+    assert grid.eval_exemplars(exemplars) == pytest.approx(scores, abs=1e-3)
+    # NaN одного экземпляра не обнуляет оценки остальных
+    assert scores.tolist() == pytest.approx([exact.eval_exemplar(ex) for ex in exemplars], abs=1e-12)
+    assert scores[2] > 0.5
+
+
+@pytest.mark.parametrize("sample", [
+    [1.0, 2.0, 3.0, 4.0, 5.0],  # без связок: точный расчет
+    [1.0, 2.0, 2.0, 3.0, 5.0, 5.0, 5.0],  # связки в выборке: нормальное приближение
+    np.random.default_rng(2).normal(0, 1, 40).round(1).tolist(),
+])
+def test_mann_whitney_matches_scipy(sample):
+    from scipy.stats import mannwhitneyu
+
+    evaluator = MannWhitneyEval(FakeDataset({'p': sample}))
+    values = np.array([-3.0, 0.0, 1.0, 2.0, 2.5, 5.0, 7.0] + sample[:5])
+
+    expected = [1.0 - mannwhitneyu(sample, [v], alternative='two-sided', method='auto').pvalue for v in values]
+
+    assert evaluator._score_param_values('p', values) == pytest.approx(expected, abs=1e-12)
+
+
+def test_mann_whitney_identical_numbers():
+    evaluator = MannWhitneyEval(FakeDataset({'p': [2.0, 2.0, 2.0]}))
+    assert evaluator.eval_exemplar(make_exemplar(p=2.0)) == 1.0  # p = 1: значение неотличимо от выборки
@@ -0,0 +1,134 @@
+from copy import deepcopy
+
+import numpy as np
+import pytest
+
+from CORE.exeptions import CoreError
+from CORE.run import Exemplar, ExemplarLayout
+from CORE.signal_1d import Signal
+
+
+@pytest.fixture
+def parent():
+    """Экземпляр с одной точкой и одним параметром на сигнале длительностью 1 секунда."""
+    ex = Exemplar(Signal(signal_mv=[0.0] * 501, frequency=500))
+    ex.add_point("A", 0.2, track_id=1)
+    ex.add_parameter("amp", 0.5)
+    ex.evaluation_result = 0.7
+    ex.failed_HCs_ids.append(10)
+    return ex
+
+
+def test_child_shares_signal(parent):
+    child = parent.make_child()
+    assert child.signal is parent.signal
+    assert child.get_point_coord("A") == 0.2
+    assert child.get_parameter_value("amp") == 0.5
+    assert child.evaluation_result == 0.7
+    assert child.get_failed_hc_ids() == [10]
+
+
+def test_child_growth_does_not_touch_parent(parent):
+    child = parent.make_child()
+    child.add_point("B", 0.4, track_id=2)
+    child.add_parameter("dist", 0.2)
+    child.failed_HCs_ids.append(11)
+
+    assert len(child) == len(parent) + 1
+    assert not parent.contains_point("B")
+    assert not parent.contains_parameter("dist")
+    assert parent.get_failed_hc_ids() == [10]
+    assert child.get_param_names() == ["amp", "dist"]
+
+
+def test_child_can_not_overwrite_parent_data(parent):
+    grandchild = parent.make_child().make_child()
+    with pytest.raises(CoreError):
+        grandchild.add_point("A", 0.3, track_id=3)
+    with pytest.raises(CoreError):
+        grandchild.add_parameter("amp", 1.0)
+
+
+def test_deepcopy_flattens_child(parent):
+    child = parent.make_child()
+    child.add_point("B", 0.4, track_id=2)
+
+    snapshot = deepcopy(child)
+    assert snapshot.signal is child.signal
+    assert list(snapshot._points.items()) == [("A", (0.2, 1)), ("B", (0.4, 2))]
+
+    # Из копии можно удалять точки, в т.ч. унаследованные от родителя
+    del snapshot._points["A"]
+    snapshot._parameters.clear()
+    assert parent.contains_point("A")
+    assert child.contains_point("A")
+    assert child.get_parameter_value("amp") == 0.5
+
+
+@pytest.fixture
+def layout():
+    return ExemplarLayout(point_names=["A", "B"], param_names=["amp", "dist"])
+
+
+@pytest.fixture
+def laid_out_parent(layout):
+    """Тот же экземпляр, что и parent, но с раскладкой: точка и параметр лежат в массиве значений."""
+    ex = Exemplar(Signal(signal_mv=[0.0] * 501, frequency=500), layout=layout)
+    ex.add_point("A", 0.2, track_id=1)
+    ex.add_parameter("amp", 0.5)
+    ex.evaluation_result = 0.7
+    return ex
+
+
+def test_layout_child_growth_does_not_touch_parent(laid_out_parent):
+    child = laid_out_parent.make_child()
+    child.add_point("B", 0.4, track_id=2)
+    child.add_parameter("dist", 0.2)
+
+    assert len(child) == len(laid_out_parent) + 1 == 2
+    assert not laid_out_parent.contains_point("B")
+    assert not laid_out_parent.contains_parameter("dist")
+    assert child.get_points() == {"A": (0.2, 1), "B": (0.4, 2)}
+    assert child.get_point_track_id("B") == 2
+    assert child.get_param_names() == ["amp", "dist"]
+    with pytest.raises(CoreError):
+        child.add_parameter("amp", 1.0)
+
+
+def test_layout_keeps_other_values_as_is(laid_out_parent):
+    """NaN, не float и имена вне раскладки хранятся в словарях экземпляра, а не теряются в массиве."""
+    ex = laid_out_parent.make_child()
+    ex.add_parameter("dist", float("nan"))
+    ex.add_parameter("flag", True)
+    ex.add_point("C", 0.6, track_id=3)
+
+    assert ex.contains_parameter("dist") and np.isnan(ex.get_parameter_value("dist"))
+    assert ex.get_parameter_value("flag") is True
+    assert ex.get_param_names() == ["amp", "dist", "flag"]
+    assert ex.get_point_coord("C") == 0.6 and len(ex) == 2
+    assert Exemplar.get_shared_layout([ex]) is None
+
+
+def test_layout_deepcopy_has_no_layout(laid_out_parent):
+    snapshot = deepcopy(laid_out_parent)
+    assert snapshot.layout is None
+    assert list(snapshot._points.items()) == [("A", (0.2, 1))]
+    assert snapshot.get_parameter_value("amp") == 0.5
+
+
+def test_parameters_matrix_fast_path_matches_names(laid_out_parent):
+    """Матрица параметров из массивов значений совпадает со сбором по именам."""
+    children = []
+    for dist in (0.1, 0.3):
+        child = laid_out_parent.make_child()
+        child.add_parameter("dist", dist)
+        children.append(child)
+
+    matrix = Exemplar.parameters_matrix(children, ["dist", "amp"])
+    np.testing.assert_array_equal(matrix, [[0.1, 0.5], [0.3, 0.5]])
+    np.testing.assert_array_equal(matrix, Exemplar.parameters_matrix([deepcopy(c) for c in children], ["dist", "amp"]))
+
+    indices, codes, values, code_names = Exemplar.collect_parameters(children + [laid_out_parent])
+    assert indices.tolist() == [0, 0, 1, 1, 2]
+    assert [code_names[code] for code in codes] == ["amp", "dist", "amp", "dist", "amp"]
+    assert values.tolist() == [0.5, 0.1, 0.5, 0.3, 0.5]
@@ -0,0 +1,77 @@
+import json
+import pickle
+from copy import deepcopy
+
+import numpy as np
+import pytest
+
+from CORE.datasets_wrappers.form_associated.exemplars_dataset import ExemplarsDataset
+from CORE.datasets_wrappers.third_party_dataset import ThirdPartyDataset
+from CORE.exeptions import CoreError
+from CORE.signal_1d import Signal
+
+
+class CountingOuterDataset(ThirdPartyDataset):
+    """Внешний датасет из трех пациентов, считающий загрузки сигналов."""
+
+    def __init__(self):
+        self.loads = []
+
+    def get_1d_signal(self, patient_id, lead_name):
+        if lead_name != 'ii':
+            return None
+        self.loads.append(patient_id)
+        return Signal(signal_mv=np.full(1000, float(patient_id)))
+
+    def get_patients_ids(self):
+        return ['1', '2', '3']
+
+
+@pytest.fixture
+def dataset_path(tmp_path):
+    data = {patient_id: {'patient_id': patient_id, 'lead_name': 'ii', 'points': {'R': 0.5}}
+            for patient_id in ['1', '2', '3', '404']}
+    data['bad_lead'] = {'patient_id': '1', 'lead_name': 'v1', 'points': {'R': 0.5}}
+    path = tmp_path / 'form.json'
+    path.write_text(json.dumps({'meta': {'points': ['R']}, 'data': data}), encoding='utf-8')
+    return str(path)  # абсолютный путь: os.path.join с EXEMPLARS_DATASETS_PATH его не меняет
+
+
+def test_signals_loaded_lazily_with_bounded_cache(dataset_path):
+    outer = CountingOuterDataset()
+    dataset = ExemplarsDataset(form_dataset_name=dataset_path, outer_dataset=outer, signals_cache_size=2)
+
+    # запись пациента, которого нет во внешнем датасете, пропущена; сигналы при загрузке не читались
+    assert dataset.get_all_ids() == ['1', '2', '3', 'bad_lead']
+    assert outer.loads == []
+    assert dataset.get_exemplar_by_id('1').get_point_coord('R') == 0.5
+
+    first = dataset.get_exemplar_by_id('1')
+    assert first.signal is first.signal and first.signal.signal_mv[0] == 1.0
+    assert outer.loads == ['1']
+
+    dataset.get_exemplar_by_id('2').get_signal()
+    dataset.get_exemplar_by_id('3').get_signal()
+    assert len(dataset.signals_cache) == 2
+    first.get_signal()  # вытеснен из кэша - загружается заново
+    assert outer.loads == ['1', '2', '3', '1']
+
+    with pytest.raises(CoreError):
+        dataset.get_exemplar_by_id('bad_lead').get_signal()
+
+
+def test_deepcopy_and_pickle_do_not_copy_signals(dataset_path):
+    outer = CountingOuterDataset()
+    dataset = ExemplarsDataset(form_dataset_name=dataset_path, outer_dataset=outer)
+    signal = dataset.get_exemplar_by_id('2').signal
+
+    copied = deepcopy(dataset)
+    assert copied.signals_cache is dataset.signals_cache
+    assert copied.get_exemplar_by_id('2').signal is signal
+    copied.get_exemplar_by_id('2').add_parameter('amp', 1.0)
+    assert not dataset.get_exemplar_by_id('2').contains_parameter('amp')
+    assert outer.loads == ['2']
+
+    restored = pickle.loads(pickle.dumps(dataset.get_exemplar_by_id('2')))
+    assert len(restored._signal_loader.cache) == 0  # кэш сигналов сериализуется пустым
+    assert restored.signal.signal_mv[0] == 2.0
@@ -0,0 +1,73 @@
+import json
+import os
+import pickle
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from CORE.datasets_wrappers.ludb import LUDB, is_store_fresh
+
+
+def write_ludb_json(path, patients):
+    """JSON в формате ecg_data_200.json: пациент -> Leads -> отведение -> Signal (мкВ)"""
+    data = {patient_id: {'Leads': {lead: {'Signal': signal} for lead, signal in leads.items()}}
+            for patient_id, leads in patients.items()}
+    path.write_text(json.dumps(data), encoding='utf-8')
+
+
+@pytest.fixture
+def ludb_paths(tmp_path):
+    json_path = tmp_path / 'ecg_data_200.json'
+    write_ludb_json(json_path, {'7': {'i': [1, -2, 1003], 'ii': [5, 6]}, '3': {'i': [40, 41, 42, 43]}})
+    return str(json_path), str(tmp_path / 'ludb_store')
+
+
+def test_store_signals_match_json(ludb_paths):
+    """Сигналы из хранилища - ровно те же милливольты, что давало деление каждого отсчета на 1000."""
+    json_path, store_path = ludb_paths
+    ludb = LUDB(json_path=json_path, store_path=store_path)
+
+    assert is_store_fresh(json_path, store_path)
+    assert ludb.get_patients_ids() == ['7', '3']
+    assert ludb.get_1d_signal('7', 'i').signal_mv.tolist() == [s / 1000 for s in [1, -2, 1003]]
+    assert ludb.get_1d_signal('3', 'i').signal_mv.tolist() == [s / 1000 for s in [40, 41, 42, 43]]
+    assert ludb.get_1d_signal('3', 'ii') is None
+    assert ludb.get_1d_signal('404', 'i') is None
+
+    # сигнал - срез отображенного в память массива, а не копия
+    assert np.shares_memory(ludb.get_1d_signal('7', 'ii').signal_mv, ludb._signals)
+
+
+def test_store_rebuilt_when_json_is_newer(ludb_paths):
+    json_path, store_path = ludb_paths
+    fingerprint = LUDB(json_path=json_path, store_path=store_path).get_fingerprint()
+    assert LUDB(json_path=json_path, store_path=store_path).get_fingerprint() == fingerprint
+
+    write_ludb_json(Path(json_path), {'1': {'v1': [100]}})
+    index_mtime = os.path.getmtime(os.path.join(store_path, 'index.json'))
+    os.utime(json_path, (index_mtime + 10, index_mtime + 10))
+    assert not is_store_fresh(json_path, store_path)
+
+    ludb = LUDB(json_path=json_path, store_path=store_path)
+    assert ludb.get_patients_ids() == ['1']
+    assert ludb.get_1d_signal('1', 'v1').signal_mv.tolist() == [0.1]
+    assert ludb.get_fingerprint() != fingerprint  # посчитанное на старых сигналах из кэша не возьмется
+
+
+def test_store_without_json_and_pickle(ludb_paths):
+    """Готовому хранилищу JSON не нужен; в другой процесс LUDB передается без сигналов."""
+    json_path, store_path = ludb_paths
+    LUDB(json_path=json_path, store_path=store_path)
+    os.remove(json_path)
+
+    ludb = LUDB(json_path=json_path, store_path=store_path)
+    payload = pickle.dumps(ludb)
+    assert len(payload) < 1000
+    restored = pickle.loads(payload)
+    assert restored.get_1d_signal('7', 'ii').signal_mv.tolist() == [0.005, 0.006]
+
+
+def test_missing_json_and_store(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        LUDB(json_path=str(tmp_path / 'absent.json'), store_path=str(tmp_path / 'store'))
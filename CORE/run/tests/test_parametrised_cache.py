@@ -0,0 +1,225 @@
+import json
+import pickle
+from copy import deepcopy
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from CORE.benchmarks.synthetic import SyntheticExemplarsDataset, SyntheticFormBuilder, synthetic_ecg
+from CORE.datasets_wrappers.form_associated.exemplars_dataset import ExemplarsDataset
+from CORE.datasets_wrappers.form_associated.form_changes import find_form_changes
+from CORE.datasets_wrappers.form_associated.parametrised_cache import FramesCache, form_description, form_fingerprint
+from CORE.datasets_wrappers.form_associated.parametrised_dataset import ParametrisedDataset
+from CORE.datasets_wrappers.third_party_dataset import ThirdPartyDataset
+from CORE.db_dataclasses import Parameter
+from CORE.exeptions import RunPazzleError
+from CORE.run.schema import Schema
+
+
+class SyntheticOuterDataset(ThirdPartyDataset):
+    """Внешний датасет из синтетических сигналов с задаваемым отпечатком."""
+
+    def __init__(self, fingerprint='v1', nan_patient=None):
+        self.fingerprint = fingerprint
+        self.nan_patient = nan_patient
+
+    def get_1d_signal(self, patient_id, lead_name):
+        signal = synthetic_ecg(seed=int(patient_id))[0]
+        if patient_id == self.nan_patient:  # амплитуды этого пациента PC измерят как NaN
+            signal.signal_mv = np.full(len(signal.signal_mv), np.nan)
+        return signal
+
+    def get_patients_ids(self):
+        return ['1', '2']
+
+    def get_fingerprint(self):
+        return self.fingerprint
+
+
+def cache_key(raw, form):
+    cache = FramesCache.for_dataset('cache', raw, form)
+    return cache.key if cache is not None else None
+
+
+def write_dataset(path, shift_t=0.0):
+    data = {}
+    for patient_id in ['1', '2']:
+        beat = synthetic_ecg(seed=int(patient_id))[1][1]
+        data[patient_id] = {'patient_id': patient_id, 'lead_name': 'ii',
+                            'points': {'P': beat + shift_t, 'Q': beat + 0.05, 'R': beat + 0.3}}
+    path.write_text(json.dumps({'meta': {'points': ['P', 'Q', 'R']}, 'data': data}), encoding='utf-8')
+
+
+@pytest.fixture(scope='module')
+def form():
+    return SyntheticFormBuilder().pqr_form()
+
+
+@pytest.fixture
+def dataset_path(tmp_path):
+    path = tmp_path / 'form.json'
+    write_dataset(path)
+    return path
+
+
+def test_frames_reused_from_cache(form, dataset_path, tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    computed = ParametrisedDataset(ExemplarsDataset(str(dataset_path), SyntheticOuterDataset()), form,
+                                   cache_dir=cache_dir)
+    assert len(list((tmp_path / 'cache').iterdir())) == 4  # три таблицы и последняя версия формы
+
+    raw = ExemplarsDataset(str(dataset_path), SyntheticOuterDataset())
+    cached = ParametrisedDataset(raw, form, cache_dir=cache_dir)
+    pd.testing.assert_frame_equal(cached.parameters_frame, computed.parameters_frame)
+    pd.testing.assert_frame_equal(cached.violations_frame, computed.violations_frame)
+    pd.testing.assert_frame_equal(cached.absent_frame, computed.absent_frame)
+    # таблицы взяты из кэша: экземпляры не параметризовались
+    assert not raw.get_exemplar_by_id('1').contains_parameter('ampP')
+
+
+def test_cache_key_follows_form_and_data(form, dataset_path, tmp_path):
+    key = cache_key(ExemplarsDataset(str(dataset_path), SyntheticOuterDataset()), form)
+    assert key == cache_key(ExemplarsDataset(str(dataset_path), SyntheticOuterDataset()), form)
+
+    # другие сигналы внешнего датасета или другая разметка - другой ключ
+    assert key != cache_key(ExemplarsDataset(str(dataset_path), SyntheticOuterDataset('v2')), form)
+    write_dataset(dataset_path, shift_t=0.01)
+    assert key != cache_key(ExemplarsDataset(str(dataset_path), SyntheticOuterDataset()), form)
+
+    # другое значение аргумента HC - другой отпечаток формы
+    fingerprint = form_fingerprint(form)
+    hc = form.HC_PC_objects[-1]
+    old_value = hc.argument_values[0].argument_value
+    hc.argument_values[0].argument_value = '6'
+    try:
+        assert form_fingerprint(form) != fingerprint
+    finally:
+        hc.argument_values[0].argument_value = old_value
+    assert form_fingerprint(form) == fingerprint
+
+    # без отпечатка внешнего датасета ничего не кэшируется
+    raw = ExemplarsDataset(str(dataset_path), SyntheticOuterDataset(fingerprint=None))
+    assert cache_key(raw, form) is None
+    ParametrisedDataset(raw, form, cache_dir=str(tmp_path / 'cache'))
+    assert not (tmp_path / 'cache').exists()
+
+
+def edited_forms(form):
+    """Правки формы P-Q-R: порог HC, привязка PC (затрагивает зависящие от него HC) и новый PC."""
+    threshold = deepcopy(form)
+    threshold.HC_PC_objects[-1].argument_values[0].argument_value = '1.2'
+
+    swapped = deepcopy(form)
+    minus = swapped.HC_PC_objects[3]
+    minus.input_param_values[0].parameter_id, minus.input_param_values[1].parameter_id = \
+        minus.input_param_values[1].parameter_id, minus.input_param_values[0].parameter_id
+
+    added = deepcopy(form)
+    new_param = Parameter(id=300, name='distPR')
+    added.parameters.append(new_param)
+    distance = deepcopy(added.HC_PC_objects[2])
+    distance.id = 1000
+    distance.input_point_values[1].point_id = added.points[2].id
+    distance.output_param_values[0].parameter_id = new_param.id
+    added.HC_PC_objects.insert(3, distance)
+    return threshold, swapped, added
+
+
+def compiled_schema(form):
+    schema = Schema(form)
+    assert schema.compile()
+    return schema
+
+
+def test_form_changes_follow_dependencies(form):
+    threshold, swapped, added = edited_forms(form)
+    description = form_description(form)
+
+    changes = find_form_changes(description, threshold, compiled_schema(threshold))
+    assert changes.pcs == [] and [hc.id for hc in changes.hcs] == [threshold.HC_PC_objects[-1].id]
+
+    changes = find_form_changes(description, swapped, compiled_schema(swapped))
+    assert [pc.id for pc in changes.pcs] == [swapped.HC_PC_objects[3].id] and changes.stale_params == {'diff'}
+    assert [hc.id for hc in changes.hcs] == [swapped.HC_PC_objects[-1].id]  # HC на diff
+
+    changes = find_form_changes(description, added, compiled_schema(added))
+    assert [pc.id for pc in changes.pcs] == [1000] and changes.hcs == []
+
+
+def test_incremental_frames_match_full_parametrisation(form, dataset_path, tmp_path, monkeypatch):
+    cache_dir = str(tmp_path / 'cache')
+    ParametrisedDataset(ExemplarsDataset(str(dataset_path), SyntheticOuterDataset()), form, cache_dir=cache_dir)
+
+    def fill_frames(*args, **kwargs):
+        raise AssertionError("после правки формы таблицы должны пересчитываться по частям")
+
+    for edited in edited_forms(form):
+        full = ParametrisedDataset(ExemplarsDataset(str(dataset_path), SyntheticOuterDataset()), edited)
+        with monkeypatch.context() as patch:
+            patch.setattr(ParametrisedDataset, 'fill_frames', fill_frames)
+            incremental = ParametrisedDataset(ExemplarsDataset(str(dataset_path), SyntheticOuterDataset()), edited,
+                                              cache_dir=cache_dir)
+        pd.testing.assert_frame_equal(incremental.parameters_frame, full.parameters_frame)
+        pd.testing.assert_frame_equal(incremental.violations_frame, full.violations_frame)
+        pd.testing.assert_frame_equal(incremental.absent_frame, full.absent_frame)
+
+
+def test_parallel_frames_match_sequential(form):
+    threshold = edited_forms(form)[0]  # с этим порогом часть экземпляров нарушает HC
+    sequential = ParametrisedDataset(SyntheticExemplarsDataset(n_signals=4), threshold)
+    raw = SyntheticExemplarsDataset(n_signals=4)
+    parallel = ParametrisedDataset(raw, threshold, workers=2)
+
+    assert sequential.violations_frame[sequential.hc_ids].to_numpy().any()
+    pd.testing.assert_frame_equal(parallel.parameters_frame, sequential.parameters_frame)
+    pd.testing.assert_frame_equal(parallel.violations_frame, sequential.violations_frame)
+    # параметры получили копии экземпляров в процессах пула
+    assert not raw.exemplars['0_0'].contains_parameter('ampP')
+
+    # ошибка пазла доходит из процесса пула со всеми полями
+    error = pickle.loads(pickle.dumps(RunPazzleError.missing_input_params(7, ['ampP'])))
+    assert (error.code, error.pazzle_id, error.absent_params) == ('MISSING_INPUT_PARAMS', 7, ['ampP'])
+
+
+
+def test_incremental_frames_keep_measured_nan(form, dataset_path, tmp_path, monkeypatch):
+    swapped = edited_forms(form)[1]  # Minus перезапускается на прежних ampP и ampQ
+
+    def outer():
+        return SyntheticOuterDataset(nan_patient='1')
+
+    cache_dir = str(tmp_path / 'cache')
+    ParametrisedDataset(ExemplarsDataset(str(dataset_path), outer()), form, cache_dir=cache_dir)
+    full = ParametrisedDataset(ExemplarsDataset(str(dataset_path), outer()), swapped)
+    assert np.isnan(full.parameters_frame.loc[0, 'ampP']) and not full.absent_frame.loc[0, 'ampP']
+
+    # измеренный NaN - это значение: PC получает его, как и при полном расчете, а не падает
+    monkeypatch.setattr(ParametrisedDataset, 'fill_frames', lambda *args, **kwargs: pytest.fail("полный пересчет"))
+    incremental = ParametrisedDataset(ExemplarsDataset(str(dataset_path), outer()), swapped, cache_dir=cache_dir)
+    pd.testing.assert_frame_equal(incremental.parameters_frame, full.parameters_frame)
+    pd.testing.assert_frame_equal(incremental.absent_frame, full.absent_frame)
+
+
+def test_incremental_frames_fall_back_on_pazzle_error(form, dataset_path, tmp_path):
+    swapped = edited_forms(form)[1]
+    previous = ParametrisedDataset(ExemplarsDataset(str(dataset_path), SyntheticOuterDataset()), form)
+    old_absent_frame = previous.absent_frame.copy()
+    old_absent_frame.loc[0, 'ampP'] = True
+
+    # отсутствующее значение не дописывается: перезапущенный PC на нем падает, как при полном расчете
+    full = ParametrisedDataset(ExemplarsDataset(str(dataset_path), SyntheticOuterDataset()), swapped)
+    raw = ExemplarsDataset(str(dataset_path), SyntheticOuterDataset())
+    with pytest.raises(RunPazzleError) as error:
+        full.update_frames(raw, swapped, form_description(form), previous.parameters_frame,
+                           previous.violations_frame, old_absent_frame)
+    assert error.value.code == 'MISSING_INPUT_PARAMS'
+    assert not raw.get_exemplar_by_id('1').contains_parameter('ampQ')
+
+    # после такой ошибки таблицы считаются целиком: экземпляры пересчетом по частям не тронуты
+    cache = FramesCache.for_dataset(str(tmp_path / 'cache'), raw, form)
+    cache.save(previous.parameters_frame, previous.violations_frame, old_absent_frame)
+    raw = ExemplarsDataset(str(dataset_path), SyntheticOuterDataset())
+    rebuilt = ParametrisedDataset(raw, swapped, cache_dir=str(tmp_path / 'cache'))
+    pd.testing.assert_frame_equal(rebuilt.parameters_frame, full.parameters_frame)
+    assert raw.get_exemplar_by_id('1').contains_parameter('diff')
@@ -0,0 +1,172 @@
+import json
+
+import numpy as np
+import pytest
+
+from CORE.db_dataclasses import BaseClass, BasePazzle, Track
+from CORE.exeptions import PazzleOutOfSignal
+from CORE.run import Exemplar
+from CORE.run.profiling import EVAL, FORM, STEP, TRACK, RunObserver, RunProfiler, attach_profiler, attach_tracer
+from CORE.run.run_pazzle.classes_registry import classes_registry
+from CORE.signal_1d import Signal
+
+
+# --- Вспомогательные классы ---
+
+
+class OutOfSignalSM:
+    """SM-пазл, которому всегда не хватает сигнала."""
+
+    def run(self, signal: Signal, left_t=None, right_t=None) -> Signal:
+        raise PazzleOutOfSignal("нужно больше сигнала")
+
+
+class RecordingObserver(RunObserver):
+    """Записывает последовательность начал и концов запусков."""
+
+    def __init__(self):
+        self.events = []
+
+    def begin(self, kind, obj_id, name):
+        self.events.append(('B', kind, obj_id))
+
+    def end(self, kind, obj_id, name, result, error):
+        self.events.append(('E', kind, obj_id))
+
+
+def pazzle(pazzle_id, class_name):
+    return BasePazzle(id=pazzle_id, class_ref=BaseClass(name=class_name))
+
+
+# --- Фикстуры ---
+
+
+@pytest.fixture
+def rform(make_rform):
+    """Шаг из двух треков: трек 1 (PS 3) и трек 4, SM 5 которого вылетает за сигнал."""
+    classes_registry.register("OutOfSignalSM", OutOfSignalSM)
+    return make_rform([Track(id=1, SMs=[], PSs=[pazzle(3, "GlobalMaxSelector")]),
+                       Track(id=4, SMs=[pazzle(5, "OutOfSignalSM")], PSs=[pazzle(6, "GlobalMaxSelector")])],
+                      form_id=7)
+
+
+@pytest.fixture
+def signal():
+    signal_mv = np.zeros(1000)
+    signal_mv[500] = 1.0
+    return Signal(signal_mv=signal_mv, frequency=500)
+
+
+# --- Тесты ---
+
+
+def test_no_observer_by_default(rform, signal):
+    """Без наблюдателя run-слой ничего не замеряет и к результатам ничего не прикрепляет."""
+    assert rform.observer is None
+    assert rform.rsteps[0].r_tracks[0].rPS_objects[0].observer is None
+    rform.rsteps[0].set_step_as_first(1.0)
+    step_res, _ = rform.rsteps[0].run(Exemplar(signal=signal))
+    assert step_res.profile is None
+
+
+def test_profiler_counts_calls_and_errors(rform, signal):
+    profiler = attach_profiler(rform)
+    pool = rform.run(signal, seminal_point=1.0)
+    rform.run(signal, seminal_point=1.0)
+
+    assert [ex.get_point_coord('R') for ex in pool] == [1.0]
+    assert profiler.get_stats(FORM, 7).calls == 2
+    assert profiler.get_stats(STEP, 0).calls == 2
+    assert profiler.get_stats(EVAL, 0).calls == 2
+    assert profiler.get_stats(STEP, 0).output_size == 2  # по одному дочернему экземпляру за запуск
+
+    ps_stats = profiler.get_stats('PS', 3)
+    assert ps_stats.calls == 2 and ps_stats.name == 'GlobalMaxSelector' and ps_stats.output_size == 2
+    # PS трека, SM которого вылетел за сигнал, не запускался
+    assert profiler.get_stats('PS', 6) is None
+    assert profiler.get_stats('SM', 5).errors == {'PazzleOutOfSignal': 2}
+    assert profiler.get_stats(TRACK, 4).errors == {'PazzleOutOfSignal': 2}
+
+    # время вложенных запусков не больше времени объемлющего
+    form_stats = profiler.get_stats(FORM, 7)
+    assert 0 <= form_stats.self_s <= form_stats.total_s
+    assert profiler.get_stats(STEP, 0).total_s <= form_stats.total_s
+
+    summary = profiler.summary()
+    assert 'GlobalMaxSelector' in summary and 'PazzleOutOfSignal: 2' in summary
+
+
+def test_profiler_tracks_without_id_not_mixed(make_rform, signal):
+    """Треки не из базы (id=None) получают в статистике отдельные записи."""
+    rform = make_rform([Track(id=None, SMs=[], PSs=[pazzle(None, name)])
+                        for name in ("GlobalMaxSelector", "GlobalMinSelector")])
+    profiler = attach_profiler(rform)
+    rform.run(signal, seminal_point=1.0)
+
+    track_stats = [stats for stats in profiler.stats.values() if stats.kind == TRACK]
+    assert len(track_stats) == 2 and all(stats.calls == 1 for stats in track_stats)
+
+
+def test_profile_attached_to_step_and_track_results(rform, signal):
+    attach_profiler(rform)
+    rstep = rform.rsteps[0]
+    rstep.set_step_as_first(1.0)
+    step_res, _ = rstep.run(Exemplar(signal=signal))
+
+    assert step_res.profile.kind == STEP
+    # трек с вылетевшим SM в профиль шага попал (с ошибкой), но TrackRes у него нет
+    assert [(span.obj_id, span.error) for span in step_res.profile.get_children_by_kind(TRACK)] == \
+           [(1, None), (4, 'PazzleOutOfSignal')]
+    track_res, = step_res.tracks_results
+    assert track_res.profile.obj_id == 1
+    assert [span.obj_id for span in track_res.profile.get_children_by_kind('PS')] == [3]
+    assert track_res.profile.elapsed_s <= step_res.profile.elapsed_s
+    assert 'track 4' in step_res.profile.format() and 'PazzleOutOfSignal' in step_res.profile.format()
+
+
+def test_set_observer_none_detaches(rform, signal):
+    observer = RecordingObserver()
+    rform.set_observer(observer)
+    rform.run(signal, seminal_point=1.0)
+    assert observer.events[0] == ('B', FORM, 7) and observer.events[-1] == ('E', FORM, 7)
+    assert ('B', 'SM', 5) in observer.events
+
+    rform.set_observer(None)
+    observer.events.clear()
+    rform.run(signal, seminal_point=1.0)
+    assert observer.events == []
+
+
+def test_profiler_reset():
+    profiler = RunProfiler()
+    profiler.observe(EVAL, 0, 'f', lambda: [1, 2])
+    assert profiler.get_stats(EVAL, 0).output_size == 2
+    profiler.reset()
+    assert profiler.stats == {}
+
+
+def test_chrome_tracer_nested_spans(rform, signal, tmp_path):
+    tracer = attach_tracer(rform)
+    rform.run(signal, seminal_point=1.0)
+
+    # события B/E правильно вложены, время не убывает
+    stack = []
+    for event in tracer.events:
+        if event['ph'] == 'B':
+            stack.append(event['cat'])
+        else:
+            stack.pop()
+    assert stack == []
+    timestamps = [event['ts'] for event in tracer.events]
+    assert timestamps == sorted(timestamps)
+
+    begins = [event['name'] for event in tracer.events if event['ph'] == 'B']
+    assert begins[:4] == ['form 7 R', 'pool 0 R', 'step 0 R', 'track 1']
+    assert 'parametrise 7 R' in begins and 'conditions 7 R' in begins
+    assert 'eval 0 SumDistsEval' in begins
+    errors = [event['args']['error'] for event in tracer.events if 'error' in event.get('args', {})]
+    assert errors[0].startswith('PazzleOutOfSignal')
+
+    path = tmp_path / 'trace.json'
+    tracer.save(str(path))
+    assert json.loads(path.read_text(encoding='utf-8'))['traceEvents'] == tracer.events
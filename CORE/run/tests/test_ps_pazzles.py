@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from CORE.pazzles_lib.PS.global_max_selector import GlobalMaxSelector
+from CORE.pazzles_lib.PS.global_min_selector import GlobalMinSelector
+from CORE.pazzles_lib.PS.local_maxs_selector import LocalMaxsSelector
+from CORE.pazzles_lib.PS.local_mins_selector import LocalMinsSelector
+from CORE.pazzles_lib.PS.top_best_interpolation_points import TopBestInterpolationPoints
+from CORE.signal_1d import Signal
+
+
+def reference_errors(x, y):
+    """Прежняя реализация TopBestInterpolationPoints: прямой перебор за O(n^2)."""
+    points = list(zip(x, y))
+    n = len(points)
+
+    def interpolate(x_, a, b):
+        return a[1] + (b[1] - a[1]) * (x_ - a[0]) / (b[0] - a[0])
+
+    errors = []
+    for i in range(n):
+        sum_error = 0.0
+        for (px, py) in points[1:i]:
+            sum_error += (py - interpolate(px, points[1], points[i])) ** 2
+        for (px, py) in points[i + 1:n]:
+            sum_error += (py - interpolate(px, points[i], points[n - 1])) ** 2
+        errors.append(sum_error)
+    return np.array(errors)
+
+
+@pytest.fixture
+def signal():
+    """Зашумленный "зубец" длительностью 1 секунда при 500 Гц."""
+    rng = np.random.default_rng(1)
+    t = np.arange(500) / 500
+    return Signal(signal_mv=np.exp(-((t - 0.4) / 0.05) ** 2) + 0.05 * rng.standard_normal(500), frequency=500)
+
+
+@pytest.mark.parametrize("n", [1, 2, 3, 4, 50])
+def test_errors_match_reference(n):
+    rng = np.random.default_rng(n)
+    x = 10.0 + np.arange(n) / 500
+    y = rng.standard_normal(n)
+
+    errors = TopBestInterpolationPoints._interpolation_errors(x, y)
+
+    assert np.allclose(errors, reference_errors(x, y), rtol=1e-9, atol=1e-12)
+
+
+def test_run_matches_reference(signal):
+    interval = signal.get_fragment(0.2, 0.6)
+    expected = interval.time[np.argsort(reference_errors(interval.time, interval.signal_mv), kind='stable')[:3]]
+
+    assert TopBestInterpolationPoints(N=3).run(signal, left_t=0.2, right_t=0.6) == list(expected)
+
+
+def test_top_n_ties_ordered_by_index():
+    errors = np.array([3.0, 1.0, 2.0, 1.0, 1.0, 0.5])
+    assert list(TopBestInterpolationPoints._top_n_indices(errors, 3)) == [5, 1, 3]
+    assert list(TopBestInterpolationPoints._top_n_indices(errors, 10)) == [5, 1, 3, 4, 2, 0]
+    assert len(TopBestInterpolationPoints._top_n_indices(errors, 0)) == 0
+
+
+def test_global_extremums_with_ties():
+    signal = Signal(signal_mv=[0.0, 2.0, 1.0, 2.0, -1.0, -1.0, 0.5], frequency=2)
+
+    assert GlobalMaxSelector().run(signal) == [0.5, 1.5]
+    assert GlobalMinSelector().run(signal) == [2.0, 2.5]
+    assert GlobalMaxSelector().run(signal, left_t=1.0, right_t=3.0) == [1.5]
+
+
+@pytest.mark.parametrize("ps, values", [(GlobalMaxSelector(), max), (GlobalMinSelector(), min)])
+def test_global_extremum_matches_list_scan(signal, ps, values):
+    interval = signal.get_fragment(0.1, 0.7)
+    expected = [t for t, x in zip(interval.time, interval.signal_mv) if x == values(interval.signal_mv)]
+    assert ps.run(signal, left_t=0.1, right_t=0.7) == expected
+
+
+def test_local_extremums_in_interval(signal):
+    maxs = LocalMaxsSelector().run(signal, left_t=0.3, right_t=0.5)
+    mins = LocalMinsSelector().run(signal, left_t=0.3, right_t=0.5)
+
+    assert maxs and mins
+    assert all(0.3 <= t <= 0.5 for t in maxs + mins)
+    assert all(isinstance(t, float) for t in maxs + mins)
@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from CORE.db_dataclasses import BaseClass, BasePazzle, Track
+from CORE.run import Exemplar
+from CORE.run.run_pazzle.classes_registry import classes_registry
+from CORE.signal_1d import Signal
+
+
+# --- Вспомогательные классы ---
+
+
+class CountingScaleSM:
+    """SM-пазл, считающий свои запуски: умножает сигнал в интервале на 2."""
+    calls = 0
+
+    def run(self, signal: Signal, left_t=None, right_t=None) -> Signal:
+        CountingScaleSM.calls += 1
+        left_idx, right_idx = signal.get_window_indices(left_t, right_t)
+        return signal.patched(left_idx, 2 * signal.signal_mv[left_idx:right_idx])
+
+
+# --- Фикстуры ---
+
+
+@pytest.fixture
+def rform(make_rform):
+    classes_registry.register("CountingScaleSM", CountingScaleSM)
+    CountingScaleSM.calls = 0
+    return make_rform([Track(id=1, SMs=[BasePazzle(id=2, class_ref=BaseClass(name="CountingScaleSM"))],
+                             PSs=[BasePazzle(id=3, class_ref=BaseClass(name="GlobalMaxSelector"))])])
+
+
+@pytest.fixture
+def record():
+    """10 секунд, "комплекс" каждые 0.8 с"""
+    signal_mv = np.zeros(5000)
+    peaks = np.arange(200, 4800, 400)
+    signal_mv[peaks] = 1.0
+    return Signal(signal_mv=signal_mv, frequency=500), peaks / 500
+
+
+def coords(pool):
+    return [(ex.get_point_coord('R'), ex.evaluation_result) for ex in pool]
+
+
+# --- Тесты ---
+
+
+def test_run_many_matches_run(rform, record):
+    signal, peaks = record
+    seminal_points = (peaks + 0.03).tolist()
+
+    pools = rform.run_many(signal, seminal_points)
+
+    assert [coords(pool) for pool in pools] == [coords(rform.run(signal, p)) for p in seminal_points]
+    assert [pool[0] for pool in map(coords, pools)] == [(p, 0.0) for p in peaks.tolist()]
+
+
+def test_run_many_sm_on_whole_signal(rform, record):
+    signal, peaks = record
+
+    pools = rform.run_many(signal, (peaks - 0.02).tolist(), sm_on_whole_signal=True)
+
+    assert CountingScaleSM.calls == 1  # SM трека посчитан один раз на всю запись
+    assert [coords(pool)[0][0] for pool in pools] == peaks.tolist()
+
+
+def test_lean_run_matches_full(rform, record):
+    """Без отладочных результатов экземпляры те же, а StepRes не создается."""
+    signal, peaks = record
+    seminal_points = (peaks + 0.03).tolist()
+    assert rform.lean
+
+    lean_pools = [coords(rform.run(signal, p)) for p in seminal_points]
+    rform.lean = False
+    assert [coords(rform.run(signal, p)) for p in seminal_points] == lean_pools
+
+    rstep = rform.rsteps[0]
+    rstep.set_step_as_first(seminal_points[0])
+    step_res, exemplars = rstep.run(Exemplar(signal=signal), lean=True)
+    full_step_res, full_exemplars = rstep.run(Exemplar(signal=signal))
+    assert step_res is None
+    assert [ex.get_point_coord('R') for ex in exemplars] == [ex.get_point_coord('R') for ex in full_exemplars]
+
+    track = rstep.r_tracks[0]
+    left_t, right_t = full_step_res.left_coord, full_step_res.right_coord
+    assert track.find_points(signal, left_t, right_t) == track.run(signal, left_t, right_t).to_uniq_coords()
@@ -0,0 +1,101 @@
+from math import sin
+
+import numpy as np
+import pytest
+
+from CORE.signal_1d import Signal
+
+
+@pytest.fixture
+def signal():
+    """Синусоида из 80 отсчетов с частотой 2 Гц (длительность 39.5 секунд)."""
+    return Signal(signal_mv=[sin(i) for i in range(80)], frequency=2)
+
+
+def test_time_is_cached(signal):
+    assert signal.time is signal.time
+    assert np.allclose(signal.time, [i / 2 for i in range(80)])
+
+
+def test_get_fragment_bounds_inclusive(signal):
+    fragment = signal.get_fragment(start_time=20.0, end_time=22.5)
+    assert list(fragment.time) == [20.0, 20.5, 21.0, 21.5, 22.0, 22.5]
+    assert list(fragment.signal_mv) == [sin(i) for i in range(40, 46)]
+    assert list(fragment._ticks) == list(range(40, 46))
+
+
+def test_get_fragment_matches_linear_scan(signal):
+    # Результат бинарного поиска границ совпадает с полным перебором отсчетов
+    for start, end in [(0.0, 0.1), (0.3, 7.7), (10.0, 39.5), (39.4, 100.0)]:
+        fragment = signal.get_fragment(start, end)
+        expected = [i for i, t in enumerate(signal.time) if start <= t <= end]
+        assert list(fragment._ticks) == expected
+
+
+def test_get_fragment_is_view(signal):
+    fragment = signal.get_fragment(start_time=5.0, end_time=10.0)
+    assert np.shares_memory(fragment.signal_mv, signal.signal_mv)
+    assert np.shares_memory(fragment.time, signal.time)
+
+
+def test_get_fragment_of_fragment(signal):
+    fragment = signal.get_fragment(start_time=5.0, end_time=10.0)
+    sub = fragment.get_fragment(start_time=6.0, end_time=7.0)
+    assert list(sub.time) == [6.0, 6.5, 7.0]
+
+
+def test_get_fragment_invalid(signal):
+    with pytest.raises(ValueError, match="Некорректные временные границы"):
+        signal.get_fragment(start_time=5.0, end_time=5.0)
+    with pytest.raises(ValueError, match="не содержит данных"):
+        signal.get_fragment(start_time=50.0, end_time=60.0)
+
+
+def test_signal_is_readonly(signal):
+    with pytest.raises(ValueError):
+        signal.signal_mv[0] = 1.0
+
+
+def test_input_array_not_affected():
+    raw = np.zeros(10)
+    Signal(signal_mv=raw)
+    raw[0] = 1.0  # исходный массив вызывающего кода остается изменяемым
+    assert raw.flags.writeable
+
+
+def test_amplitude_in_moment(signal):
+    assert signal.get_amplplitude_in_moment(10.2) == sin(20)
+    assert signal.get_amplplitude_in_moment(10.3) == sin(21)
+    assert signal.get_amplplitude_in_moment(-1.0) is None
+    assert signal.is_moment_in_signal(39.5)
+    assert not signal.is_moment_in_signal(39.6)
+
+
+def test_cropped_with_padding(signal):
+    fragment = signal.get_cropped_with_padding(coord_left=10.0, coord_right=15.0, padding_percent=20)
+    assert fragment.time[0] == 9.5
+    assert fragment.time[-1] == 15.5
+    assert signal.get_duration() == 39.5
+
+
+def test_window_indices(signal):
+    assert signal.get_window_indices(None, None) == (0, 80)
+    assert signal.get_window_indices(10.0, 15.2) == (20, 30)
+    assert signal.get_window_indices(-3.0, 100.0) == (0, 80)
+
+
+def test_window_indices_of_fragment(signal):
+    # Индексы считаются от первого отсчета фрагмента, а не от начала записи
+    fragment = signal.get_fragment(start_time=10.0, end_time=20.0)
+    assert fragment.get_window_indices(12.0, 13.0) == (4, 6)
+
+
+def test_patched_keeps_source(signal):
+    patched = signal.patched(10, np.ones(5))
+    assert list(patched.signal_mv[10:15]) == [1.0] * 5
+    assert patched.signal_mv[9] == signal.signal_mv[9]
+    assert patched.signal_mv[15] == signal.signal_mv[15]
+    assert signal.signal_mv[10] == sin(10)  # исходный сигнал не изменился
+    assert patched.time is signal.time
+    with pytest.raises(ValueError):
+        patched.signal_mv[0] = 1.0
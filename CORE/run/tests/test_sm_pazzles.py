@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from CORE.pazzles_lib.SM.frequency_remover import FrequencyFilter
+from CORE.pazzles_lib.SM.gauss_smooth import GaussianSmooth
+from CORE.signal_1d import Signal
+
+
+@pytest.fixture
+def signal():
+    """Зашумленная синусоида длительностью 2 секунды при 500 Гц."""
+    rng = np.random.default_rng(0)
+    t = np.arange(1000) / 500
+    return Signal(signal_mv=np.sin(2 * np.pi * 3 * t) + 0.1 * rng.standard_normal(1000), frequency=500)
+
+
+@pytest.mark.parametrize("sm", [GaussianSmooth(sigma=2.0, kernel_size_t=0.03),
+                                FrequencyFilter(cutoff_freq=40.0, filter_type='lowpass')])
+def test_sm_changes_only_window(signal, sm):
+    original = signal.signal_mv.copy()
+
+    res = sm.run(signal, left_t=0.5, right_t=1.0)
+
+    assert len(res) == len(signal)
+    assert np.array_equal(signal.signal_mv, original)  # входной сигнал не изменился
+    assert np.array_equal(res.signal_mv[:250], original[:250])
+    assert np.array_equal(res.signal_mv[500:], original[500:])
+    assert not np.array_equal(res.signal_mv[250:500], original[250:500])
+
+
+def test_gauss_on_fragment_uses_fragment_window(signal):
+    fragment = signal.get_fragment(start_time=0.4, end_time=1.2)
+
+    res_fragment = GaussianSmooth(sigma=2.0, kernel_size_t=0.03).run(fragment, left_t=0.5, right_t=1.0)
+    res_full = GaussianSmooth(sigma=2.0, kernel_size_t=0.03).run(signal, left_t=0.5, right_t=1.0)
+
+    assert np.allclose(res_fragment.signal_mv, res_full.get_fragment(0.4, 1.2).signal_mv)
+
+
+def test_sm_returns_input_when_nothing_to_do(signal):
+    assert GaussianSmooth(kernel_size_t=5.0).run(signal, left_t=0.5, right_t=1.0) is signal
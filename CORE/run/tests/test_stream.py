@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from CORE.db_dataclasses import BaseClass, BasePazzle, Track
+from CORE.run.stream import PeaksSeminalPointsFinder, StreamingRecognizer, get_form_extent
+from CORE.signal_1d import Signal
+
+
+# --- Вспомогательные классы ---
+
+
+def pazzle(pazzle_id, class_name):
+    return BasePazzle(id=pazzle_id, class_ref=BaseClass(name=class_name))
+
+
+# --- Фикстуры ---
+
+
+@pytest.fixture
+def rform(make_rform):
+    # R - максимум около стартовой точки, S - минимум в 0.1 с правее R
+    return make_rform([Track(id=1, SMs=[], PSs=[pazzle(3, "GlobalMaxSelector")])],
+                      [Track(id=2, SMs=[], PSs=[pazzle(4, "GlobalMinSelector")])], padding_t=0.05)
+
+
+@pytest.fixture
+def record():
+    """20 секунд, "комплекс" (пик и впадина через 0.04 с) каждые 0.7 с"""
+    rng = np.random.default_rng(0)
+    t = np.arange(10000) / 500
+    signal_mv = 0.005 * rng.standard_normal(len(t))
+    peaks = np.arange(150, 9900, 350)
+    for peak in peaks / 500:
+        signal_mv += np.exp(-((t - peak) / 0.012) ** 2) - 0.4 * np.exp(-((t - peak - 0.04) / 0.01) ** 2)
+    return signal_mv, peaks
+
+
+def best_points(pool):
+    best = pool.get_top_n_exemplars_sorted(1)[0]
+    return best.get_point_coord('R'), best.get_point_coord('S')
+
+
+def r_points(results):
+    return [best_points(res.pool)[0] for res in results]
+
+
+# --- Тесты ---
+
+
+def test_form_extent(rform):
+    assert get_form_extent(rform.rsteps) == pytest.approx((0.05, 0.15))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 37, 500, 10000])
+def test_stream_matches_whole_record(rform, record, chunk_size):
+    signal_mv, peaks = record
+    recognizer = StreamingRecognizer(rform, frequency=500)
+    chunks = (signal_mv[i:i + chunk_size] for i in range(0, len(signal_mv), chunk_size))
+
+    results = list(recognizer.run(chunks))
+
+    assert r_points(results) == (peaks / 500).tolist()
+    # те же экземпляры, что и на всей записи целиком
+    whole = Signal(signal_mv=signal_mv, frequency=500)
+    expected = rform.run_many(whole, [res.seminal_point for res in results])
+    assert [best_points(res.pool) for res in results] == [best_points(pool) for pool in expected]
+    assert recognizer.capacity < 1000  # память не зависит от длины записи
+
+
+def test_emitted_when_right_part_arrived(rform, record):
+    signal_mv, peaks = record
+    recognizer = StreamingRecognizer(rform, frequency=500, seminal_points_finder=PeaksSeminalPointsFinder())
+
+    assert recognizer.feed(signal_mv[:peaks[0] + 50]) == []  # интервал поиска S еще не пришел целиком
+    results = recognizer.feed(signal_mv[peaks[0] + 50:peaks[1]])
+    assert r_points(results) == [peaks[0] / 500]
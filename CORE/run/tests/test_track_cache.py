@@ -0,0 +1,129 @@
+from typing import List
+
+import pytest
+
+from CORE.db_dataclasses import BasePazzle, BaseClass, Track
+from CORE.run.r_track import RTrack
+from CORE.run.run_pazzle.classes_registry import classes_registry
+from CORE.run.track_cache import TrackCache
+from CORE.signal_1d import Signal
+
+
+# --- Вспомогательные классы ---
+
+
+class CountingSM:
+    """SM-пазл, считающий свои запуски: сдвигает сигнал на 1 мВ."""
+    calls = 0
+
+    def run(self, signal: Signal, left_t: float, right_t: float) -> Signal:
+        CountingSM.calls += 1
+        left_idx, right_idx = signal.get_window_indices(left_t, right_t)
+        return signal.patched(left_idx, signal.signal_mv[left_idx:right_idx] + 1.0)
+
+
+class CountingPS:
+    """PS-пазл, считающий свои запуски: возвращает середину интервала."""
+    calls = 0
+
+    def run(self, signal: Signal, left_t: float, right_t: float) -> List[float]:
+        CountingPS.calls += 1
+        return [(left_t + right_t) / 2]
+
+
+class LeftPS:
+    """PS-пазл, возвращающий левую границу интервала."""
+
+    def run(self, signal: Signal, left_t: float, right_t: float) -> List[float]:
+        return [left_t]
+
+
+# --- Фикстуры ---
+
+
+@pytest.fixture
+def r_track():
+    classes_registry.register("CountingSM", CountingSM)
+    classes_registry.register("CountingPS", CountingPS)
+    classes_registry.register("LeftPS", LeftPS)
+    CountingSM.calls = 0
+    CountingPS.calls = 0
+    track = Track(id=3,
+                  SMs=[BasePazzle(id=1, class_ref=BaseClass(name="CountingSM")),
+                       BasePazzle(id=2, class_ref=BaseClass(name="CountingSM"))],
+                  PSs=[BasePazzle(id=3, class_ref=BaseClass(name="CountingPS"))])
+    return RTrack(track)
+
+
+@pytest.fixture
+def signal():
+    return Signal(signal_mv=[0.0] * 1000, frequency=500)
+
+
+# --- Тесты ---
+
+
+def test_same_interval_computed_once(r_track, signal):
+    cache = TrackCache()
+
+    res1 = r_track.run(signal, left_t=0.5, right_t=1.0, cache=cache)
+    res2 = r_track.run(signal, left_t=0.5, right_t=1.0, cache=cache)
+
+    assert CountingSM.calls == 2  # по разу на каждый SM трека
+    assert CountingPS.calls == 1
+    assert res1.to_uniq_coords() == res2.to_uniq_coords() == [0.75]
+    assert res2.sm_res_objs[-1].result_signal.signal_mv[300] == 2.0
+    assert cache.hits == 3
+
+
+def test_other_interval_or_signal_recomputed(r_track, signal):
+    cache = TrackCache()
+
+    r_track.run(signal, left_t=0.5, right_t=1.0, cache=cache)
+    r_track.run(signal, left_t=0.6, right_t=1.0, cache=cache)
+    r_track.run(Signal(signal_mv=[0.0] * 1000, frequency=500), left_t=0.5, right_t=1.0, cache=cache)
+
+    assert CountingPS.calls == 3
+
+
+def test_cached_points_not_shared(r_track, signal):
+    # Результаты PS в TrackRes - копии, правка одного результата не портит кэш
+    cache = TrackCache()
+    res1 = r_track.run(signal, left_t=0.5, right_t=1.0, cache=cache)
+    res1.ps_res_objs[0].res_coords.append(0.9)
+
+    res2 = r_track.run(signal, left_t=0.5, right_t=1.0, cache=cache)
+    assert res2.ps_res_objs[0].res_coords == [0.75]
+
+
+def test_without_cache(r_track, signal):
+    r_track.run(signal, left_t=0.5, right_t=1.0)
+    r_track.run(signal, left_t=0.5, right_t=1.0)
+    assert CountingPS.calls == 2
+
+
+def test_tracks_without_id_not_mixed(signal):
+    # треки не из базы (id=None) различаются в кэше как объекты
+    tracks = [RTrack(Track(id=None, SMs=[], PSs=[BasePazzle(id=None, class_ref=BaseClass(name=name))]))
+              for name in ("CountingPS", "LeftPS")]
+    cache = TrackCache()
+
+    assert [track.find_points(signal, 0.5, 1.0, cache=cache) for track in tracks] == [[0.75], [0.5]]
+
+
+def test_lru_eviction(r_track, signal):
+    cache = TrackCache(max_size=2)
+    keys = [TrackCache.make_key('PS', signal, r_track, 0, float(i), float(i + 1)) for i in range(3)]
+    cache.put(keys[0], signal, [0.0])
+    cache.put(keys[1], signal, [1.0])
+    assert cache.get(keys[0], signal) == [0.0]  # keys[0] стал самым свежим
+    cache.put(keys[2], signal, [2.0])
+
+    assert len(cache) == 2
+    assert cache.get(keys[1], signal) is None
+    assert cache.get(keys[0], signal) == [0.0]
+
+
+def test_invalid_size():
+    with pytest.raises(ValueError):
+        TrackCache(max_size=0)
@@ -0,0 +1,68 @@
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+from CORE import Signal
+
+
+class TrackCache:
+    """
+    LRU-кэш результатов SM и PS треков в пределах одного запуска формы.
+
+    Соседние экземпляры пула часто получают на шаге один и тот же интервал поиска
+    (например, отступы от общего центра или от общей точки), и тогда треки на них
+    дают в точности одинаковые результаты. Ключ кэша - (тип пазла, сигнал, трек,
+    номер пазла в треке, left_t, right_t). Сигнал в ключе учитывается по идентичности,
+    и кэш держит ссылку на него, чтобы идентичность не могла перейти к другому объекту.
+    Трек тоже учитывается по идентичности (id трека в базе может быть None), его держит запускаемая форма.
+    Размер ограничен max_size записями, при переполнении вытесняются давно не использованные.
+    """
+
+    def __init__(self, max_size: int = 256):
+        """
+        :param max_size: максимальное число хранимых результатов
+        """
+        if max_size < 1:
+            raise ValueError("Размер кэша треков должен быть положительным")
+        self.max_size = max_size
+        self._entries: OrderedDict = OrderedDict()  # ключ -> (сигнал, результат)
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(kind: str, signal: Signal, track: Any, index: int, left_t: float, right_t: float) -> Hashable:
+        """
+        :param kind: 'SM' или 'PS'
+        :param signal: исходный сигнал, на котором запускается трек
+        :param track: запускаемый трек (RTrack)
+        :param index: номер пазла в треке (для SM важен порядок: результат зависит от всех предыдущих SM)
+        :param left_t: левая граница интервала
+        :param right_t: правая граница интервала
+        """
+        return kind, id(signal), id(track), index, left_t, right_t
+
+    def get(self, key: Hashable, signal: Signal) -> Optional[Any]:
+        """
+        :return: сохраненный результат или None, если его нет
+        """
+        entry = self._entries.get(key)
+        if entry is None or entry[0] is not signal:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: Hashable, signal: Signal, value: Any) -> None:
+        self._entries[key] = (signal, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
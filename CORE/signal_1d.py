@@ -1,42 +1,109 @@
-from typing import List, Optional
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
 
 from CORE.utils import find_closest_sorted
 
 
+def _readonly(array: np.ndarray) -> np.ndarray:
+    """Возвращает представление массива, защищенное от записи (исходный массив не трогаем)"""
+    view = array.view()
+    view.flags.writeable = False
+    return view
+
+
 class Signal:
-    """  Представляет одномерный дискретный сигнал с временной разметкой. """
-    def __init__(self, signal_mv:List[float], ticks:Optional[List[int]]=None, frequency:int=500):
+    """  Представляет одномерный дискретный сигнал с временной разметкой.
+
+    Значения и номера отсчетов хранятся в непрерывных numpy-массивах, временная ось
+    вычисляется один раз при первом обращении и далее берется из кэша.
+    Сигнал неизменяемый: массивы открыты только на чтение, а фрагменты (get_fragment,
+    get_cropped_with_padding) разделяют память с исходным сигналом, ничего не копируя.
+    Номера отсчетов должны идти по возрастанию.
+    """
+    def __init__(self, signal_mv: Sequence[float], ticks: Optional[Sequence[int]] = None, frequency: int = 500):
         """
         :param signal_mv: Значения сигнала в милливольтах
         :param ticks: Номера отсчетов (тиков) сигнала
         :param frequency: Частота дискретизации в Герцах (количество отсчетов в секунду)
         """
-        self.signal_mv = signal_mv
-        self._ticks = ticks if ticks is not None else list(range(len(signal_mv)))
+        self.signal_mv: np.ndarray = _readonly(np.asarray(signal_mv, dtype=np.float64))
+        if ticks is None:
+            ticks = np.arange(len(self.signal_mv), dtype=np.int64)
+        self._ticks: np.ndarray = _readonly(np.asarray(ticks, dtype=np.int64))
         self.frequency = frequency
 
+        self._time: Optional[np.ndarray] = None  # кэш временной оси, см. time
+
+    @classmethod
+    def _from_arrays(cls, signal_mv: np.ndarray, ticks: np.ndarray, frequency: int,
+                     time: Optional[np.ndarray] = None) -> 'Signal':
+        """Собирает сигнал из уже готовых массивов без копирования и проверок"""
+        signal = cls.__new__(cls)
+        signal.signal_mv = signal_mv
+        signal._ticks = ticks
+        signal.frequency = frequency
+        signal._time = time
+        return signal
 
     @property
-    def time(self)->List[float]:
+    def time(self) -> np.ndarray:
         """Возвращает временные метки в секундах, рассчитанные на основе частоты дискретизации."""
-        time = [tick/self.frequency for tick in self._ticks]
-        return time
+        if self._time is None:
+            self._time = _readonly(self._ticks / self.frequency)
+        return self._time
 
     def get_fragment(self, start_time: float, end_time: float) -> 'Signal':
-        """Возвращает фрагмент сигнала в заданном временном интервале."""
+        """Возвращает фрагмент сигнала в заданном временном интервале (границы включаются).
+        Фрагмент разделяет память с исходным сигналом."""
         if not 0 <= start_time < end_time:
             raise ValueError("Некорректные временные границы")
 
-        indices = [i for i, t in enumerate(self.time) if start_time <= t <= end_time]
+        time = self.time
+        left = int(np.searchsorted(time, start_time, side='left'))
+        right = int(np.searchsorted(time, end_time, side='right'))
 
-        if not indices:
+        if left >= right:
             raise ValueError(f"Интервал [{start_time}, {end_time}) не содержит данных")
 
-        return Signal(
-            signal_mv=[self.signal_mv[i] for i in indices],
-            ticks=[self._ticks[i] for i in indices],
-            frequency=self.frequency
-        )
+        return Signal._from_arrays(signal_mv=self.signal_mv[left:right],
+                                   ticks=self._ticks[left:right],
+                                   frequency=self.frequency,
+                                   time=time[left:right])
+
+    def get_window_indices(self, left_t: Optional[float] = None, right_t: Optional[float] = None) -> Tuple[int, int]:
+        """
+        Переводит границы интервала из секунд в индексы массива signal_mv (отсчет right_idx не включается).
+        Индекс считается как int(t * frequency) относительно первого отсчета сигнала
+        и обрезается по границам сигнала.
+
+        :param left_t: левая граница в секундах (если None - с начала)
+        :param right_t: правая граница в секундах (если None - до конца)
+        :return: (left_idx, right_idx); если интервал пуст, то left_idx >= right_idx
+        """
+        first_tick = int(self._ticks[0]) if len(self._ticks) else 0
+
+        left_idx = int(left_t * self.frequency) - first_tick if left_t is not None else 0
+        right_idx = int(right_t * self.frequency) - first_tick if right_t is not None else len(self.signal_mv)
+
+        return max(0, left_idx), min(len(self.signal_mv), right_idx)
+
+    def patched(self, left_idx: int, window_mv: Sequence[float]) -> 'Signal':
+        """
+        Возвращает новый сигнал, который совпадает с данным всюду, кроме окна
+        [left_idx, left_idx + len(window_mv)), куда записаны значения window_mv.
+        Так SM-пазлы изменяют сигнал, не трогая исходный: временная ось и номера отсчетов
+        разделяются с исходным сигналом, копируются только значения.
+
+        :param left_idx: индекс начала окна в signal_mv
+        :param window_mv: новые значения сигнала в окне
+        :return: новый сигнал той же длины
+        """
+        signal_mv = self.signal_mv.copy()
+        signal_mv[left_idx:left_idx + len(window_mv)] = window_mv
+        signal_mv.flags.writeable = False
+        return Signal._from_arrays(signal_mv=signal_mv, ticks=self._ticks, frequency=self.frequency,
+                                   time=self.time)
 
     def is_moment_in_signal(self, t: float) -> bool:
         """
@@ -44,10 +111,11 @@ class Signal:
         :param t (float) Момент времени в секундах
         :return: bool  True, если момент t находится в диапазоне time, иначе False
         """
-        if not self.time:
+        if len(self._ticks) == 0:
             return False
 
-        return self.time[0] <= t <= self.time[-1]
+        time = self.time
+        return bool(time[0] <= t <= time[-1])
 
 
     def get_amplplitude_in_moment(self, time_moment_sec) -> Optional[float]:
@@ -60,7 +128,7 @@ class Signal:
         if not self.is_moment_in_signal(time_moment_sec):
             return None
         nearest_index = find_closest_sorted(self.time, time_moment_sec=time_moment_sec)
-        amplitude = self.signal_mv[nearest_index]
+        amplitude = float(self.signal_mv[nearest_index])
         return amplitude
 
     def get_cropped_with_padding(self, coord_left: float, coord_right: float, padding_percent: float) -> 'Signal':
@@ -72,7 +140,7 @@ class Signal:
         :param padding_percent (float)  Процент от длины запрашиваемого интервала, который будет
                                     распределен поровну на левый и правый отступы
 
-        :return: Signal: Новый сигнал с добавленными отступами
+        :return: Signal: Фрагмент сигнала с добавленными отступами (разделяет память с исходным)
         """
         # Проверка входных параметров
         if not 0 <= coord_left < coord_right:
@@ -81,7 +149,7 @@ class Signal:
         if padding_percent < 0:
             raise ValueError("Процент паддинга не может быть отрицательным")
 
-        if not self.time:
+        if len(self._ticks) == 0:
             raise ValueError("Сигнал не содержит данных")
 
         # Длина запрашиваемого интервала в секундах
@@ -98,8 +166,9 @@ class Signal:
         padded_right = coord_right + half_padding
 
         # Корректируем границы, чтобы не выходить за пределы сигнала
-        padded_left = max(padded_left, self.time[0])
-        padded_right = min(padded_right, self.time[-1])
+        time = self.time
+        padded_left = max(padded_left, time[0])
+        padded_right = min(padded_right, time[-1])
 
         # Проверяем, что после корректировки границы остались корректными
         if padded_left >= padded_right:
@@ -112,9 +181,10 @@ class Signal:
 
     def get_duration(self) -> float:
         """Возвращает длительность сигнала в секундах."""
-        if len(self.time) < 2:
+        if len(self._ticks) < 2:
             return 0.0
-        return self.time[-1] - self.time[0]
+        time = self.time
+        return float(time[-1] - time[0])
 
     def __len__(self):
         """Возвращает количество отсчетов в сигнале"""
@@ -1,8 +1,10 @@
 import bisect
-from typing import List
+import os
+import tempfile
+from typing import Sequence
 
 
-def find_closest_sorted(time: List[float], time_moment_sec: float) -> int:
+def find_closest_sorted(time: Sequence[float], time_moment_sec: float) -> int:
     """
     Находит индекс элемента в отсортированном списке `time`, значение которого
     наиболее близко к `time_moment_sec`.
@@ -11,7 +13,7 @@ def find_closest_sorted(time: List[float], time_moment_sec: float) -> int:
     сложность O(log n) вместо O(n) у линейного поиска.
 
     Args:
-        time (List[float]): Отсортированный список временных отметок (по возрастанию).
+        time (Sequence[float]): Отсортированный список (или numpy-массив) временных отметок (по возрастанию).
             Метод предполагает, что список уже отсортирован. Если это не так,
             результат будет некорректным.
         time_moment_sec (float): Искомое значение времени (в секундах),
@@ -36,7 +38,7 @@ def find_closest_sorted(time: List[float], time_moment_sec: float) -> int:
         4. Возвращает индекс того элемента, у которого разница меньше.
 
     """
-    if not time:
+    if len(time) == 0:
         raise ValueError("Список `time` не может быть пустым")
 
     # Находим позицию вставки — индекс первого элемента >= time_moment_sec
@@ -57,3 +59,15 @@ def find_closest_sorted(time: List[float], time_moment_sec: float) -> int:
         return pos - 1
     else:
         return pos
+
+
+def replace_file(path: str, write) -> None:
+    """ Пишет файл через временный в той же папке и подменяет им path: недописанный файл никто не прочитает """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
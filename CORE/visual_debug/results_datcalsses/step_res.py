@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 
 from CORE import Signal
 from CORE.run import Exemplar
@@ -16,6 +16,7 @@ class StepRes:
 
     tracks_results: List[TrackRes]
     exemplars: Optional[List[Exemplar]] = None
+    profile: Optional[Any] = None  # CORE.run.profiling.SpanProfile, если запуск профилировался
 
     def get_tracks_results(self) -> Dict[int, List[float]]:
         """ Возвращает словарь, где ключ - id трека, значение - найденные этим треком точки (с дублями) """
@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import Dict, List
+from typing import Any, Dict, List, Optional
 
 from CORE import Signal
 from CORE.run.utils import delete_similar_points
@@ -17,6 +17,7 @@ class TrackRes:
 
     ps_res_objs: List[PS_Res]
     sm_res_objs: List[SM_Res]  # порядок важен
+    profile: Optional[Any] = None  # CORE.run.profiling.SpanProfile, если запуск профилировался
 
     def get_ps_coords_by_id(self) -> Dict[int, List[float]]:
         """ Возвращает словарь, где ключ - id PS-объекта, значение - его res_coords. """
@@ -31,7 +31,7 @@ class DrawExemplar:
         """
         points_with_y = []
 
-        for point_name, (x, track_id) in self.res._points.items():
+        for point_name, (x, track_id) in self.res.get_points().items():
             # Получаем амплитуду в точке
             y = self.res.signal.get_amplplitude_in_moment(x)
             if y is not None:  # Игнорируем точки вне сигнала
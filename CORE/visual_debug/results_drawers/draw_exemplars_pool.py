@@ -73,7 +73,7 @@ class DrawExemplarsPool:
         """Возвращает отсортированные точки экземпляра."""
         points_with_y = []
 
-        for point_name, (x, track_id) in exemplar._points.items():
+        for point_name, (x, track_id) in exemplar.get_points().items():
             y = exemplar.get_signal().get_amplplitude_in_moment(x)
             if y is not None:
                 points_with_y.append((x, y, point_name))
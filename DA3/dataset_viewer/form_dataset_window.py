@@ -17,7 +17,7 @@ from CORE.db.db_manager import DBManager
 from CORE.db.forms_services import FormService
 from CORE.db_dataclasses import Form
 from CORE.logger import get_logger
-from CORE.paths import DB_PATH
+from CORE.paths import DB_PATH, PARAMETRISED_CACHE_PATH
 from DA3.dataset_viewer.dataframe_widget import DataFrameWidget
 
 logger = get_logger(__name__)
@@ -101,7 +101,8 @@ class FormDatasetWindow(QMainWindow):
         # Создаем параметризованный датасет
         parametrised_dataset = ParametrisedDataset(
             raw_exemplars=raw_dataset,
-            form=form
+            form=form,
+            cache_dir=PARAMETRISED_CACHE_PATH
         )
 
         return parametrised_dataset
@@ -112,6 +112,8 @@ class StepResWidget(QWidget):
         # Обновляем ID
         self.id_text_edit.clear()
         self.id_text_edit.append(str(step_res.id))
+        if step_res.profile is not None:  # запуск профилировался (см. CORE.run.profiling)
+            self.id_text_edit.append(step_res.profile.format())
 
         # Получаем экземпляры
         exemplars = step_res.get_exemplars() or []
@@ -78,6 +78,8 @@ class TrackFullResWidget(QWidget):
         # Обновляем текстовое поле с ID
         self.id_text_edit.clear()
         self.id_text_edit.append(str(track_res.id))
+        if track_res.profile is not None:  # запуск профилировался (см. CORE.run.profiling)
+            self.id_text_edit.append(track_res.profile.format())
 
         # === Верхний канвас: трек с SM ===
         # Создаём визуализатор для трека с SM
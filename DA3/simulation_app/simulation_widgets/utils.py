@@ -71,7 +71,7 @@ class ExemplarInfoFormatter:
     def _format_points(self, exemplar: Exemplar) -> str:
         """Форматирует информацию о точках."""
         points_info = []
-        for point_name, (x, track_id) in exemplar._points.items():
+        for point_name, (x, track_id) in exemplar.get_points().items():
             points_info.append(f"{point_name}: {x:.3f}с")
         return ", ".join(points_info) if points_info else "нет точек"
 
@@ -10,6 +10,7 @@ from CORE.db.db_manager import DBManager
 from CORE.db.forms_services import FormService
 from CORE.db_dataclasses import Form
 from CORE.logger import get_logger
+from CORE.paths import PARAMETRISED_CACHE_PATH
 from CORE.run import Exemplar
 from CORE.run.exemplars_pool import ExemplarsPool
 from CORE.run.r_form import RForm
@@ -47,7 +48,7 @@ class Simulator:
     def reset_form(self, form: Form):
         self._reset_dataset(name=form.path_to_dataset)
         raw_exemplars = deepcopy(self.dataset)
-        dataset = ParametrisedDataset(form=form, raw_exemplars=raw_exemplars)
+        dataset = ParametrisedDataset(form=form, raw_exemplars=raw_exemplars, cache_dir=PARAMETRISED_CACHE_PATH)
         try:
             evaluator = self.settings.evaluator_class(positive_dataset=dataset)
         except TypeError:
@@ -444,7 +445,7 @@ if __name__ == "__main__":
             for i, ex in enumerate(form_result.exemplars_sorted[:3]):
                 print(f"  {i + 1}. Оценка: {ex.evaluation_result:.3f}")
                 print(
-                    f"     Точки: {sorted([(name, coord) for name, (coord, _) in ex._points.items()], key=lambda x: x[1])}")
+                    f"     Точки: {sorted([(name, coord) for name, (coord, _) in ex.get_points().items()], key=lambda x: x[1])}")
 
 
         # Запускаем визуализацию формы